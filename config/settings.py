@@ -55,6 +55,10 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "middleware.BlockUserMiddleware",
+    "middleware.TmdbMetricsMiddleware",
+    "middleware.TmdbDeadlineMiddleware",
+    "middleware.FilmStatusMiddleware",
+    "middleware.PosterQueueMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -113,11 +117,13 @@ if CACHE_ENABLED:
     }
 
 IS_TESTING = any(x in " ".join(sys.argv) for x in ["pytest", "test"])
+TEST_DB_ENGINE = os.getenv("TEST_DB_ENGINE", "sqlite")  # postgresql - тесты на PostgreSQL (джоб test-postgres в CI)
 if IS_TESTING:
-    DATABASES["default"] = {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "test_bd.sqlite3",
-    }
+    if TEST_DB_ENGINE != "postgresql":
+        DATABASES["default"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "test_bd.sqlite3",
+        }
     CACHES = {
         "default": {
             "BACKEND": "django.core.cache.backends.dummy.DummyCache",
@@ -163,6 +169,7 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+PRIVATE_MEDIA_ROOT = Path(os.getenv("PRIVATE_MEDIA_ROOT", BASE_DIR / "private_media"))  # не отдается nginx
 
 # MESSAGE_TAGS
 
@@ -235,12 +242,62 @@ CELERY_BEAT_SCHEDULE = {
         "task": "calendar_events.tasks.send_daily_reminders",
         "schedule": crontab(minute=0, hour="*"),
     },
+    "requeue-stale-film-intents": {
+        "task": "films.tasks.requeue_stale_film_intents",
+        "schedule": crontab(minute="*/5"),  # отложенные добавления фильмов, чьи задачи потерялись
+    },
+    "recover-stale-diary-imports": {
+        "task": "films.tasks.recover_stale_diary_imports",
+        "schedule": crontab(minute="*/10"),  # импорты дневника, чьи задачи потерялись или воркер упал посреди файла
+    },
+    "cache-pending-posters": {
+        "task": "films.tasks.cache_pending_posters",
+        "schedule": crontab(minute="*"),  # постеры, запрошенные страницами, но еще не закэшированные локально
+    },
+    "refresh-collection-snapshots": {
+        "task": "films.tasks.refresh_collection_snapshots",
+        "schedule": crontab(minute="*/30"),  # общие карточки вкладок популярные / в кино / скоро / тренды / топ
+    },
+    "reconcile-user-stats-nightly": {
+        "task": "users.tasks.reconcile_user_stats_task",
+        "schedule": crontab(hour=4, minute=0),  # счетчики панели менеджера: расхождения после сбоев и ручных правок
+    },
+    "warm-tmdb-cache": {
+        "task": "films.tasks.warm_tmdb_cache_task",
+        "schedule": crontab(hour="0,6", minute=30),  # перед пересчетом рекомендаций и перед утренним трафиком
+    },
     "recompute-recommendations-nightly": {
         "task": "films.tasks.recompute_all_recommendations",
         "schedule": crontab(hour=1, minute=0),
     },
+    "sync-tmdb-catalog-nightly": {
+        "task": "films.tasks.sync_tmdb_catalog",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "sync-tmdb-catalog-export-weekly": {
+        "task": "films.tasks.sync_tmdb_catalog",
+        "schedule": crontab(hour=4, minute=0, day_of_week="sun"),
+        "kwargs": {"use_export": True},
+    },
 }
 
+# Локальное зеркало каталога TMDB: записи старше считаются устаревшими и не читаются клиентом Tmdb
+TMDB_CATALOG_MAX_AGE_DAYS = 14
+
+# Прогрев кэша TMDB: бюджет частоты запросов и число параллельных потоков
+TMDB_WARMUP_RATE = 20
+TMDB_WARMUP_WORKERS = 8
+
+# Метрики клиента TMDB: интервал сброса снимка процесса в общий кэш и токен для сборщика Prometheus
+TMDB_METRICS_FLUSH_INTERVAL = 15
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Бюджет времени (сек) на все запросы к TMDB за один HTTP-запрос; повторы сверх бюджета не выполняются
+TMDB_REQUEST_DEADLINE = 8
+
+# Число потоков для параллельной загрузки данных фильмов из TMDB при пакетной сборке карточек
+TMDB_PAYLOAD_WORKERS = 8
+
 # Mail server settings
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
@@ -329,6 +386,7 @@ MODULE_HANDLERS = {
     "events": LOG_DIR / "events.log",
     "telegram": LOG_DIR / "telegram.log",
     "users": LOG_DIR / "users.log",
+    "tmdb": LOG_DIR / "tmdb.log",
 }
 
 for name, filename in MODULE_HANDLERS.items():
@@ -381,6 +439,7 @@ LOGGING = {
         "filmdiary.events": {"handlers": ["file_events"], "level": LOG_LEVEL, "propagate": False},
         "filmdiary.telegram": {"handlers": ["file_telegram"], "level": LOG_LEVEL, "propagate": False},
         "filmdiary.users": {"handlers": ["file_users"], "level": LOG_LEVEL, "propagate": False},
+        "filmdiary.tmdb": {"handlers": ["file_tmdb"], "level": LOG_LEVEL, "propagate": False},
         "films.tasks": {"handlers": ["console", "file_app"], "level": "INFO", "propagate": False},
         "users.tasks": {"handlers": ["console", "file_app"], "level": "INFO", "propagate": False},
     },
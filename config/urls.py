@@ -8,6 +8,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from films.views.metrics import tmdb_metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="API Documentation",
@@ -35,6 +37,7 @@ urlpatterns = [
     path("api/", include("calendar_events.urls", namespace="calendar_events")),
     path("", include("calendar_events.urls_pages", namespace="calendar_events_pages")),
     path("swagger/", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
+    path("metrics/tmdb/", tmdb_metrics_view, name="tmdb_metrics"),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
 ]
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from films.models import Film, UserFilm
+from films.models import CatalogFilm, DiaryImport, Film, UserFilm, UserFilmIntent
 
 
 @admin.register(Film)
@@ -17,3 +17,28 @@ class UserFilmAdmin(admin.ModelAdmin):
 
     list_display = ("id", "user", "film", "is_favorite", "created_at")
     search_fields = ("id",)
+
+
+@admin.register(UserFilmIntent)
+class UserFilmIntentAdmin(admin.ModelAdmin):
+    """Добавляет отложенные добавления фильмов в админ-панель"""
+
+    list_display = ("id", "user", "tmdb_id", "status", "error", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("tmdb_id",)
+
+
+@admin.register(DiaryImport)
+class DiaryImportAdmin(admin.ModelAdmin):
+    """Добавляет импорты дневника в админ-панель"""
+
+    list_display = ("id", "user", "source", "status", "processed", "imported", "reviews", "created_at")
+    list_filter = ("status", "source")
+
+
+@admin.register(CatalogFilm)
+class CatalogFilmAdmin(admin.ModelAdmin):
+    """Добавляет зеркало каталога TMDB в админ-панель"""
+
+    list_display = ("id", "title", "tmdb_id", "release_date", "popularity", "synced_at")
+    search_fields = ("title", "tmdb_id")
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FilmsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "films"
+
+    def ready(self):
+        from films import signals  # noqa F401
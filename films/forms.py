@@ -0,0 +1,22 @@
+from django import forms
+
+from films.models import DiaryImport
+from films.services.diary_import import MAX_FILE_SIZE
+
+
+class DiaryImportForm(forms.ModelForm):
+    """Форма загрузки CSV-выгрузки Letterboxd / IMDb"""
+
+    file = forms.FileField(label="CSV-файл Letterboxd или IMDb", widget=forms.FileInput(attrs={"accept": ".csv"}))
+
+    class Meta:
+        model = DiaryImport
+        fields = ("file",)
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if not file.name.lower().endswith(".csv"):
+            raise forms.ValidationError("Файл должен быть в формате CSV")
+        if file.size > MAX_FILE_SIZE:
+            raise forms.ValidationError(f"Размер файла не должен превышать {MAX_FILE_SIZE // (1024 * 1024)} МБ")
+        return file
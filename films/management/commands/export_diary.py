@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from films.services.export import FORMATS, export_diary, export_filename
+
+
+class Command(BaseCommand):
+    help = "Потоково выгружает дневник пользователя (библиотека, отзывы, календарь) в CSV или JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("user", help="username или id пользователя")
+        parser.add_argument("--format", choices=FORMATS, default="csv", help="Формат выгрузки")
+        parser.add_argument("--gzip", action="store_true", help="Сжать выгрузку gzip")
+        parser.add_argument("--output", help="Путь к файлу (по умолчанию filmdiary_<username>.<format>[.gz])")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        lookup = {"id": int(options["user"])} if options["user"].isdigit() else {"username": options["user"]}
+        user = User.objects.filter(**lookup).first()
+        if not user:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+
+        fmt, gzip = options["format"], options["gzip"]
+        path = options["output"] or export_filename(user, fmt, gzip)
+        size = 0
+        with open(path, "wb") as f:
+            for chunk in export_diary(user, fmt, gzip):
+                f.write(chunk)
+                size += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Дневник {user.username} выгружен: {path} ({size} байт)"))
@@ -0,0 +1,52 @@
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from films.services.catalog_sync import id_export, ids_to_refresh, iter_export_ids, skip_fresh, sync_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Синхронизирует локальное зеркало каталога TMDB: библиотеки пользователей, устаревшие записи или выгрузку id"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ids", nargs="+", type=int, help="Синхронизировать конкретные tmdb_id")
+        parser.add_argument("--export-file", help="Путь к ежедневной выгрузке TMDB movie_ids_*.json.gz")
+        parser.add_argument(
+            "--export-date", help="Скачать ежедневную выгрузку TMDB за дату (YYYY-MM-DD) и синхронизировать ее"
+        )
+        parser.add_argument("--min-popularity", type=float, default=0.0, help="Порог популярности для выгрузки")
+        parser.add_argument("--limit", type=int, default=None, help="Максимум фильмов за запуск")
+        parser.add_argument("--workers", type=int, default=8, help="Количество параллельных запросов к TMDB")
+        parser.add_argument("--force", action="store_true", help="Обновлять и свежие записи зеркала")
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+
+        with ExitStack() as stack:  # скачанная выгрузка удаляется после синхронизации, указанный файл - нет
+            if options["ids"]:
+                tmdb_ids = options["ids"]
+            elif options["export_file"] or options["export_date"]:
+                path = options["export_file"]
+                if not path:
+                    try:
+                        day = datetime.strptime(options["export_date"], "%Y-%m-%d").date()
+                    except ValueError:
+                        raise CommandError("--export-date ожидается в формате YYYY-MM-DD")
+                    self.stdout.write(f"Загрузка выгрузки TMDB за {day}")
+                    path = stack.enter_context(id_export(day))
+                tmdb_ids = iter_export_ids(path, min_popularity=options["min_popularity"], limit=limit)
+                if not options["force"]:
+                    tmdb_ids = skip_fresh(tmdb_ids)
+            else:
+                tmdb_ids = ids_to_refresh(limit)
+
+            stats = sync_catalog(tmdb_ids, workers=options["workers"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Каталог TMDB синхронизирован: запрошено {stats['requested']}, "
+                f"сохранено {stats['synced']}, ошибок {stats['failed']}"
+            )
+        )
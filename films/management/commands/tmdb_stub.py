@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from services.tmdb_stub import MODES, UPSTREAM, TmdbStubServer
+
+
+class Command(BaseCommand):
+    help = "Запускает локальный заменитель TMDB API: воспроизведение/запись фикстур, задержки и внедрение ошибок"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--mode", choices=MODES, default="replay")
+        parser.add_argument("--fixtures", help="Каталог фикстур (обязателен для record)")
+        parser.add_argument("--upstream", default=UPSTREAM, help="Адрес настоящего TMDB для режима record")
+        parser.add_argument("--latency-ms", type=float, default=0, help="Задержка ответа, мс")
+        parser.add_argument("--jitter-ms", type=float, default=0, help="Разброс задержки, мс")
+        parser.add_argument("--error-rate", type=float, default=0, help="Доля ответов с ошибкой (0..1)")
+        parser.add_argument("--error-status", type=int, default=503, help="HTTP-статус внедренной ошибки")
+        parser.add_argument("--strict", action="store_true", help="404 вместо синтетики для незаписанных запросов")
+        parser.add_argument("--seed", type=int, default=None, help="Seed для воспроизводимых задержек и ошибок")
+
+    def handle(self, *args, **options):
+        server = TmdbStubServer(
+            (options["host"], options["port"]),
+            mode=options["mode"],
+            fixtures_dir=options["fixtures"],
+            upstream=options["upstream"],
+            latency=options["latency_ms"] / 1000,
+            jitter=options["jitter_ms"] / 1000,
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+            strict=options["strict"],
+            seed=options["seed"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Заменитель TMDB ({options['mode']}) запущен: TMDB_BASE_URL={server.base_url}")
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Запросов обслужено: {sum(server.hits.values())}")
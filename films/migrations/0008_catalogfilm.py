@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("films", "0007_alter_userfilm_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogFilm",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("tmdb_id", models.PositiveIntegerField(unique=True, verbose_name="TMDB ID")),
+                ("title", models.CharField(blank=True, max_length=500, verbose_name="Название")),
+                (
+                    "original_title",
+                    models.CharField(blank=True, max_length=500, null=True, verbose_name="Оригинальное название"),
+                ),
+                ("release_date", models.DateField(blank=True, null=True, verbose_name="Дата выхода")),
+                ("popularity", models.FloatField(default=0, verbose_name="Популярность")),
+                ("genre_ids", models.JSONField(blank=True, default=list, verbose_name="Жанры TMDB")),
+                ("details", models.JSONField(default=dict, verbose_name="Детали")),
+                ("credits", models.JSONField(default=dict, verbose_name="Актеры и команда")),
+                ("keywords", models.JSONField(blank=True, default=list, verbose_name="Ключевые слова")),
+                ("synced_at", models.DateTimeField(verbose_name="Дата синхронизации")),
+            ],
+            options={
+                "verbose_name": "фильм каталога TMDB",
+                "verbose_name_plural": "каталог TMDB",
+                "ordering": ["-popularity"],
+                "indexes": [
+                    models.Index(fields=["synced_at"], name="films_catal_synced__e98b6a_idx"),
+                    models.Index(fields=["-popularity"], name="films_catal_popular_66310a_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("films", "0008_catalogfilm"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserFilmIntent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("tmdb_id", models.PositiveIntegerField(verbose_name="TMDB ID")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "В очереди"), ("done", "Добавлен"), ("failed", "Ошибка")],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("error", models.CharField(blank=True, max_length=255, verbose_name="Ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="film_intents",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "добавление фильма",
+                "verbose_name_plural": "добавления фильмов",
+                "indexes": [models.Index(fields=["status", "updated_at"], name="films_userf_status_1712da_idx")],
+                "unique_together": {("user", "tmdb_id")},
+            },
+        ),
+    ]
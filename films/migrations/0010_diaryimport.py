@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("films", "0009_userfilmintent"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DiaryImport",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("file", models.FileField(upload_to="imports/", verbose_name="Файл")),
+                ("source", models.CharField(blank=True, max_length=20, verbose_name="Источник")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("done", "Завершен"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("total", models.PositiveIntegerField(default=0, verbose_name="Строк в файле")),
+                ("processed", models.PositiveIntegerField(default=0, verbose_name="Обработано строк")),
+                ("imported", models.PositiveIntegerField(default=0, verbose_name="Добавлено фильмов")),
+                ("reviews", models.PositiveIntegerField(default=0, verbose_name="Добавлено оценок")),
+                ("unresolved", models.JSONField(blank=True, default=list, verbose_name="Не найдены в TMDB")),
+                ("error", models.CharField(blank=True, max_length=255, verbose_name="Ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="diary_imports",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "импорт дневника",
+                "verbose_name_plural": "импорты дневника",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
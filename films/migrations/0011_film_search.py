@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:02
+
+from django.db import migrations
+
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE films_film ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(original_title, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(overview, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX films_film_search_vector_gin ON films_film USING gin (search_vector)",
+    "CREATE INDEX films_film_title_trgm ON films_film USING gin (title gin_trgm_ops)",
+    "CREATE INDEX films_film_original_title_trgm ON films_film USING gin (original_title gin_trgm_ops)",
+]
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS films_film_original_title_trgm",
+    "DROP INDEX IF EXISTS films_film_title_trgm",
+    "DROP INDEX IF EXISTS films_film_search_vector_gin",
+    "ALTER TABLE films_film DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    """Колонка и индексы поиска есть только на PostgreSQL, на остальных БД поиск работает через icontains"""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("films", "0010_diaryimport"),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(BACKWARD_SQL)),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("films", "0011_film_search"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userfilm",
+            index=models.Index(fields=["user", "created_at", "id"], name="userfilm_user_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="userfilm",
+            index=models.Index(
+                condition=models.Q(("is_favorite", True)),
+                fields=["user", "created_at", "id"],
+                name="userfilm_user_fav_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:22
+
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models
+
+import services.storage
+
+FINISHED = ("done", "failed")
+
+
+def move_import_files(apps, schema_editor):
+    """Файлы импортов уходят из публичного MEDIA_ROOT: завершенных - удаляются, ожидающих - переносятся"""
+    DiaryImport = apps.get_model("films", "DiaryImport")
+    public = FileSystemStorage()  # MEDIA_ROOT - прежнее хранилище поля
+    private = services.storage.get_private_storage()
+
+    for diary_import in DiaryImport.objects.exclude(file="").iterator():
+        name = diary_import.file.name
+        if diary_import.status not in FINISHED and public.exists(name):
+            with public.open(name, "rb") as f:
+                diary_import.file.name = private.save(name, f)
+        else:
+            diary_import.file.name = ""
+        public.delete(name)
+        diary_import.save(update_fields=["file"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("films", "0012_hot_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="diaryimport",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name="diaryimport",
+            name="file",
+            field=models.FileField(
+                storage=services.storage.get_private_storage, upload_to="imports/", verbose_name="Файл"
+            ),
+        ),
+        migrations.RunPython(move_import_files, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from services.storage import get_private_storage
+
 
 class Actor(models.Model):
     """Класс модели актера"""
@@ -113,4 +115,109 @@ class UserFilm(models.Model):
         unique_together = ("user", "film")
         indexes = [
             models.Index(fields=["user", "film"]),
+            # "Мои фильмы" и "Любимое": фильтр по пользователю, курсор (created_at, id);
+            # любимое - частичный индекс: Django сравнивает булево поле без "= true", и только такой индекс подходит
+            models.Index(fields=["user", "created_at", "id"], name="userfilm_user_created_idx"),
+            models.Index(
+                fields=["user", "created_at", "id"],
+                condition=models.Q(is_favorite=True),
+                name="userfilm_user_fav_created_idx",
+            ),
+        ]
+
+
+class UserFilmIntent(models.Model):
+    """
+    Отложенное добавление фильма в библиотеку: запись создается сразу по клику,
+    фильм загружается из TMDB и сохраняется фоновой задачей, после чего создается UserFilm
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        DONE = "done", "Добавлен"
+        FAILED = "failed", "Ошибка"
+
+    user = models.ForeignKey(
+        to="users.CustomUser", on_delete=models.CASCADE, related_name="film_intents", verbose_name="Пользователь"
+    )
+    tmdb_id = models.PositiveIntegerField(verbose_name="TMDB ID")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name="Статус")
+    error = models.CharField(max_length=255, blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} — {self.tmdb_id} ({self.status})"
+
+    class Meta:
+        verbose_name = "добавление фильма"
+        verbose_name_plural = "добавления фильмов"
+        unique_together = ("user", "tmdb_id")
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+
+class DiaryImport(models.Model):
+    """Импорт дневника из CSV Letterboxd / IMDb: файл обрабатывается Celery-задачей, прогресс хранится здесь"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Завершен"
+        FAILED = "failed", "Ошибка"
+
+    user = models.ForeignKey(
+        to="users.CustomUser", on_delete=models.CASCADE, related_name="diary_imports", verbose_name="Пользователь"
+    )
+    # личный дневник пользователя: вне MEDIA_ROOT, удаляется после импорта
+    file = models.FileField(upload_to="imports/", storage=get_private_storage, verbose_name="Файл")
+    source = models.CharField(max_length=20, blank=True, verbose_name="Источник")  # letterboxd / imdb
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name="Статус")
+    total = models.PositiveIntegerField(default=0, verbose_name="Строк в файле")
+    processed = models.PositiveIntegerField(default=0, verbose_name="Обработано строк")
+    imported = models.PositiveIntegerField(default=0, verbose_name="Добавлено фильмов")
+    reviews = models.PositiveIntegerField(default=0, verbose_name="Добавлено оценок")
+    unresolved = models.JSONField(default=list, blank=True, verbose_name="Не найдены в TMDB")
+    error = models.CharField(max_length=255, blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # обновляется после каждого пакета: по нему ищутся зависшие
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} — {self.source or 'csv'} ({self.status})"
+
+    class Meta:
+        verbose_name = "импорт дневника"
+        verbose_name_plural = "импорты дневника"
+        ordering = ["-created_at"]
+
+
+class CatalogFilm(models.Model):
+    """
+    Локальное зеркало каталога TMDB: метаданные фильма (детали, жанры, топ актеров, ключевая команда, ключевые слова).
+    Заполняется и обновляется командой sync_tmdb_catalog / Celery-задачей, читается клиентом Tmdb до обращения к API
+    """
+
+    tmdb_id = models.PositiveIntegerField(unique=True, verbose_name="TMDB ID")
+    title = models.CharField(max_length=500, blank=True, verbose_name="Название")
+    original_title = models.CharField(max_length=500, blank=True, null=True, verbose_name="Оригинальное название")
+    release_date = models.DateField(null=True, blank=True, verbose_name="Дата выхода")
+    popularity = models.FloatField(default=0, verbose_name="Популярность")
+    genre_ids = models.JSONField(default=list, blank=True, verbose_name="Жанры TMDB")
+    details = models.JSONField(default=dict, verbose_name="Детали")  # ответ /movie/{id}
+    credits = models.JSONField(default=dict, verbose_name="Актеры и команда")  # cast[:20] + ключевые должности
+    keywords = models.JSONField(default=list, blank=True, verbose_name="Ключевые слова")
+    synced_at = models.DateTimeField(verbose_name="Дата синхронизации")
+
+    def __str__(self):
+        return self.title or str(self.tmdb_id)
+
+    class Meta:
+        verbose_name = "фильм каталога TMDB"
+        verbose_name_plural = "каталог TMDB"
+        ordering = ["-popularity"]
+        indexes = [
+            models.Index(fields=["synced_at"]),
+            models.Index(fields=["-popularity"]),
         ]
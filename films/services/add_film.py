@@ -0,0 +1,97 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from films.models import Film, UserFilm, UserFilmIntent
+from films.services.save_film import ingest_film
+from films.services.tmdb_movie_payload import get_tmdb_movie_payload
+
+logger = logging.getLogger("filmdiary.films")
+
+# намерение без движения дольше этого ставится в очередь повторно. С запасом выше обычной задержки очереди:
+# единственный воркер (-P solo) выполняет и синхронизацию каталога, прогрев, постеры и импорт;
+# каждая попытка задачи обновляет updated_at, так что выполняющиеся и повторяемые задачи не дублируются
+STALE_AFTER = timedelta(minutes=getattr(settings, "FILM_INTENT_STALE_MINUTES", 30))
+
+
+def request_add_film(user, tmdb_id: int) -> tuple[str, UserFilmIntent | None]:
+    """
+    Быстрое добавление фильма в библиотеку без ожидания TMDB:
+    - фильм уже в БД - сразу создает UserFilm: ("added" | "exists", None);
+    - иначе записывает намерение и ставит фоновую загрузку после commit: ("pending", intent)
+    """
+    film = Film.objects.filter(tmdb_id=tmdb_id).only("id").first()
+    if film:
+        _, created = UserFilm.objects.get_or_create(user=user, film=film)
+        UserFilmIntent.objects.filter(user=user, tmdb_id=tmdb_id).delete()
+        return ("added" if created else "exists"), None
+
+    intent, _ = UserFilmIntent.objects.update_or_create(
+        user=user, tmdb_id=tmdb_id, defaults={"status": UserFilmIntent.Status.PENDING, "error": ""}
+    )
+    transaction.on_commit(lambda: enqueue_intent(intent.id))
+    return "pending", intent
+
+
+def enqueue_intent(intent_id: int) -> None:
+    """Ставит задачу загрузки фильма; если брокер недоступен, намерение подберет периодическая задача"""
+    from films.tasks import ingest_user_film
+
+    try:
+        ingest_user_film.delay(intent_id)
+    except Exception as e:
+        logger.warning("AddFilm enqueue FAIL: intent=%s error=%s", intent_id, e)
+
+
+def process_intent(intent_id: int) -> bool:
+    """
+    Загружает фильм намерения из TMDB, сохраняет его (ingest_film) и добавляет в библиотеку пользователя.
+    True - намерение завершено (фильм добавлен или намерение уже не актуально), False - TMDB не ответил
+    """
+    intent = UserFilmIntent.objects.select_related("user").filter(id=intent_id).first()
+    if not intent or intent.status != UserFilmIntent.Status.PENDING:
+        return True
+    intent.save(update_fields=["updated_at"])  # задача жива: периодический перезапуск ее не трогает
+
+    film = Film.objects.filter(tmdb_id=intent.tmdb_id).first()
+    if not film:
+        payload = get_tmdb_movie_payload(intent.tmdb_id)
+        if not payload or "details" not in payload or payload.get("partial"):
+            return False
+        film, _ = ingest_film(intent.tmdb_id, payload["details"], payload["credits"])
+
+    with transaction.atomic():
+        UserFilm.objects.get_or_create(user=intent.user, film=film)
+        intent.status = UserFilmIntent.Status.DONE
+        intent.save(update_fields=["status", "updated_at"])
+    logger.info("AddFilm async OK: user=%s tmdb_id=%s", intent.user_id, intent.tmdb_id)
+    return True
+
+
+def fail_intent(intent_id: int, error: str) -> None:
+    """Отмечает намерение неудачным: пользователь увидит ошибку и сможет повторить"""
+    UserFilmIntent.objects.filter(id=intent_id, status=UserFilmIntent.Status.PENDING).update(
+        status=UserFilmIntent.Status.FAILED, error=error[:255], updated_at=timezone.now()
+    )
+
+
+def get_add_status(user, tmdb_id: int) -> dict | None:
+    """Статус добавления фильма для опроса из интерфейса; None - фильм не добавлялся"""
+    if UserFilm.objects.filter(user=user, film__tmdb_id=tmdb_id).exists():
+        return {"status": "added"}
+    intent = UserFilmIntent.objects.filter(user=user, tmdb_id=tmdb_id).only("status", "error").first()
+    if not intent:
+        return None
+    return {"status": intent.status, "message": intent.error}
+
+
+def stale_intent_ids() -> list[int]:
+    """Намерения, задачи которых потерялись (брокер был недоступен, воркер перезапущен)"""
+    return list(
+        UserFilmIntent.objects.filter(
+            status=UserFilmIntent.Status.PENDING, updated_at__lt=timezone.now() - STALE_AFTER
+        ).values_list("id", flat=True)
+    )
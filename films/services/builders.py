@@ -1,6 +1,9 @@
+from django.core.paginator import Page, Paginator
+
 from films.models import Film, Genre
-from films.services.tmdb_movie_payload import get_tmdb_movie_payload
-from films.services.user_film_services import get_user_film, get_user_recommendations, map_status
+from films.services.film_statuses import FilmStatusResolver, get_status_resolver
+from films.services.tmdb_movie_payload import get_tmdb_movie_payloads
+from films.services.user_film_services import get_user_recommendations
 from films.services.utils import build_poster_url, extract_year, join_genres
 
 
@@ -10,25 +13,25 @@ def build_film_card(
     tmdb_item: dict | None = None,
     genre_map: dict | None = None,
     user=None,
+    statuses: FilmStatusResolver | None = None,
 ) -> dict:
-    """Возвращает единый формат карточки фильма для film_preview_card.html из БД и из TMDB"""
+    """
+    Возвращает единый формат карточки фильма для film_preview_card.html из БД и из TMDB.
+    Статусы пользователя берутся из резолвера запроса: построители списков загружают их заранее одним пакетом
+    """
     if film:
-        user_film = get_user_film(user, film) if user else None
+        status = (statuses or get_status_resolver(user)).card_status(film.id)
         genres_str = ", ".join(g.name for g in film.genres.all()[:2]) or "—"
         return {
             "tmdb_id": int(film.tmdb_id) if film.tmdb_id is not None else None,
             "title": film.title,
             "poster_url": build_poster_url(film.poster_path),
+            "poster_path": film.poster_path,
             "release_date": film.release_date.year if film.release_date else "—",
             "genres": genres_str,
             "rating": round(film.vote_average, 1) if film.vote_average else None,
-            "in_library": bool(user_film),
             "is_tmdb_dict": False,
-            **map_status(
-                user_film=user_film,
-                has_review=False,
-                rating=None,
-            ),
+            **status,
         }
 
     if tmdb_item:
@@ -36,6 +39,7 @@ def build_film_card(
             "tmdb_id": tmdb_item["id"],
             "title": tmdb_item.get("title") or tmdb_item.get("name", "Без названия"),
             "poster_url": build_poster_url(tmdb_item.get("poster_path")),
+            "poster_path": tmdb_item.get("poster_path"),
             "release_date": extract_year(tmdb_item.get("release_date")),
             "genres": join_genres(tmdb_item.get("genre_ids"), genre_map),
             "rating": round(tmdb_item.get("vote_average", 0), 1),
@@ -63,6 +67,8 @@ def build_tmdb_collection_cards(films, user=None):
     films_qs = Film.objects.filter(tmdb_id__in=tmdb_ids).prefetch_related("genres")
     films_list = list(films_qs)
     existing_films = {f.tmdb_id: f for f in films_list}
+    statuses = get_status_resolver(user)
+    statuses.load(f.id for f in films_list)
 
     cards = []
 
@@ -76,6 +82,7 @@ def build_tmdb_collection_cards(films, user=None):
                 build_film_card(
                     film=existing_films[tmdb_id],
                     user=user,
+                    statuses=statuses,
                 )
             )
         else:
@@ -90,24 +97,32 @@ def build_tmdb_collection_cards(films, user=None):
     return cards
 
 
-def build_recommendation_cards(user, limit=4) -> list[dict]:
-    """Возвращает единый формат карточки фильма для ежедневных персональных рекомендаций"""
-    recs = get_user_recommendations(user, limit=limit)
+def build_recommendation_cards(user, limit=4, recs: list[dict] | None = None) -> list[dict]:
+    """
+    Возвращает единый формат карточки фильма для ежедневных персональных рекомендаций.
+    recs - уже выбранные рекомендации (например, видимая страница); иначе первые limit из кэша
+    """
+    if recs is None:
+        recs = get_user_recommendations(user, limit=limit)
     cards = []
     tmdb_ids = [r["tmdb_id"] for r in recs]
     films_qs = Film.objects.filter(tmdb_id__in=tmdb_ids).prefetch_related("genres")
     films_list = list(films_qs)
     films_map = {f.tmdb_id: f for f in films_list}  # {603: <Film: The Matrix>, 550: <Film: Fight Club>,..}
+    statuses = get_status_resolver(user)
+    statuses.load(f.id for f in films_list)
+    # фильмы не из БД: один get_many + параллельная загрузка промахов
+    payloads = get_tmdb_movie_payloads([tmdb_id for tmdb_id in tmdb_ids if tmdb_id not in films_map])
 
     for rec in recs:
         tmdb_id = rec["tmdb_id"]
         film = films_map.get(tmdb_id)
 
         if film:
-            cards.append(build_film_card(film=film, user=user))
+            cards.append(build_film_card(film=film, user=user, statuses=statuses))
             continue
 
-        payload = get_tmdb_movie_payload(tmdb_id)
+        payload = payloads.get(tmdb_id)
         if payload:
             details = payload["details"]
             cards.append(
@@ -119,3 +134,13 @@ def build_recommendation_cards(user, limit=4) -> list[dict]:
             )
 
     return cards
+
+
+def build_recommendation_page(user, page_number=1, per_page=12, limit=50) -> Page:
+    """
+    Страница персональных рекомендаций: Paginator режет дешевый список рекомендаций из кэша,
+    карточки (фильмы из БД, статусы, ответы TMDB) строятся только для видимой страницы
+    """
+    page = Paginator(get_user_recommendations(user, limit=limit), per_page).get_page(page_number)
+    page.object_list = build_recommendation_cards(user, recs=list(page.object_list))
+    return page
@@ -0,0 +1,91 @@
+from django.db import transaction
+
+from films.models import Film, UserFilm, UserFilmIntent
+from films.services.add_film import enqueue_intent
+from films.services.save_film import ingest_film
+from films.services.tmdb_movie_payload import get_tmdb_movie_payloads
+from reviews.models import Review
+from services.user_stats import deferred_stats
+
+BULK_LIMIT = 100  # фильмов в одном пакетном запросе
+STATUS_ACTIONS = ("favorite", "unfavorite", "delete", "delete-watched")
+
+
+def bulk_add_films(user, tmdb_ids: list[int]) -> dict[int, str]:
+    """
+    Добавляет пакет фильмов в библиотеку пользователя. Статусы: added / exists / pending.
+    Фильмы, которых нет в БД, загружаются из TMDB одним пакетом (get_tmdb_movie_payloads) и сохраняются ingest_film;
+    не загрузившиеся за бюджет запроса ставятся в фоновую очередь (UserFilmIntent)
+    """
+    tmdb_ids = list(dict.fromkeys(tmdb_ids))
+    films = dict(Film.objects.filter(tmdb_id__in=tmdb_ids).values_list("tmdb_id", "id"))
+
+    missing = [tmdb_id for tmdb_id in tmdb_ids if tmdb_id not in films]
+    payloads = get_tmdb_movie_payloads(missing) if missing else {}
+    for tmdb_id, payload in payloads.items():
+        if "details" in payload and not payload.get("partial"):
+            film, _ = ingest_film(tmdb_id, payload["details"], payload["credits"])
+            films[tmdb_id] = film.id
+
+    with transaction.atomic(), deferred_stats(user.id):
+        existing = set(
+            UserFilm.objects.filter(user=user, film_id__in=films.values()).values_list("film_id", flat=True)
+        )
+        UserFilm.objects.bulk_create(
+            [UserFilm(user=user, film_id=film_id) for film_id in films.values() if film_id not in existing],
+            ignore_conflicts=True,
+        )
+        pending = [tmdb_id for tmdb_id in tmdb_ids if tmdb_id not in films]
+        if pending:
+            _queue_intents(user, pending)
+
+    statuses = {}
+    for tmdb_id in tmdb_ids:
+        if tmdb_id not in films:
+            statuses[tmdb_id] = "pending"
+        else:
+            statuses[tmdb_id] = "exists" if films[tmdb_id] in existing else "added"
+    return statuses
+
+
+def _queue_intents(user, tmdb_ids: list[int]) -> None:
+    """Записывает намерения пакетом и ставит задачи загрузки после commit"""
+    UserFilmIntent.objects.filter(user=user, tmdb_id__in=tmdb_ids).update(
+        status=UserFilmIntent.Status.PENDING, error=""
+    )
+    UserFilmIntent.objects.bulk_create(
+        [UserFilmIntent(user=user, tmdb_id=tmdb_id) for tmdb_id in tmdb_ids], ignore_conflicts=True
+    )
+    intent_ids = list(UserFilmIntent.objects.filter(user=user, tmdb_id__in=tmdb_ids).values_list("id", flat=True))
+    transaction.on_commit(lambda: [enqueue_intent(intent_id) for intent_id in intent_ids])
+
+
+@transaction.atomic
+def bulk_update_status(user, tmdb_ids: list[int], action: str) -> dict[int, str]:
+    """
+    Меняет статус пакета фильмов пользователя одним запросом на действие. Статусы: success / not_found.
+    Действия - как в UpdateFilmStatusView: favorite, unfavorite, delete, delete-watched
+    """
+    if action not in STATUS_ACTIONS:
+        raise ValueError(f"Неизвестное действие: {action}")
+
+    tmdb_ids = list(dict.fromkeys(tmdb_ids))
+    with deferred_stats(user.id):
+        return _apply_status(user, tmdb_ids, action)
+
+
+def _apply_status(user, tmdb_ids: list[int], action: str) -> dict[int, str]:
+    """Одно UPDATE / DELETE на действие; счетчики пользователя пересчитывает deferred_stats"""
+    rows = dict(UserFilm.objects.filter(user=user, film__tmdb_id__in=tmdb_ids).values_list("film__tmdb_id", "film_id"))
+    user_films = UserFilm.objects.filter(user=user, film_id__in=rows.values())
+
+    if action == "favorite":
+        user_films.update(is_favorite=True)
+    elif action == "unfavorite":
+        user_films.update(is_favorite=False)
+    elif action == "delete":
+        user_films.delete()
+    elif action == "delete-watched":
+        Review.objects.filter(user=user, film_id__in=rows.values()).delete()
+
+    return {tmdb_id: "success" if tmdb_id in rows else "not_found" for tmdb_id in tmdb_ids}
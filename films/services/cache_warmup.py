@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+from services.cache_ttl import TMDB_LOCAL_TTL
+from services.tmdb import DETAILS_PARAMS, Tmdb
+
+logger = logging.getLogger("filmdiary.films")
+
+WARMUP_RATE: float = getattr(settings, "TMDB_WARMUP_RATE", 20.0)  # запросов к TMDB в секунду
+WARMUP_WORKERS: int = getattr(settings, "TMDB_WARMUP_WORKERS", 8)
+
+# Подборки, которые читают страницы приложения и ночной пересчет рекомендаций: (path, страниц, ttl_key)
+WARMUP_LISTS = [
+    ("/movie/popular", 3, "popular"),
+    ("/movie/top_rated", 3, "top_rated"),
+    ("/movie/upcoming", 2, "trending"),
+    ("/movie/now_playing", 2, "trending"),
+    ("/trending/movie/week", 0, "trending"),  # без пагинации
+]
+
+
+class RateLimiter:
+    """Простой потокобезопасный ограничитель: не больше rate запросов в секунду на все потоки"""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Блокирует поток до следующего разрешенного слота"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            self._next_at = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _list_requests() -> list[tuple[str, dict, str]]:
+    """План запросов подборок: (path, params, ttl_key) ровно такие, какие делает клиент Tmdb"""
+    plan = []
+    for path, pages, ttl_key in WARMUP_LISTS:
+        if not pages:
+            plan.append((path, {}, ttl_key))
+            continue
+        plan.extend((path, {"page": page}, ttl_key) for page in range(1, pages + 1))
+    return plan
+
+
+def _member_requests(api: Tmdb, tmdb_ids) -> list[tuple[str, dict, str]]:
+    """План запросов деталей и актеров для фильмов подборок; фильмы из свежего зеркала каталога не нужны"""
+    mirrored = api._from_catalog_bulk(list(tmdb_ids))
+    plan = []
+    for tmdb_id in tmdb_ids:
+        if tmdb_id in mirrored:
+            continue
+        plan.append((f"/movie/{tmdb_id}", DETAILS_PARAMS, "movie_detail"))
+        plan.append((f"/movie/{tmdb_id}/credits", {}, "movie_credits"))
+    return plan
+
+
+def _warm(api: Tmdb, plan, executor, limiter: RateLimiter, stats: dict) -> list[dict]:
+    """
+    Прогревает план запросов: каждый ответ загружается заново с ограничением частоты и перезаписывается в кэше
+    с полным TTL - ключ, который есть в кэше, но истекает до ночного пересчета, иначе считался бы теплым.
+    Одним get_many до и после прогрева считает, сколько ответов было и стало в кэше; сбрасывает локальный
+    уровень кэша обновленных подборок. Возвращает ответы в порядке плана (при сбое API - прежний из кэша)
+    """
+    keys = [api.cache_key(path, params) for path, params, _ in plan]
+    stats["total"] += len(plan)
+    stats["hits"] += len(cache.get_many(keys))
+
+    def fetch(item):
+        path, params, ttl_key = item
+        limiter.wait()
+        return api._get(path, params, ttl_key, refresh=True)
+
+    fetched = list(executor.map(fetch, plan))
+    stats["fetched"] += sum(1 for data in fetched if data)
+    stats["failed"] += sum(1 for data in fetched if not data)
+
+    # в Redis записаны новые ответы: локальные копии этих подборок в процессах приложения устарели
+    refreshed = {ttl_key for (_, _, ttl_key), data in zip(plan, fetched) if data}
+    for ttl_key in sorted(refreshed & TMDB_LOCAL_TTL.keys()):
+        api.invalidate_local_cache(ttl_key)
+
+    warm = cache.get_many(keys)
+    stats["warm"] += len(warm)
+    return [data or warm.get(key) or {} for key, data in zip(keys, fetched)]
+
+
+def warm_tmdb_cache(*, rate: float = WARMUP_RATE, workers: int = WARMUP_WORKERS) -> dict:
+    """
+    Прогревает кэш TMDB: подборки popular/top_rated/trending/upcoming/now_playing,
+    затем детали и актеров каждого фильма из них. Возвращает статистику: доля ответов в кэше до прогрева
+    (hit_ratio_before) и после него (hit_ratio)
+    """
+    api = Tmdb()
+    limiter = RateLimiter(rate)
+    stats = {"total": 0, "hits": 0, "warm": 0, "fetched": 0, "failed": 0}
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pages = _warm(api, _list_requests(), executor, limiter, stats)
+        tmdb_ids = list(dict.fromkeys(m["id"] for page in pages for m in page.get("results", []) if m.get("id")))
+        _warm(api, _member_requests(api, tmdb_ids), executor, limiter, stats)
+
+    stats["films"] = len(tmdb_ids)
+    stats["hit_ratio_before"] = round(stats["hits"] / stats["total"], 3) if stats["total"] else 0.0
+    stats["hit_ratio"] = round(stats["warm"] / stats["total"], 3) if stats["total"] else 0.0
+    stats["seconds"] = round(time.monotonic() - started, 1)
+    logger.info(
+        "TMDB warmup: films=%s requests=%s hit_ratio_before=%.1f%% hit_ratio=%.1f%% fetched=%s failed=%s time=%ss",
+        stats["films"],
+        stats["total"],
+        stats["hit_ratio_before"] * 100,
+        stats["hit_ratio"] * 100,
+        stats["fetched"],
+        stats["failed"],
+        stats["seconds"],
+    )
+    return stats
@@ -0,0 +1,226 @@
+import gzip
+import json
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from heapq import nlargest
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+import requests
+
+from films.models import CatalogFilm, Film
+from films.services.cache_warmup import RateLimiter
+from services.tmdb import CATALOG_MAX_AGE_DAYS, Tmdb
+
+logger = logging.getLogger("filmdiary.films")
+
+EXPORT_URL = "https://files.tmdb.org/p/exports/movie_ids_{day:%m_%d_%Y}.json.gz"
+TOP_CAST = 20
+SYNC_RATE: float = getattr(settings, "TMDB_CATALOG_SYNC_RATE", 20.0)  # запросов к TMDB в секунду на все потоки
+IMPORTANT_JOBS = {"Director", "Writer", "Producer", "Composer"}
+UPDATE_FIELDS = [
+    "title",
+    "original_title",
+    "release_date",
+    "popularity",
+    "genre_ids",
+    "details",
+    "credits",
+    "keywords",
+    "synced_at",
+]
+
+
+def fetch_catalog_entry(api: Tmdb, tmdb_id: int, limiter: RateLimiter | None = None) -> dict | None:
+    """Загружает из TMDB детали, актеров/команду и ключевые слова одного фильма (limiter - перед каждым запросом)"""
+    wait = limiter.wait if limiter else lambda: None
+    wait()
+    details = api.get_movie_details(tmdb_id)
+    if not details or not details.get("id"):
+        return None
+    wait()
+    credits = api.get_credits(tmdb_id) or {}
+    wait()
+    keywords = api.get_keywords(tmdb_id) or {}
+    return {"details": details, "credits": credits, "keywords": keywords.get("keywords", [])}
+
+
+def build_catalog_film(tmdb_id: int, entry: dict, synced_at) -> CatalogFilm:
+    """Собирает несохраненный объект CatalogFilm: актеры обрезаются до TOP_CAST, команда - до ключевых должностей"""
+    details = entry["details"]
+    credits = entry["credits"]
+    release_date = None
+    try:
+        release_date = parse_date(details.get("release_date") or "")
+    except ValueError:
+        pass
+
+    return CatalogFilm(
+        tmdb_id=tmdb_id,
+        title=details.get("title") or "",
+        original_title=details.get("original_title"),
+        release_date=release_date,
+        popularity=details.get("popularity") or 0,
+        genre_ids=[g["id"] for g in details.get("genres", []) if g.get("id")],
+        details=details,
+        credits={
+            "id": tmdb_id,
+            "cast": credits.get("cast", [])[:TOP_CAST],
+            "crew": [c for c in credits.get("crew", []) if c.get("job") in IMPORTANT_JOBS],
+        },
+        keywords=[{"id": k.get("id"), "name": k.get("name")} for k in entry.get("keywords", [])],
+        synced_at=synced_at,
+    )
+
+
+def upsert_catalog(films: list[CatalogFilm], batch_size: int = 500) -> int:
+    """Записывает пачку фильмов в зеркало одним INSERT ... ON CONFLICT (tmdb_id) DO UPDATE на batch"""
+    if not films:
+        return 0
+    CatalogFilm.objects.bulk_create(
+        films,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["tmdb_id"],
+        update_fields=UPDATE_FIELDS,
+    )
+    return len(films)
+
+
+def sync_catalog(tmdb_ids: Iterable[int], *, workers: int = 8, chunk_size: int = 200, rate: float = SYNC_RATE) -> dict:
+    """
+    Синхронизирует зеркало каталога для переданных tmdb_id:
+    фильмы загружаются из TMDB параллельно (workers потоков, не больше rate запросов в секунду на все потоки),
+    сохраняются пачками по chunk_size
+    """
+    api = Tmdb(use_catalog=False)  # зеркало обновляется только из API
+    limiter = RateLimiter(rate)
+    stats = {"requested": 0, "synced": 0, "failed": 0}
+
+    def fetch(tmdb_id):
+        try:
+            return tmdb_id, fetch_catalog_entry(api, tmdb_id, limiter)
+        except Exception:
+            logger.exception("Catalog fetch FAIL: tmdb_id=%s", tmdb_id)
+            return tmdb_id, None
+
+    chunk: list[int] = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for tmdb_id in _dedupe(tmdb_ids):
+            chunk.append(tmdb_id)
+            if len(chunk) >= chunk_size:
+                _sync_chunk(executor, fetch, chunk, stats)
+                chunk = []
+        if chunk:
+            _sync_chunk(executor, fetch, chunk, stats)
+
+    logger.info("Catalog sync: %s", stats)
+    return stats
+
+
+def _sync_chunk(executor, fetch, chunk: list[int], stats: dict) -> None:
+    """Параллельно загружает пачку фильмов и сохраняет ее одним bulk upsert"""
+    synced_at = timezone.now()
+    films = []
+    for tmdb_id, entry in executor.map(fetch, chunk):
+        if entry:
+            films.append(build_catalog_film(tmdb_id, entry, synced_at))
+        else:
+            stats["failed"] += 1
+    stats["requested"] += len(chunk)
+    stats["synced"] += upsert_catalog(films)
+
+
+def _dedupe(tmdb_ids: Iterable[int]) -> Iterator[int]:
+    seen = set()
+    for tmdb_id in tmdb_ids:
+        if tmdb_id and tmdb_id not in seen:
+            seen.add(tmdb_id)
+            yield int(tmdb_id)
+
+
+def ids_to_refresh(limit: int | None = None) -> list[int]:
+    """
+    Возвращает tmdb_id для плановой синхронизации:
+    фильмы библиотек пользователей, которых нет в зеркале, затем устаревшие записи зеркала (самые популярные первыми)
+    """
+    fresh_since = timezone.now() - timedelta(days=CATALOG_MAX_AGE_DAYS)
+    mirrored = CatalogFilm.objects.values("tmdb_id")
+    missing = Film.objects.exclude(tmdb_id__in=mirrored).values_list("tmdb_id", flat=True)
+    stale = (
+        CatalogFilm.objects.filter(synced_at__lt=fresh_since).order_by("-popularity").values_list("tmdb_id", flat=True)
+    )
+    ids = list(missing) + list(stale[:limit] if limit else stale)
+    return ids[:limit] if limit else ids
+
+
+def skip_fresh(tmdb_ids: Iterable[int]) -> Iterator[int]:
+    """Отбрасывает tmdb_id, которые уже свежие в зеркале (одним запросом за множеством свежих id)"""
+    fresh_since = timezone.now() - timedelta(days=CATALOG_MAX_AGE_DAYS)
+    fresh = set(CatalogFilm.objects.filter(synced_at__gte=fresh_since).values_list("tmdb_id", flat=True))
+    return (tmdb_id for tmdb_id in tmdb_ids if tmdb_id not in fresh)
+
+
+def iter_export_ids(path: str | Path, *, min_popularity: float = 0.0, limit: int | None = None) -> Iterator[int]:
+    """
+    Читает ежедневную выгрузку TMDB (movie_ids_MM_DD_YYYY.json.gz, JSON Lines) и отдает tmdb_id:
+    фильмы для взрослых, видео и фильмы с популярностью ниже порога пропускаются;
+    limit - взять только limit самых популярных (в памяти держится не больше limit записей)
+    """
+    items = _iter_export_items(path, min_popularity)
+    if limit:
+        return iter([tmdb_id for _, tmdb_id in nlargest(limit, items)])
+    return (tmdb_id for _, tmdb_id in items)
+
+
+def _iter_export_items(path: str | Path, min_popularity: float) -> Iterator[tuple[float, int]]:
+    """Построчно читает gzip-выгрузку и отдает пары (popularity, tmdb_id)"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            popularity = item.get("popularity") or 0
+            if item.get("adult") or item.get("video") or popularity < min_popularity:
+                continue
+            if item.get("id"):
+                yield popularity, item["id"]
+
+
+def download_id_export(day: date | None = None, dest_dir: str | Path | None = None) -> Path:
+    """Скачивает потоково ежедневную выгрузку id фильмов TMDB (по умолчанию - за вчера) и возвращает путь к файлу"""
+    day = day or (timezone.now().date() - timedelta(days=1))
+    url = EXPORT_URL.format(day=day)
+    dest = Path(dest_dir or tempfile.gettempdir()) / f"movie_ids_{day:%m_%d_%Y}.json.gz"
+
+    try:
+        with requests.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(dest, "wb") as f:
+                for block in response.iter_content(chunk_size=1024 * 64):
+                    f.write(block)
+    except Exception:
+        dest.unlink(missing_ok=True)  # не оставляем недокачанный файл
+        raise
+    logger.info("Catalog export downloaded: %s", dest)
+    return dest
+
+
+@contextmanager
+def id_export(day: date | None = None, dest_dir: str | Path | None = None) -> Iterator[Path]:
+    """Скачивает ежедневную выгрузку id (download_id_export) и удаляет файл после использования"""
+    path = download_id_export(day, dest_dir)
+    try:
+        yield path
+    finally:
+        path.unlink(missing_ok=True)
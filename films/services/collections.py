@@ -0,0 +1,98 @@
+import logging
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+
+from films.models import Film
+from films.services.builders import build_tmdb_collection_cards
+from films.services.film_statuses import get_status_resolver
+from services.tmdb import Tmdb
+from services.tmdb_deadline import is_exhausted
+
+logger = logging.getLogger("filmdiary.films")
+
+SNAPSHOT_TTL = 60 * 60 * 3  # 3 часа: задача обновляет снимки каждые 30 минут, запас на случай простоя воркера
+
+TMDB_PAGE_SIZE = 20  # фильмов на странице списков TMDB
+
+# подборка: (заголовок страницы, число страниц TMDB, загрузка фильмов из TMDB)
+COLLECTIONS = {
+    "popular": ("Популярные фильмы", 3, lambda tmdb, pages: tmdb.get_popular(pages=pages)),
+    "now_playing": ("Сейчас в кино", 2, lambda tmdb, pages: tmdb.get_now_playing(pages=pages)),
+    "upcoming": ("Скоро в кино", 2, lambda tmdb, pages: tmdb.get_upcoming(pages=pages)),
+    "trending": ("Тренды недели", 1, lambda tmdb, pages: tmdb.get_trending().get("results", [])),
+    "top_rated": ("Топ-рейтинговые фильмы", 2, lambda tmdb, pages: tmdb.get_top_rated(pages=pages)),
+}
+
+
+def snapshot_key(name: str) -> str:
+    return f"collection:snapshot:{name}"
+
+
+def build_snapshot(name: str) -> tuple[list[dict], bool]:
+    """
+    Карточки подборки без статусов пользователя - общие для всех, и признак полноты: все страницы TMDB
+    загружены и бюджет запроса не исчерпан
+    """
+    _, pages, load = COLLECTIONS[name]
+    results = load(Tmdb(), pages)
+    complete = not is_exhausted() and len(results) >= pages * TMDB_PAGE_SIZE
+    return build_tmdb_collection_cards(results, user=None), complete
+
+
+def refresh_snapshot(name: str) -> int:
+    """
+    Пересобирает снимок подборки. Неполный ответ TMDB (ошибка на одной из страниц, бюджет запроса)
+    не затирает более полный прежний снимок, пустой - не сохраняется вовсе
+    """
+    cards, complete = build_snapshot(name)
+    if cards and (complete or len(cards) >= len(cache.get(snapshot_key(name)) or [])):
+        cache.set(snapshot_key(name), cards, SNAPSHOT_TTL)
+    return len(cards)
+
+
+def refresh_all_snapshots() -> dict[str, int]:
+    stats = {}
+    for name in COLLECTIONS:
+        try:
+            stats[name] = refresh_snapshot(name)
+        except Exception:
+            logger.exception("Collection snapshot FAIL: %s", name)
+            stats[name] = 0
+    return stats
+
+
+def get_snapshot(name: str) -> list[dict]:
+    """
+    Снимок подборки из кэша; если задача его еще не собрала - собирается на месте. Сохраняется только полный:
+    урезанный бюджетом страницы снимок иначе показывался бы всем до следующего обновления
+    """
+    cards = cache.get(snapshot_key(name))
+    if cards is None:
+        cards, complete = build_snapshot(name)
+        if cards and complete:
+            cache.set(snapshot_key(name), cards, SNAPSHOT_TTL)
+    return cards
+
+
+def apply_status_overlay(cards: list[dict], user) -> list[dict]:
+    """
+    Накладывает статусы пользователя на карточки снимка: один запрос id фильмов из БД (фильм мог появиться
+    в БД после сборки снимка) и одна загрузка резолвера статусов на все карточки
+    """
+    statuses = get_status_resolver(user)
+    if not cards or not statuses.enabled:
+        return cards
+    film_ids = dict(Film.objects.filter(tmdb_id__in=[c["tmdb_id"] for c in cards]).values_list("tmdb_id", "id"))
+    statuses.load(film_ids.values())
+    return [
+        {**card, **statuses.card_status(film_ids[card["tmdb_id"]])} if card["tmdb_id"] in film_ids else card
+        for card in cards
+    ]
+
+
+def get_collection_page(name: str, user, page_number=1, per_page: int = 12) -> Page:
+    """Страница подборки: срез общего снимка + статусы пользователя только для видимых карточек"""
+    page = Paginator(get_snapshot(name), per_page).get_page(page_number)
+    page.object_list = apply_status_overlay(list(page.object_list), user)
+    return page
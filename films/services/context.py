@@ -1,6 +1,33 @@
 from datetime import datetime
 
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils import timezone
+
+from calendar_events.models import CalendarEvent
+from films.models import Film, FilmActor, FilmCrew, UserFilm
 from films.services.utils import format_nums
+from reviews.models import Review
+
+CREW_JOBS = ("Director", "Writer", "Composer", "Producer")  # должности, которые показывает film_detail.html
+
+
+def film_detail_queryset(user):
+    """
+    План загрузки фильма для film_detail.html: жанры, актеры и ключевая команда (через промежуточные модели
+    с select_related), UserFilm и отзыв пользователя (to_attr) и признак запланированного просмотра (Exists).
+    Итого 6 запросов независимо от размера каста
+    """
+    return Film.objects.annotate(
+        is_planned=Exists(
+            CalendarEvent.objects.filter(user=user, film=OuterRef("pk"), planned_date__gte=timezone.localdate())
+        )
+    ).prefetch_related(
+        "genres",
+        Prefetch("filmactor_set", queryset=FilmActor.objects.select_related("actor")),
+        Prefetch("filmcrew_set", queryset=FilmCrew.objects.select_related("person").filter(job__in=CREW_JOBS)),
+        Prefetch("user_relations", queryset=UserFilm.objects.filter(user=user), to_attr="user_films"),
+        Prefetch("reviews", queryset=Review.objects.filter(user=user), to_attr="user_reviews"),
+    )
 
 
 def build_film_context(*, film=None, tmdb_data=None, credits=None):
@@ -23,7 +50,7 @@ def build_film_context(*, film=None, tmdb_data=None, credits=None):
                     "character": f_a.character,
                     "photo": f_a.actor.profile_path,
                 }
-                for f_a in film.filmactor_set.select_related("actor").all()
+                for f_a in film.filmactor_set.all()
             ],
             "director": [d.person.name for d in get_crew_by_job(film, "Director")],
             "writer": [w.person.name for w in get_crew_by_job(film, "Writer")],
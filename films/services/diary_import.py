@@ -0,0 +1,364 @@
+import contextvars
+import csv
+import io
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import islice
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import ExtractYear, Lower
+from django.utils import timezone
+
+from films.models import CatalogFilm, DiaryImport, Film, UserFilm
+from films.services.save_film import ingest_film
+from films.services.tmdb_movie_payload import PAYLOAD_WORKERS, get_tmdb_movie_payloads
+from reviews.models import Review
+from services.tmdb import Tmdb
+from services.user_stats import deferred_stats
+
+logger = logging.getLogger("filmdiary.films")
+
+BATCH_SIZE = 100  # строк файла на один шаг: поиск в БД, запросы к TMDB и bulk_create
+MAX_FILE_SIZE = 5 * 1024 * 1024
+MAX_UNRESOLVED = 200  # сколько ненайденных строк показываем пользователю
+SOURCES = ("letterboxd", "imdb")
+
+IMDB_ID_RE = re.compile(r"^tt\d+$")
+IMDB_SKIP_TYPES = ("series", "episode", "game")  # в выгрузке IMDb есть сериалы и игры - их не импортируем
+# пульс пишется после каждого пакета, а CELERY_TASK_TIME_LIMIT - 30 минут: дольше без движения живой импорт не бывает
+STALE_IMPORT_AFTER = timedelta(minutes=getattr(settings, "DIARY_IMPORT_STALE_MINUTES", 40))
+
+
+def detect_source(header: list[str]) -> str:
+    """Определяет источник выгрузки по заголовку CSV"""
+    if "Const" in header:
+        return "imdb"
+    if "Letterboxd URI" in header or "Name" in header:
+        return "letterboxd"
+    raise ValueError("Файл не похож на выгрузку Letterboxd или IMDb")
+
+
+def _parse_date(value: str | None) -> date | None:
+    try:
+        return date.fromisoformat((value or "").strip()[:10])
+    except ValueError:
+        return None
+
+
+def _parse_year(value: str | None) -> int | None:
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def _parse_rating(value: str | None, scale: float) -> float | None:
+    """Оценка в шкале дневника 1-10; scale - множитель шкалы источника (звезды Letterboxd 0.5-5 -> x2)"""
+    try:
+        rating = float((value or "").strip()) * scale
+    except ValueError:
+        return None
+    return min(max(rating, 1), 10) if rating > 0 else None
+
+
+def parse_row(source: str, row: dict) -> dict | None:
+    """
+    Приводит строку выгрузки к общему виду: title, year, imdb_id, rating (1-10), watched_at, review.
+    None - строку нельзя импортировать (нет названия, сериал IMDb)
+    """
+    if source == "imdb":
+        title_type = (row.get("Title Type") or "").lower()
+        if any(skip in title_type for skip in IMDB_SKIP_TYPES):
+            return None
+        imdb_id = (row.get("Const") or "").strip()
+        parsed = {
+            "title": (row.get("Title") or row.get("Original Title") or "").strip(),
+            "year": _parse_year(row.get("Year")),
+            "imdb_id": imdb_id if IMDB_ID_RE.match(imdb_id) else None,
+            "rating": _parse_rating(row.get("Your Rating"), 1),
+            "watched_at": _parse_date(row.get("Date Rated")),
+            "review": "",
+        }
+    else:
+        parsed = {
+            "title": (row.get("Name") or "").strip(),
+            "year": _parse_year(row.get("Year")),
+            "imdb_id": None,
+            "rating": _parse_rating(row.get("Rating"), 2),
+            "watched_at": _parse_date(row.get("Watched Date")) or _parse_date(row.get("Date")),
+            "review": (row.get("Review") or "").strip(),
+        }
+    return parsed if parsed["title"] or parsed["imdb_id"] else None
+
+
+def read_rows(file) -> tuple[str, Iterator[dict]]:
+    """Читает CSV потоково (файл не загружается в память целиком): (источник, итератор разобранных строк)"""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    source = detect_source(reader.fieldnames or [])
+    rows = (parse_row(source, row) for row in reader)
+    return source, (row for row in rows if row)
+
+
+def count_rows(file) -> int:
+    """Число строк данных в файле - для прогресса импорта"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    total = max(sum(1 for _ in csv.reader(text)) - 1, 0)
+    text.detach()
+    file.seek(0)
+    return total
+
+
+def iter_batches(rows: Iterable[dict], size: int = BATCH_SIZE) -> Iterator[list[dict]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _title_key(title: str | None) -> str:
+    return (title or "").strip().lower()
+
+
+def _resolve_locally(rows: list[dict]) -> dict[int, int]:
+    """
+    Сопоставление строк с tmdb_id по локальным данным: id IMDb в зеркале каталога, затем название + год
+    среди фильмов БД и зеркала. Возвращает {индекс строки: tmdb_id}
+    """
+    resolved = {}
+    imdb_ids = {row["imdb_id"] for row in rows if row["imdb_id"]}
+    if imdb_ids:
+        by_imdb = dict(
+            CatalogFilm.objects.filter(details__imdb_id__in=imdb_ids).values_list("details__imdb_id", "tmdb_id")
+        )
+        resolved = {i: by_imdb[row["imdb_id"]] for i, row in enumerate(rows) if row["imdb_id"] in by_imdb}
+
+    titles = {_title_key(row["title"]) for i, row in enumerate(rows) if i not in resolved and row["title"]}
+    if not titles:
+        return resolved
+
+    # (название в нижнем регистре, год) -> tmdb_id; год None - первый найденный фильм с таким названием
+    by_title = {}
+    for model in (Film, CatalogFilm):
+        for field in ("title", "original_title"):
+            matches = (
+                model.objects.annotate(key=Lower(field), year=ExtractYear("release_date"))
+                .filter(key__in=titles)
+                .values_list("key", "year", "tmdb_id")
+            )
+            for key, year, tmdb_id in matches:
+                by_title.setdefault((key, year), tmdb_id)
+                by_title.setdefault((key, None), tmdb_id)
+
+    for i, row in enumerate(rows):
+        if i not in resolved:
+            tmdb_id = by_title.get((_title_key(row["title"]), row["year"]))
+            if tmdb_id:
+                resolved[i] = tmdb_id
+    return resolved
+
+
+def _lookup_tmdb(api: Tmdb, row: dict) -> int | None:
+    """Поиск фильма в TMDB: по id IMDb, иначе по названию и году. Ответы кэширует клиент Tmdb"""
+    if row["imdb_id"]:
+        results = (api.find_by_imdb_id(row["imdb_id"]) or {}).get("movie_results") or []
+        if results:
+            return results[0].get("id")
+    if not row["title"]:
+        return None
+    results = (api.search_movie(row["title"], year=row["year"]) or {}).get("results") or []
+    return results[0].get("id") if results else None
+
+
+def resolve_batch(rows: list[dict], workers: int = PAYLOAD_WORKERS) -> dict[int, int]:
+    """
+    Сопоставляет строки пакета с tmdb_id: сначала локальная БД и зеркало каталога,
+    для оставшихся - параллельные запросы к TMDB. Возвращает {индекс строки: tmdb_id}
+    """
+    resolved = _resolve_locally(rows)
+    misses = [i for i in range(len(rows)) if i not in resolved]
+    if not misses:
+        return resolved
+
+    api = Tmdb()
+    with ThreadPoolExecutor(max_workers=min(workers, len(misses))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _lookup_tmdb, api, rows[i]) for i in misses]
+        for i, future in zip(misses, futures):
+            try:
+                tmdb_id = future.result()
+            except Exception as e:
+                logger.warning("Import lookup FAIL: title=%s error=%s", rows[i]["title"], e)
+                continue
+            if tmdb_id:
+                resolved[i] = tmdb_id
+    return resolved
+
+
+def _ensure_films(tmdb_ids: list[int]) -> dict[int, int]:
+    """{tmdb_id: film_id}; фильмы, которых нет в БД, загружаются из TMDB одним пакетом и сохраняются ingest_film"""
+    films = dict(Film.objects.filter(tmdb_id__in=tmdb_ids).values_list("tmdb_id", "id"))
+    missing = [tmdb_id for tmdb_id in tmdb_ids if tmdb_id not in films]
+    payloads = get_tmdb_movie_payloads(missing) if missing else {}
+    for tmdb_id, payload in payloads.items():
+        if "details" in payload and not payload.get("partial"):
+            film, _ = ingest_film(tmdb_id, payload["details"], payload["credits"])
+            films[tmdb_id] = film.id
+    return films
+
+
+def import_batch(user, rows: list[dict], resolved: dict[int, int]) -> tuple[int, int]:
+    """
+    Сохраняет пакет: фильмы (ingest_film), библиотеку (UserFilm) и оценки (Review) через bulk_create.
+    Существующие записи пользователя не перезаписываются. Возвращает (добавлено фильмов, добавлено оценок)
+    """
+    films = _ensure_films(list(dict.fromkeys(resolved.values())))
+
+    # в дневнике Letterboxd фильм может встречаться несколько раз - берем последний просмотр
+    rated = {}
+    for i, tmdb_id in resolved.items():
+        row = rows[i]
+        if tmdb_id in films and row["rating"]:
+            previous = rated.get(films[tmdb_id])
+            if not previous or (row["watched_at"] or date.min) >= (previous["watched_at"] or date.min):
+                rated[films[tmdb_id]] = row
+
+    film_ids = {films[tmdb_id] for tmdb_id in resolved.values() if tmdb_id in films}
+    today = timezone.localdate()
+    with transaction.atomic(), deferred_stats(user.id):
+        in_library = set(UserFilm.objects.filter(user=user, film_id__in=film_ids).values_list("film_id", flat=True))
+        reviewed = set(Review.objects.filter(user=user, film_id__in=list(rated)).values_list("film_id", flat=True))
+
+        UserFilm.objects.bulk_create(
+            [UserFilm(user=user, film_id=film_id) for film_id in film_ids - in_library], ignore_conflicts=True
+        )
+        # bulk_create не вызывает Review.save(): общий рейтинг задаем явно, все критерии - оценкой источника
+        Review.objects.bulk_create(
+            [
+                Review(
+                    user=user,
+                    film_id=film_id,
+                    watched_at=row["watched_at"] or today,
+                    plot_rating=row["rating"],
+                    acting_rating=row["rating"],
+                    directing_rating=row["rating"],
+                    visuals_rating=row["rating"],
+                    soundtrack_rating=row["rating"],
+                    user_rating=row["rating"],
+                    review=row["review"],
+                )
+                for film_id, row in rated.items()
+                if film_id not in reviewed
+            ],
+            ignore_conflicts=True,
+        )
+    return len(film_ids - in_library), len(set(rated) - reviewed)
+
+
+def _describe(row: dict) -> str:
+    title = row["title"] or row["imdb_id"]
+    return f"{title} ({row['year']})" if row["year"] else title
+
+
+def run_import(import_id: int) -> DiaryImport | None:
+    """
+    Выполняет импорт дневника пакетами по BATCH_SIZE строк; после каждого пакета сохраняет прогресс,
+    который читает страница импорта. Файл удаляется, как только импорт завершен или упал
+    """
+    diary_import = DiaryImport.objects.select_related("user").filter(id=import_id).first()
+    # захват PENDING -> RUNNING одним UPDATE: повторно поставленная задача не запустит импорт второй раз
+    if not diary_import or not _update(import_id, status=DiaryImport.Status.RUNNING, only_pending=True):
+        return diary_import
+
+    progress = {"processed": 0, "imported": 0, "reviews": 0}
+    unresolved = []
+    try:
+        with diary_import.file.open("rb") as file:
+            total = count_rows(file)
+            source, rows = read_rows(file)
+            _update(import_id, source=source, total=total)
+            for batch in iter_batches(rows):
+                resolved = resolve_batch(batch)
+                imported, reviews = import_batch(diary_import.user, batch, resolved)
+                progress["processed"] += len(batch)
+                progress["imported"] += imported
+                progress["reviews"] += reviews
+                unresolved += [_describe(row) for i, row in enumerate(batch) if i not in resolved]
+                _update(import_id, **progress, unresolved=unresolved[:MAX_UNRESOLVED])
+    except Exception as e:
+        logger.exception("Import FAIL: import=%s", import_id)
+        _finish(diary_import, status=DiaryImport.Status.FAILED, error=str(e)[:255])
+    else:
+        _finish(diary_import, status=DiaryImport.Status.DONE)
+        logger.info("Import OK: import=%s source=%s %s unresolved=%s", import_id, source, progress, len(unresolved))
+
+    diary_import.refresh_from_db()
+    return diary_import
+
+
+def _update(import_id: int, only_pending: bool = False, **fields) -> int:
+    """UPDATE без save(): auto_now не срабатывает, поэтому updated_at (пульс импорта) проставляется явно"""
+    qs = DiaryImport.objects.filter(id=import_id)
+    if only_pending:
+        qs = qs.filter(status=DiaryImport.Status.PENDING)
+    return qs.update(**fields, updated_at=timezone.now())
+
+
+def _finish(diary_import: DiaryImport, **fields) -> None:
+    """Финальный статус и удаление загруженного файла: личный дневник не хранится после импорта"""
+    _update(diary_import.id, **fields, finished_at=timezone.now(), file="")
+    if diary_import.file:
+        diary_import.file.delete(save=False)
+
+
+def recover_stale_imports() -> tuple[int, int]:
+    """
+    Импорты, чья задача потерялась: PENDING без движения дольше STALE_IMPORT_AFTER снова ставятся в очередь,
+    RUNNING без пульса дольше STALE_IMPORT_AFTER (воркер убит или перезапущен) завершаются с ошибкой
+    """
+    border = timezone.now() - STALE_IMPORT_AFTER
+    stale = DiaryImport.objects.filter(updated_at__lt=border)
+
+    pending_ids = list(stale.filter(status=DiaryImport.Status.PENDING).values_list("id", flat=True))
+    if pending_ids:
+        DiaryImport.objects.filter(id__in=pending_ids).update(updated_at=timezone.now())
+        for import_id in pending_ids:
+            enqueue_import(import_id)
+
+    running = list(stale.filter(status=DiaryImport.Status.RUNNING))
+    for diary_import in running:
+        _finish(diary_import, status=DiaryImport.Status.FAILED, error="Импорт прерван, загрузите файл еще раз")
+    return len(pending_ids), len(running)
+
+
+def start_import(user, file) -> DiaryImport:
+    """Сохраняет файл и ставит задачу импорта после commit"""
+    diary_import = DiaryImport.objects.create(user=user, file=file)
+    transaction.on_commit(lambda: enqueue_import(diary_import.id))
+    return diary_import
+
+
+def enqueue_import(import_id: int) -> None:
+    from films.tasks import import_diary
+
+    try:
+        import_diary.delay(import_id)
+    except Exception as e:
+        logger.warning("Import enqueue FAIL: import=%s error=%s", import_id, e)
+        diary_import = DiaryImport.objects.filter(id=import_id).first()
+        if diary_import:
+            _finish(diary_import, status=DiaryImport.Status.FAILED, error="Очередь задач недоступна, попробуйте позже")
+
+
+def import_status(diary_import: DiaryImport) -> dict:
+    """Прогресс импорта для опроса из интерфейса"""
+    return {
+        "id": diary_import.id,
+        "status": diary_import.status,
+        "source": diary_import.source,
+        "total": diary_import.total,
+        "processed": diary_import.processed,
+        "imported": diary_import.imported,
+        "reviews": diary_import.reviews,
+        "unresolved": diary_import.unresolved,
+        "message": diary_import.error,
+    }
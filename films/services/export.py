@@ -0,0 +1,148 @@
+import csv
+import json
+import zlib
+from typing import Iterator
+
+from calendar_events.models import CalendarEvent
+from films.models import UserFilm
+from reviews.models import Review
+
+CHUNK_SIZE = 2000  # строк на один запрос к БД при обходе .iterator()
+FLUSH_BYTES = 64 * 1024  # отдаем клиенту кусками примерно такого размера
+FORMATS = ("csv", "json")
+
+FIELDS = [
+    "kind",
+    "tmdb_id",
+    "title",
+    "original_title",
+    "release_date",
+    "added_at",
+    "is_favorite",
+    "watched_at",
+    "user_rating",
+    "plot_rating",
+    "acting_rating",
+    "directing_rating",
+    "visuals_rating",
+    "soundtrack_rating",
+    "number_of_views",
+    "review",
+    "planned_date",
+    "note",
+]
+
+
+def _film_fields(film) -> dict:
+    return {
+        "tmdb_id": film.tmdb_id,
+        "title": film.title,
+        "original_title": film.original_title,
+        "release_date": film.release_date.isoformat() if film.release_date else None,
+    }
+
+
+def iter_library(user) -> Iterator[dict]:
+    """Фильмы библиотеки пользователя"""
+    qs = UserFilm.objects.filter(user=user).select_related("film").order_by("created_at", "id")
+    for uf in qs.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "kind": "film",
+            **_film_fields(uf.film),
+            "added_at": uf.created_at.isoformat(),
+            "is_favorite": uf.is_favorite,
+        }
+
+
+def iter_reviews(user) -> Iterator[dict]:
+    """Оценки и отзывы пользователя"""
+    qs = Review.objects.filter(user=user).select_related("film").order_by("watched_at", "id")
+    for r in qs.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "kind": "review",
+            **_film_fields(r.film),
+            "watched_at": r.watched_at.isoformat(),
+            "user_rating": r.user_rating,
+            "plot_rating": r.plot_rating,
+            "acting_rating": r.acting_rating,
+            "directing_rating": r.directing_rating,
+            "visuals_rating": r.visuals_rating,
+            "soundtrack_rating": r.soundtrack_rating,
+            "number_of_views": r.number_of_views,
+            "review": r.review,
+        }
+
+
+def iter_calendar(user) -> Iterator[dict]:
+    """Запланированные просмотры пользователя"""
+    qs = CalendarEvent.objects.filter(user=user).select_related("film").order_by("planned_date", "id")
+    for e in qs.iterator(chunk_size=CHUNK_SIZE):
+        yield {"kind": "planned", **_film_fields(e.film), "planned_date": e.planned_date.isoformat(), "note": e.note}
+
+
+SECTIONS = [("films", iter_library), ("reviews", iter_reviews), ("calendar", iter_calendar)]
+
+
+class _Echo:
+    """Псевдобуфер для csv.writer: write возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(user) -> Iterator[str]:
+    """Один CSV на весь дневник: колонка kind (film / review / planned) различает записи"""
+    writer = csv.DictWriter(_Echo(), fieldnames=FIELDS, extrasaction="ignore")
+    yield writer.writeheader()
+    for _, rows in SECTIONS:
+        for row in rows(user):
+            yield writer.writerow(row)
+
+
+def iter_json(user) -> Iterator[str]:
+    """JSON-объект {"films": [...], "reviews": [...], "calendar": [...]}, записываемый по одной записи"""
+    yield "{"
+    for i, (name, rows) in enumerate(SECTIONS):
+        yield f'{"," if i else ""}"{name}": ['
+        for j, row in enumerate(rows(user)):
+            row.pop("kind")
+            yield ("," if j else "") + json.dumps(row, ensure_ascii=False)
+        yield "]"
+    yield "}\n"
+
+
+def _buffered(parts: Iterator[str]) -> Iterator[bytes]:
+    """Склеивает мелкие строки в куски по FLUSH_BYTES: меньше системных вызовов и gzip-блоков"""
+    buffer, size = [], 0
+    for part in parts:
+        data = part.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _gzipped(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Потоковое gzip-сжатие без накопления всего файла в памяти"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 - формат gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_diary(user, fmt: str = "csv", gzip: bool = False) -> Iterator[bytes]:
+    """Потоковая выгрузка дневника пользователя: библиотека, отзывы, календарь. Память не зависит от объема"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Формат должен быть одним из {FORMATS}")
+    chunks = _buffered(iter_csv(user) if fmt == "csv" else iter_json(user))
+    return _gzipped(chunks) if gzip else chunks
+
+
+def export_filename(user, fmt: str, gzip: bool = False) -> str:
+    """Имя файла выгрузки"""
+    return f"filmdiary_{user.username}.{fmt}{'.gz' if gzip else ''}"
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+from calendar_events.models import CalendarEvent
+from films.models import UserFilm
+from reviews.models import Review
+
+DB_CONTEXT_TTL = 60 * 60 * 24  # 24 часа: фильм из БД меняется только при обновлении строки - тогда меняется версия
+TMDB_CONTEXT_TTL = 60 * 60 * 12  # 12 часов, как и сам ответ TMDB (PAYLOAD_TTL)
+
+
+def _version_key(tmdb_id: int) -> str:
+    return f"film_ctx:version:{tmdb_id}"
+
+
+def _context_key(tmdb_id: int, version: int) -> str:
+    return f"film_ctx:{tmdb_id}:v{version}"
+
+
+def get_shared_context(tmdb_id: int) -> tuple[dict | None, int]:
+    """
+    Общая для всех пользователей часть контекста film_detail.html (результат build_film_context) и версия фильма.
+    Ключ содержит версию фильма: после обновления строки Film старая запись просто перестает читаться
+    """
+    version = cache.get(_version_key(tmdb_id)) or 0
+    return cache.get(_context_key(tmdb_id, version)), version
+
+
+def set_shared_context(tmdb_id: int, film_data: dict, version: int) -> None:
+    """
+    Сохраняет контекст под версией, прочитанной в get_shared_context до его построения: если пока шел запрос
+    к TMDB фильм сохранили в БД и версия выросла, устаревший контекст уйдет под старую версию и не будет прочитан
+    """
+    ttl = DB_CONTEXT_TTL if film_data["source"] == "db" else TMDB_CONTEXT_TTL
+    cache.set(_context_key(tmdb_id, version), film_data, ttl)
+
+
+def invalidate_film_context(tmdb_id: int) -> int:
+    """Увеличивает версию контекста фильма: вызывается при сохранении Film (в том числе при первом сохранении)"""
+    key = _version_key(tmdb_id)
+    try:
+        version = cache.incr(key)
+    except ValueError:  # ключа еще нет
+        version = 1
+        cache.set(key, version, None)
+    return version
+
+
+def get_user_overlay(user, tmdb_id: int) -> tuple[UserFilm | None, Review | None, bool]:
+    """
+    Пользовательская часть страницы фильма из БД: (UserFilm, отзыв, запланирован ли просмотр).
+    Отзыв учитывается только для фильма из библиотеки - как и на странице без кэша
+    """
+    user_film = UserFilm.objects.filter(user=user, film__tmdb_id=tmdb_id).first()
+    review = Review.objects.filter(user=user, film__tmdb_id=tmdb_id).first() if user_film else None
+    is_planned = CalendarEvent.objects.filter(
+        user=user, film__tmdb_id=tmdb_id, planned_date__gte=timezone.localdate()
+    ).exists()
+    return user_film, review, is_planned
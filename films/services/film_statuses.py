@@ -0,0 +1,113 @@
+from contextvars import ContextVar
+from typing import Iterable
+
+from django.utils import timezone
+
+from calendar_events.models import CalendarEvent
+from films.models import UserFilm
+from films.services.user_film_services import map_status
+from reviews.models import Review
+
+_scope: ContextVar[dict | None] = ContextVar("film_status_scope", default=None)
+
+
+class FilmStatusResolver:
+    """
+    Статусы фильмов пользователя: UserFilm, отзыв и запланированный просмотр по id фильма.
+    load() добирает недостающие фильмы тремя запросами на весь набор, загруженное запоминается -
+    карточки и списки одной страницы повторно в БД не ходят
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._user_films: dict[int, UserFilm] = {}
+        self._reviews: dict[int, Review] = {}
+        self._planned: set[int] = set()
+        self._loaded: set[int] = set()
+        self._known_user_films: set[int] = set()
+        self._known_reviews: set[int] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.user and self.user.is_authenticated)
+
+    def prime(self, *, user_films: Iterable[UserFilm] = (), reviews: Iterable[Review] = ()) -> None:
+        """Запоминает уже загруженные представлением объекты, чтобы load() не запрашивал их повторно"""
+        for uf in user_films:
+            self._user_films[uf.film_id] = uf
+            self._known_user_films.add(uf.film_id)
+        for review in reviews:
+            self._reviews[review.film_id] = review
+            self._known_reviews.add(review.film_id)
+
+    def load(self, film_ids: Iterable[int]) -> None:
+        """Загружает статусы фильмов, которых еще нет в памяти (не больше трех запросов)"""
+        missing = {film_id for film_id in film_ids if film_id} - self._loaded
+        if not missing or not self.enabled:
+            self._loaded |= missing
+            return
+
+        need_user_films = missing - self._known_user_films
+        if need_user_films:
+            for uf in UserFilm.objects.filter(user=self.user, film_id__in=need_user_films):
+                self._user_films[uf.film_id] = uf
+
+        need_reviews = missing - self._known_reviews
+        if need_reviews:
+            for review in Review.objects.filter(user=self.user, film_id__in=need_reviews):
+                self._reviews[review.film_id] = review
+
+        self._planned |= set(
+            CalendarEvent.objects.filter(
+                user=self.user, film_id__in=missing, planned_date__gte=timezone.localdate()
+            ).values_list("film_id", flat=True)
+        )
+        self._loaded |= missing
+
+    def user_film(self, film_id: int) -> UserFilm | None:
+        self.load([film_id])
+        return self._user_films.get(film_id)
+
+    def review(self, film_id: int) -> Review | None:
+        self.load([film_id])
+        return self._reviews.get(film_id)
+
+    def is_planned(self, film_id: int) -> bool:
+        self.load([film_id])
+        return film_id in self._planned
+
+    def card_status(self, film_id: int) -> dict:
+        """Статус для карточки фильма: in_library + поля map_status"""
+        user_film = self.user_film(film_id)
+        review = self.review(film_id)
+        return {
+            "in_library": bool(user_film),
+            **map_status(
+                user_film=user_film,
+                has_review=bool(review),
+                rating=review.user_rating if review else None,
+            ),
+        }
+
+
+def start_status_scope() -> object:
+    """Открывает область запроса: резолверы статусов живут до end_status_scope"""
+    return _scope.set({})
+
+
+def end_status_scope(token) -> None:
+    _scope.reset(token)
+
+
+def get_status_resolver(user) -> FilmStatusResolver:
+    """
+    Резолвер статусов пользователя, общий для всех построителей карточек и списков текущего HTTP-запроса.
+    Вне запроса (Celery, команды) - новый резолвер при каждом вызове
+    """
+    scope = _scope.get()
+    if scope is None:
+        return FilmStatusResolver(user)
+    key = user.pk if user and user.is_authenticated else None
+    if key not in scope:
+        scope[key] = FilmStatusResolver(user)
+    return scope[key]
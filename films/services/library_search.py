@@ -0,0 +1,39 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from films.models import Film
+
+# Поиск по films_film на PostgreSQL (колонка и индексы - миграция 0011_film_search):
+# - search_vector: генерируемая tsvector-колонка (title, original_title, overview) с GIN-индексом,
+#   морфология русского для названия и описания, 'simple' для оригинального названия;
+# - GIN-индексы pg_trgm по title и original_title: нечеткое совпадение (<%) и ILIKE по подстроке
+POSTGRES_MATCH_SQL = """
+    SELECT id FROM films_film
+    WHERE search_vector @@ (websearch_to_tsquery('russian', %s) || websearch_to_tsquery('simple', %s))
+       OR %s <%% title OR %s <%% original_title
+       OR title ILIKE %s OR original_title ILIKE %s
+"""
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def matching_film_ids(query: str):
+    """
+    id фильмов, подходящих под поисковую строку: полнотекстовый поиск + триграммы на PostgreSQL,
+    подстрока в названии, оригинальном названии или описании на остальных БД (sqlite в тестах)
+    """
+    if connection.vendor == "postgresql":
+        like = _like_pattern(query)
+        return RawSQL(POSTGRES_MATCH_SQL, [query, query, query, query, like, like])
+    return Film.objects.filter(
+        Q(title__icontains=query) | Q(original_title__icontains=query) | Q(overview__icontains=query)
+    ).values("id")
+
+
+def film_search_q(query: str, film_field: str = "film") -> Q:
+    """Условие поиска по фильму для любой модели библиотеки (UserFilm, Review, ...) с FK film_field"""
+    return Q(**{f"{film_field}_id__in": matching_film_ids(query)})
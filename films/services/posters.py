@@ -0,0 +1,263 @@
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+import requests
+from PIL import Image
+
+from services.local_cache import LocalLRUCache
+
+logger = logging.getLogger("filmdiary.films")
+
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/"
+SOURCE_SIZE = "w780"  # постер скачивается один раз в этом размере, варианты нарезаются из него
+POSTER_VARIANTS = {  # вариант: ширина в px (совпадает с размерами TMDB для запасной ссылки)
+    "thumbnail": 154,
+    "card": 342,
+    "detail": 500,
+}
+PROFILE_SOURCE_SIZE = "w185"  # фото актеров: у TMDB нет профилей w780
+PROFILE_VARIANTS = {"profile": 92}  # фото в составе актеров на странице фильма
+IMAGE_KINDS = {  # вид картинки: (размер источника TMDB, варианты; последний сохраняется последним)
+    "poster": (SOURCE_SIZE, POSTER_VARIANTS),
+    "profile": (PROFILE_SOURCE_SIZE, PROFILE_VARIANTS),
+}
+POSTER_DIR = "posters"
+WEBP_QUALITY = 80
+PENDING_KEY = "posters:pending:list"  # в Redis - список (прежний ключ posters:pending хранил pickle)
+PENDING_LIMIT = 5000
+QUEUED_TTL = 60 * 60  # повторно ставить постер в очередь не раньше, чем через час
+RESOLVED_TTL = 60  # ссылки постера в памяти процесса: src и srcset одной карточки - одна проверка файла
+
+_resolved = LocalLRUCache(max_size=2048)
+_pending_lock = threading.Lock()  # очередь без Redis (локальный кэш при разработке) - в пределах процесса
+# постеры без локальной копии, показанные за текущий HTTP-запрос: ставятся в очередь одним пакетом в конце
+_batch: ContextVar[list | None] = ContextVar("poster_queue_batch", default=None)
+
+_POSTER_NAME = re.compile(r"^/?([A-Za-z0-9_-]+)\.[a-z]+$")
+
+
+def poster_name(poster_path: str | None) -> str | None:
+    """Имя постера из пути TMDB (/abc123.jpg -> abc123); None для пустого или подозрительного пути"""
+    match = _POSTER_NAME.match(poster_path or "")
+    return match[1] if match else None
+
+
+def variant_relpath(poster_path: str, variant: str) -> str:
+    """Путь варианта постера относительно MEDIA_ROOT"""
+    return f"{POSTER_DIR}/{variant}/{poster_name(poster_path)}.webp"
+
+
+def is_cached(poster_path: str, kind: str = "poster") -> bool:
+    """Есть ли локальные варианты картинки (последний вариант вида сохраняется последним)"""
+    name = poster_name(poster_path)
+    last_variant = list(IMAGE_KINDS[kind][1])[-1]
+    return bool(name) and (Path(settings.MEDIA_ROOT) / variant_relpath(poster_path, last_variant)).exists()
+
+
+def tmdb_poster_url(poster_path: str, variant: str = "card") -> str:
+    """Ссылка на постер (или фото актера) нужной ширины на image.tmdb.org"""
+    width = POSTER_VARIANTS.get(variant) or PROFILE_VARIANTS[variant]
+    return f"{TMDB_IMAGE_BASE}w{width}{poster_path}"
+
+
+def image_urls(path: str | None, kind: str = "poster") -> dict[str, str]:
+    """
+    Ссылки на все варианты картинки: локальные WebP из media, если она уже закэширована,
+    иначе ссылки TMDB, а картинка ставится в очередь на загрузку
+    """
+    if not path:
+        return {}
+    urls = _resolved.get(f"{kind}:{path}")
+    if urls is None:
+        urls = _resolve_urls(path, kind)
+        _resolved.set(f"{kind}:{path}", urls, RESOLVED_TTL)
+    return urls
+
+
+def poster_urls(poster_path: str | None) -> dict[str, str]:
+    """Ссылки на все варианты постера"""
+    return image_urls(poster_path)
+
+
+def _resolve_urls(path: str, kind: str) -> dict[str, str]:
+    variants = IMAGE_KINDS[kind][1]
+    if is_cached(path, kind):
+        return {variant: f"{settings.MEDIA_URL}{variant_relpath(path, variant)}" for variant in variants}
+    entry = queue_entry(path, kind)
+    batch = _batch.get()
+    if batch is None:
+        queue_poster(entry)
+    else:
+        batch.append(entry)
+    return {variant: tmdb_poster_url(path, variant) for variant in variants}
+
+
+def poster_url(poster_path: str | None, variant: str = "card") -> str | None:
+    """Ссылка на один вариант постера"""
+    return poster_urls(poster_path).get(variant)
+
+
+def profile_url(profile_path: str | None) -> str | None:
+    """Ссылка на фото актера: локальный WebP или TMDB"""
+    return image_urls(profile_path, "profile").get("profile")
+
+
+def poster_srcset(poster_path: str | None) -> str:
+    """Значение атрибута srcset: все варианты постера с шириной"""
+    urls = poster_urls(poster_path)
+    return ", ".join(f"{urls[variant]} {width}w" for variant, width in POSTER_VARIANTS.items() if variant in urls)
+
+
+def queue_entry(path: str, kind: str = "poster") -> str:
+    """Элемент очереди загрузки: путь постера как есть (прежний формат), фото актера - с префиксом вида"""
+    return path if kind == "poster" else f"{kind}:{path}"
+
+
+def parse_queue_entry(entry: str) -> tuple[str, str]:
+    """Элемент очереди -> (вид картинки, путь TMDB)"""
+    kind, sep, path = entry.partition(":")
+    return (kind, path) if sep and kind in IMAGE_KINDS else ("poster", entry)
+
+
+def start_poster_batch() -> object:
+    """Открывает пакет очереди постеров для текущего HTTP-запроса"""
+    return _batch.set([])
+
+
+def end_poster_batch(token) -> None:
+    """Ставит в очередь все постеры, показанные за запрос, одним пакетом и закрывает пакет"""
+    entries = _batch.get() or []
+    _batch.reset(token)
+    try:
+        queue_posters(entries)
+    except Exception as e:  # очередь постеров не должна ронять уже готовую страницу
+        logger.warning("Poster queue FAIL: count=%s error=%s", len(entries), e)
+
+
+def _redis():
+    """Клиент Redis кэша Django для атомарных операций со списком очереди; None - кэш не Redis"""
+    backend = caches["default"]
+    if isinstance(backend, RedisCache):
+        return backend._cache.get_client(write=True)
+    return None
+
+
+def _queued_key(entry: str) -> str | None:
+    kind, path = parse_queue_entry(entry)
+    name = poster_name(path)
+    if not name:
+        return None
+    return f"posters:queued:{name}" if kind == "poster" else f"posters:queued:{kind}:{name}"
+
+
+def queue_posters(entries) -> None:
+    """
+    Ставит картинки в очередь фоновой загрузки (каждую не чаще раза в QUEUED_TTL), без обращения к брокеру задач.
+    В Redis - два обращения на весь пакет: SET NX флагов всех картинок одним pipeline, затем RPUSH + LTRIM
+    новых в список (атомарно: параллельные рендеры не теряют постеры друг друга)
+    """
+    flags = {}
+    for entry in entries:
+        key = _queued_key(entry)
+        if key:
+            flags.setdefault(key, entry)
+    if not flags:
+        return
+
+    client = _redis()
+    if client is not None:
+        pipeline = client.pipeline()
+        for key in flags:
+            pipeline.set(cache.make_and_validate_key(key), 1, nx=True, ex=QUEUED_TTL)
+        fresh = [entry for entry, added in zip(flags.values(), pipeline.execute()) if added]
+        if fresh:
+            key = cache.make_and_validate_key(PENDING_KEY)
+            client.pipeline().rpush(key, *fresh).ltrim(key, -PENDING_LIMIT, -1).execute()
+        return
+
+    fresh = [entry for key, entry in flags.items() if cache.add(key, 1, QUEUED_TTL)]
+    if fresh:
+        with _pending_lock:
+            pending = cache.get(PENDING_KEY) or []
+            cache.set(PENDING_KEY, [*pending, *fresh][-PENDING_LIMIT:], None)
+
+
+def queue_poster(entry: str) -> None:
+    """Ставит в очередь одну картинку (вне HTTP-запроса, где нет пакета)"""
+    queue_posters([entry])
+
+
+def pop_pending(limit: int) -> list[str]:
+    """Забирает из очереди до limit постеров (в Redis - LRANGE + LTRIM одной транзакцией MULTI)"""
+    client = _redis()
+    if client is not None:
+        key = cache.make_and_validate_key(PENDING_KEY)
+        pending, _ = client.pipeline(transaction=True).lrange(key, 0, limit - 1).ltrim(key, limit, -1).execute()
+        return list(dict.fromkeys(path.decode() for path in pending))
+    with _pending_lock:
+        pending = cache.get(PENDING_KEY) or []
+        cache.set(PENDING_KEY, pending[limit:], None)
+    return list(dict.fromkeys(pending[:limit]))
+
+
+def cache_poster(poster_path: str, kind: str = "poster") -> bool:
+    """
+    Скачивает картинку из TMDB и сохраняет WebP-варианты в media/posters/<вариант>/. True - картинка в кэше
+    """
+    if not poster_name(poster_path):
+        return False
+    if is_cached(poster_path, kind):
+        return True
+
+    source_size, variants = IMAGE_KINDS[kind]
+    response = requests.get(f"{TMDB_IMAGE_BASE}{source_size}{poster_path}", timeout=10)
+    response.raise_for_status()
+    with Image.open(BytesIO(response.content)) as source:
+        source = source.convert("RGB")
+        for variant, width in variants.items():  # последний вариант - последним: по нему is_cached
+            image = source.copy()
+            image.thumbnail((width, width * 3))
+            _save_atomic(image, Path(settings.MEDIA_ROOT) / variant_relpath(poster_path, variant))
+    return True
+
+
+def _save_atomic(image: Image.Image, dest: Path) -> None:
+    """Сохраняет WebP через временный файл, чтобы nginx не отдал недописанный постер"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, "WEBP", quality=WEBP_QUALITY, method=6)
+        os.replace(tmp, dest)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+def cache_posters(entries, workers: int = 4) -> dict:
+    """Загружает и нарезает картинки из очереди (постеры и фото актеров) параллельно. Возвращает статистику"""
+    stats = {"cached": 0, "failed": 0}
+
+    def fetch(entry):
+        kind, poster_path = parse_queue_entry(entry)
+        try:
+            return cache_poster(poster_path, kind)
+        except Exception as e:
+            logger.warning("Poster cache FAIL: path=%s error=%s", entry, e)
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for ok in executor.map(fetch, entries):
+            stats["cached" if ok else "failed"] += 1
+    return stats
@@ -3,6 +3,91 @@ from django.db import transaction
 from films.models import Actor, Film, FilmActor, FilmCrew, Genre, Person, UserFilm
 from films.services.tmdb_movie_payload import get_tmdb_movie_payload
 
+TOP_CAST = 20
+IMPORTANT_JOBS = {"Director", "Writer", "Producer", "Composer"}
+
+
+def _film_fields(details: dict) -> dict:
+    """Поля модели Film из деталей фильма TMDB"""
+    return {
+        "title": details["title"],
+        "original_title": details.get("original_title"),
+        "tagline": details.get("tagline"),
+        "overview": details.get("overview", ""),
+        "runtime": details.get("runtime"),
+        "original_country": details.get("original_country"),
+        "release_date": details.get("release_date") or None,
+        "production_company": details.get("production_company"),
+        "poster_path": details.get("poster_path"),
+        "backdrop_path": details.get("backdrop_path"),
+        "vote_average": details.get("vote_average"),
+        "vote_count": details.get("vote_count"),
+        "budget": details.get("budget"),
+        "revenue": details.get("revenue"),
+    }
+
+
+def _upsert_people(model, rows: dict[int, dict]) -> dict[int, int]:
+    """
+    Сохраняет жанры/актеров/персоны одним INSERT ... ON CONFLICT DO NOTHING (уже существующие не трогаем)
+    и возвращает {tmdb_id: pk} одним SELECT. Строки отсортированы по tmdb_id: параллельные вставки
+    одних и тех же людей ждут друг друга в одном порядке и не взаимоблокируются
+    """
+    if not rows:
+        return {}
+    model.objects.bulk_create(
+        [model(tmdb_id=tmdb_id, **fields) for tmdb_id, fields in sorted(rows.items())],
+        ignore_conflicts=True,
+    )
+    return dict(model.objects.filter(tmdb_id__in=rows).values_list("tmdb_id", "id"))
+
+
+def _person_fields(data: dict) -> dict:
+    return {
+        "name": data["name"],
+        "original_name": data.get("original_name"),
+        "profile_path": data.get("profile_path"),
+    }
+
+
+def ingest_film(tmdb_id: int, details: dict, credits: dict) -> tuple[Film, bool]:
+    """
+    Сохраняет фильм из TMDB с жанрами, актерами и ключевой командой за постоянное число запросов.
+    Безопасно при параллельном добавлении одного фильма: get_or_create по уникальному tmdb_id
+    (проигравший гонку получает уже созданный фильм), связи пишет только создатель фильма.
+    Возвращает (фильм, создан ли)
+    """
+    with transaction.atomic():
+        film, created = Film.objects.get_or_create(tmdb_id=tmdb_id, defaults=_film_fields(details))
+        if not created:
+            return film, False
+
+        genres = {g["id"]: {"name": g["name"]} for g in details.get("genres", [])}
+        cast = credits.get("cast", [])[:TOP_CAST]
+        crew = [c for c in credits.get("crew", []) if c.get("job") in IMPORTANT_JOBS]
+
+        genre_ids = _upsert_people(Genre, genres)
+        actor_ids = _upsert_people(Actor, {a["id"]: _person_fields(a) for a in cast})
+        person_ids = _upsert_people(Person, {c["id"]: _person_fields(c) for c in crew})
+
+        Film.genres.through.objects.bulk_create(
+            [Film.genres.through(film_id=film.id, genre_id=genre_ids[g]) for g in genres if g in genre_ids],
+            ignore_conflicts=True,
+        )
+        FilmActor.objects.bulk_create(
+            [
+                FilmActor(film=film, actor_id=actor_ids[a["id"]], character=a.get("character"), order=idx)
+                for idx, a in enumerate(cast)
+                if a["id"] in actor_ids
+            ]
+        )
+        crew_rows = {(person_ids[c["id"]], c["job"]) for c in crew if c["id"] in person_ids}
+        FilmCrew.objects.bulk_create(
+            [FilmCrew(film=film, person_id=person_id, job=job) for person_id, job in sorted(crew_rows)],
+            ignore_conflicts=True,
+        )
+    return film, True
+
 
 @transaction.atomic
 def save_film_from_tmdb(*, tmdb_id: int, user):
@@ -15,61 +100,10 @@ def save_film_from_tmdb(*, tmdb_id: int, user):
 
     if not film:
         payload = get_tmdb_movie_payload(tmdb_id)  # получаем TMDB данные из кэша
-        if not payload or "details" not in payload:
-            return None, False
-
-        details = payload["details"]
-        credits = payload["credits"]
-
-        film = Film.objects.create(  # создаем фильм
-            tmdb_id=tmdb_id,
-            title=details["title"],
-            original_title=details.get("original_title"),
-            tagline=details.get("tagline"),
-            overview=details.get("overview", ""),
-            runtime=details.get("runtime"),
-            original_country=details.get("original_country"),
-            release_date=details.get("release_date") or None,
-            production_company=details.get("production_company"),
-            poster_path=details.get("poster_path"),
-            backdrop_path=details.get("backdrop_path"),
-            vote_average=details.get("vote_average"),
-            vote_count=details.get("vote_count"),
-            budget=details.get("budget"),
-            revenue=details.get("revenue"),
-        )
-        created_film = True
-
-        for genre_data in details.get("genres", []):  # жанры без дублей
-            genre, _ = Genre.objects.get_or_create(tmdb_id=genre_data["id"], defaults={"name": genre_data["name"]})
-            film.genres.add(genre)
-
-        for idx, actor_data in enumerate(credits.get("cast", [])[:20]):  # актеры без дублей
-            actor, _ = Actor.objects.get_or_create(
-                tmdb_id=actor_data["id"],
-                defaults={
-                    "name": actor_data["name"],
-                    "original_name": actor_data.get("original_name"),
-                    "profile_path": actor_data.get("profile_path"),
-                },
-            )
-            FilmActor.objects.create(film=film, actor=actor, character=actor_data.get("character"), order=idx)
-
-        important_jobs = {"Director", "Writer", "Producer", "Composer"}
-
-        for crew_data in credits.get("crew", []):
-            if crew_data["job"] not in important_jobs:
-                continue
-
-            person, _ = Person.objects.get_or_create(  # режиссер, сценарист, продюсер, композитор без дублей
-                tmdb_id=crew_data["id"],
-                defaults={
-                    "name": crew_data["name"],
-                    "original_name": crew_data.get("original_name"),
-                    "profile_path": crew_data.get("profile_path"),
-                },
-            )
-            FilmCrew.objects.get_or_create(film=film, person=person, job=crew_data["job"])
+        if not payload or "details" not in payload or payload.get("partial"):
+            return None, False, None, False  # неполные данные (бюджет времени запроса исчерпан) не сохраняем
+
+        film, created_film = ingest_film(tmdb_id, payload["details"], payload["credits"])
 
     user_film, created_user_film = UserFilm.objects.get_or_create(
         user=user, film=film
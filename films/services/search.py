@@ -1,12 +1,18 @@
-from django.utils import timezone
+from django.core.paginator import Page, Paginator
 
-from calendar_events.models import CalendarEvent
-from films.models import Genre, UserFilm
+from films.models import Film, Genre, UserFilm
+from films.services.film_statuses import get_status_resolver
+from films.services.library_search import film_search_q
+from films.services.utils import build_poster_url
 from reviews.models import Review
 from services.tmdb import Tmdb
 
 tmdb = Tmdb()
 
+PER_PAGE = 12  # фильмов на странице поиска
+TMDB_PAGE_SIZE = 20  # результатов на странице /search/movie
+TMDB_MAX_PAGES = 500  # дальше 500-й страницы TMDB не отдает
+
 
 def search_tmdb_film(query: str, user, page_num: int = 1) -> list[dict]:
     """Поиск по фильмам TMDB: возвращает список словарей для отображения фильмов (словарь=фильм)"""
@@ -14,24 +20,18 @@ def search_tmdb_film(query: str, user, page_num: int = 1) -> list[dict]:
         return []
 
     data = tmdb.search_movie(query=query, page=page_num)
-    results = data.get("results", []) or []
+    return build_tmdb_items(data.get("results", []) or [], user)
+
+
+def build_tmdb_items(results: list[dict], user) -> list[dict]:
+    """Элементы выдачи TMDB со статусами пользователя; статусы запрашиваются только для переданных фильмов"""
     if not results:
         return []
 
     ids = [item.get("id") for item in results if item.get("id")]
-    user_films_map = {}
-    reviews_map = {}
-    planned_ids = set()
-    if user:
-        user_films = UserFilm.objects.select_related("film").filter(user=user, film__tmdb_id__in=ids)
-        user_films_map = {uf.film.tmdb_id: uf for uf in user_films}
-        reviews = Review.objects.filter(user=user, film__tmdb_id__in=ids)
-        reviews_map = {r.film.tmdb_id: r for r in reviews}
-        planned_ids = set(
-            CalendarEvent.objects.filter(
-                user=user, film__tmdb_id__in=ids, planned_date__gte=timezone.now().date()
-            ).values_list("film__tmdb_id", flat=True)
-        )
+    film_ids = dict(Film.objects.filter(tmdb_id__in=ids).values_list("tmdb_id", "id")) if user else {}
+    statuses = get_status_resolver(user)
+    statuses.load(film_ids.values())
     all_genre_ids = set(g_id for item in results for g_id in item.get("genre_ids", []))
     genre_map = {}
     if all_genre_ids:
@@ -43,28 +43,27 @@ def search_tmdb_film(query: str, user, page_num: int = 1) -> list[dict]:
         tmdb_id = item["id"]
         genre_ids = item.get("genre_ids", []) or []
         film_genres = [genre_map[g_id] for g_id in genre_ids[:2] if g_id in genre_map]
-        user_film = user_films_map.get(tmdb_id)
-        is_favorite = user_film.is_favorite if user_film else False
+        film_id = film_ids.get(tmdb_id)
+        user_film = statuses.user_film(film_id) if film_id else None
+        review = statuses.review(film_id) if film_id else None
         film_dict = {
             "tmdb_id": tmdb_id,
             "title": item.get("title") or item.get("name", "Без названия"),
-            "poster_url": (
-                f"https://image.tmdb.org/t/p/w342{item['poster_path']}" if item.get("poster_path") else None
-            ),
+            "poster_url": build_poster_url(item.get("poster_path")),
             "poster_path": item.get("poster_path"),
             "release_date": item.get("release_date", "")[:4] or "-",
             "genres": ", ".join(film_genres) if film_genres else "",
-            "has_review": tmdb_id in reviews_map,
-            "in_library": tmdb_id in user_films_map,
-            "is_favorite": is_favorite,
+            "has_review": bool(review),
+            "in_library": bool(user_film),
+            "is_favorite": user_film.is_favorite if user_film else False,
             "is_tmdb_dict": True,
         }
         items.append(
             {
                 "film": film_dict,
-                "user_film": user_films_map.get(tmdb_id),
-                "review": reviews_map.get(tmdb_id),
-                "is_planned": tmdb_id in planned_ids,
+                "user_film": user_film,
+                "review": review,
+                "is_planned": statuses.is_planned(film_id) if film_id else False,
             }
         )
 
@@ -79,112 +78,85 @@ def get_film_statuses(user, film_ids):
     if not film_ids:
         return {}, set()
 
-    reviews_qs = Review.objects.filter(user=user, film_id__in=film_ids)
-    reviews_map = {r.film_id: r for r in reviews_qs}
+    statuses = get_status_resolver(user)
+    statuses.load(film_ids)
+    reviews_map = {film_id: statuses.review(film_id) for film_id in film_ids if statuses.review(film_id)}
+    planned_ids = {film_id for film_id in film_ids if statuses.is_planned(film_id)}
+    return reviews_map, planned_ids
 
-    planned_qs = CalendarEvent.objects.filter(user=user, film_id__in=film_ids, planned_date__gte=timezone.now().date())
-    planned_ids = set(planned_qs.values_list("film_id", flat=True))
 
-    return reviews_map, planned_ids
+def user_films_queryset(query: str, user, favorites: bool = False):
+    """Фильмы библиотеки пользователя (или только любимые) с поиском по q; запрос ленивый - Paginator режет его в БД"""
+    qs = UserFilm.objects.filter(user=user).select_related("film").prefetch_related("film__genres")
+    if favorites:
+        qs = qs.filter(is_favorite=True)
+    if query:
+        qs = qs.filter(film_search_q(query))
+    return qs.order_by("-created_at", "-id")
 
 
-def search_user_film(query: str, user):
-    """Поиск по фильмам пользователя из БД"""
-    qs = (
-        UserFilm.objects.filter(user=user)
-        .select_related("film")
-        .prefetch_related("film__genres")
-        .order_by("-created_at")
-    )
+def reviews_queryset(query: str, user, with_text: bool = False):
+    """Просмотренные (оцененные) фильмы пользователя или только фильмы с текстом отзыва, с поиском по q"""
+    qs = Review.objects.filter(user=user).select_related("film")
+    if with_text:
+        qs = qs.exclude(review__isnull=True).exclude(review="")
     if query:
-        qs = qs.filter(film__title__icontains=query)
-    films = list(qs)
-    film_ids = [uf.film_id for uf in films]
-    reviews_map, planned_ids = get_film_statuses(user, film_ids)
+        qs = qs.filter(film_search_q(query))
+    return qs.order_by("-updated_at", "-id")
+
+
+def build_user_film_items(user_films, user) -> list[dict]:
+    """Элементы выдачи по UserFilm со статусами (отзыв, план) только для переданных фильмов"""
+    user_films = list(user_films)
+    statuses = get_status_resolver(user)
+    statuses.prime(user_films=user_films)
+    statuses.load(uf.film_id for uf in user_films)
     return [
         {
             "user_film": uf,
             "film": uf.film,
-            "review": reviews_map.get(uf.film_id),
-            "is_planned": uf.film_id in planned_ids,
+            "review": statuses.review(uf.film_id),
+            "is_planned": statuses.is_planned(uf.film_id),
             "is_favorite": uf.is_favorite,
         }
-        for uf in films
+        for uf in user_films
     ]
 
 
+def build_review_items(reviews, user) -> list[dict]:
+    """Элементы выдачи по Review со статусами (библиотека, избранное, план) только для переданных фильмов"""
+    reviews = list(reviews)
+    statuses = get_status_resolver(user)
+    statuses.prime(reviews=reviews)
+    statuses.load(r.film_id for r in reviews)
+    items = []
+    for r in reviews:
+        user_film = statuses.user_film(r.film_id)
+        r.is_favorite = bool(user_film and user_film.is_favorite)
+        items.append(
+            {"film": r.film, "user_film": user_film, "review": r, "is_planned": statuses.is_planned(r.film_id)}
+        )
+    return items
+
+
+def search_user_film(query: str, user):
+    """Поиск по фильмам пользователя из БД"""
+    return build_user_film_items(user_films_queryset(query, user), user)
+
+
 def search_favorite_films(query: str, user):
     """Поиск только по любимым фильмам пользователя"""
-    qs = (
-        UserFilm.objects.filter(user=user, is_favorite=True)
-        .select_related("film")
-        .prefetch_related("film__genres")
-        .order_by("-created_at")
-    )
-    if query:
-        qs = qs.filter(film__title__icontains=query)
-    films = list(qs)
-    film_ids = [uf.film_id for uf in films]
-    reviews_map, planned_ids = get_film_statuses(user, film_ids)
-    return [
-        {
-            "user_film": uf,
-            "film": uf.film,
-            "review": reviews_map.get(uf.film_id),
-            "is_planned": uf.film_id in planned_ids,
-            "is_favorite": uf.is_favorite,
-        }
-        for uf in films
-    ]
+    return build_user_film_items(user_films_queryset(query, user, favorites=True), user)
 
 
 def search_watched_films(query: str, user):
     """Поиск только по просмотренным фильмам пользователя"""
-    qs = Review.objects.filter(user=user).select_related("film")
-    if query:
-        qs = qs.filter(film__title__icontains=query)
-    reviews = list(qs)
-    if not reviews:
-        return []
-    film_ids = [r.film_id for r in reviews]
-    user_map = {uf.film_id: uf for uf in UserFilm.objects.filter(user=user, film_id__in=film_ids)}
-    reviews_map, planned_ids = get_film_statuses(user, film_ids)
-    items = [
-        {
-            "film": r.film,
-            "user_film": user_map.get(r.film_id),
-            "review": r,
-            "is_planned": r.film_id in planned_ids,
-        }
-        for r in reviews
-    ]
-    for item in items:  # добавляем is_favorite к каждому review
-        item["review"].is_favorite = bool(item["user_film"] and item["user_film"].is_favorite)
-
-    return items
+    return build_review_items(reviews_queryset(query, user), user)
 
 
 def search_reviewed_films(query: str, user):
     """Поиск только по фильмам c отзывами"""
-    qs = Review.objects.filter(user=user).exclude(review__isnull=True).exclude(review="").select_related("film")
-    if query:
-        qs = qs.filter(film__title__icontains=query)
-    reviews = list(qs)
-    film_ids = [r.film_id for r in reviews]
-    user_map = {uf.film_id: uf for uf in UserFilm.objects.filter(user=user, film_id__in=film_ids)}
-    reviews_map, planned_ids = get_film_statuses(user, film_ids)
-    items = [
-        {
-            "film": r.film,
-            "user_film": user_map.get(r.film_id),
-            "review": r,
-            "is_planned": r.film_id in planned_ids,
-        }
-        for r in reviews
-    ]
-    for item in items:  # добавляем is_favorite к каждому review
-        item["review"].is_favorite = bool(item["user_film"] and item["user_film"].is_favorite)
-    return items
+    return build_review_items(reviews_queryset(query, user, with_text=True), user)
 
 
 def search_films(query: str, user, page_num: int = 1, source: str = "tmdb"):
@@ -205,3 +177,78 @@ def search_films(query: str, user, page_num: int = 1, source: str = "tmdb"):
     if source == "reviewed":
         return search_reviewed_films(query, user)
     return []
+
+
+# источник: (ленивый запрос к БД, построение элементов для видимой страницы)
+LIBRARY_SOURCES = {
+    "user_films": (user_films_queryset, build_user_film_items),
+    "favorites": (lambda query, user: user_films_queryset(query, user, favorites=True), build_user_film_items),
+    "watched": (reviews_queryset, build_review_items),
+    "reviewed": (lambda query, user: reviews_queryset(query, user, with_text=True), build_review_items),
+}
+
+
+class TmdbSearchResults:
+    """
+    Ленивая последовательность результатов поиска TMDB для Paginator: наша страница из per_page фильмов
+    отображается на одну-две страницы TMDB (по TMDB_PAGE_SIZE), которые запрашиваются только при срезе.
+    Общее число результатов берется из ответа для запрошенной страницы - лишних запросов к TMDB нет
+    """
+
+    def __init__(self, query: str, user, first_index: int = 0):
+        self.query = query
+        self.user = user
+        self._first_page = first_index // TMDB_PAGE_SIZE + 1
+        self._pages = {}
+        self._total = None
+
+    def _results(self, tmdb_page: int) -> list[dict]:
+        if tmdb_page not in self._pages:
+            data = tmdb.search_movie(query=self.query, page=tmdb_page) or {}
+            self._pages[tmdb_page] = data.get("results", []) or []
+            if self._total is None:
+                self._total = min(data.get("total_results") or 0, TMDB_MAX_PAGES * TMDB_PAGE_SIZE)
+        return self._pages[tmdb_page]
+
+    def count(self) -> int:
+        if self._total is None:
+            self._results(self._first_page)
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key: slice) -> list[dict]:
+        start, stop = key.start or 0, min(key.stop, self.count())
+        if start >= stop:
+            return []
+        first, last = start // TMDB_PAGE_SIZE + 1, (stop - 1) // TMDB_PAGE_SIZE + 1
+        results = [item for tmdb_page in range(first, last + 1) for item in self._results(tmdb_page)]
+        offset = (first - 1) * TMDB_PAGE_SIZE
+        return build_tmdb_items(results[start - offset : stop - offset], self.user)
+
+
+def _page_number(value) -> int:
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def search_films_page(query: str, user, page_number=1, source: str = "tmdb", per_page: int = PER_PAGE) -> Page:
+    """
+    Страница поиска с пагинацией на стороне источника: для TMDB запрашиваются только нужные страницы API,
+    для библиотеки - LIMIT/OFFSET в БД; статусы пользователя строятся только для фильмов видимой страницы
+    """
+    number = _page_number(page_number)
+    if source == "tmdb":
+        if not query:
+            return Paginator([], per_page).get_page(1)
+        return Paginator(TmdbSearchResults(query, user, (number - 1) * per_page), per_page).get_page(number)
+
+    if not user or not user.is_authenticated or source not in LIBRARY_SOURCES:
+        return Paginator([], per_page).get_page(1)
+    queryset, build_items = LIBRARY_SOURCES[source]
+    page = Paginator(queryset(query, user), per_page).get_page(number)
+    page.object_list = build_items(page.object_list, user)
+    return page
@@ -1,28 +1,107 @@
-from typing import Optional
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
 
+from django.conf import settings
 from django.core.cache import cache
 
 from services.tmdb import Tmdb
+from services.tmdb_deadline import is_exhausted
+
+logger = logging.getLogger("filmdiary.films")
 
 tmdb = Tmdb()
+tmdb_api = Tmdb(use_catalog=False)  # для потоков пакетной загрузки: только API, без ORM (своего соединения с БД)
+
+PAYLOAD_TTL = 60 * 60 * 12  # 12 часов
+PAYLOAD_WORKERS: int = getattr(settings, "TMDB_PAYLOAD_WORKERS", 8)
+
+
+def payload_cache_key(tmdb_id: int) -> str:
+    """Ключ кэша с данными фильма из TMDB"""
+    return f"tmdb:movie:{tmdb_id}"
+
+
+def _fetch_payload(tmdb_id: int, api: Tmdb | None = None) -> tuple[Optional[dict], bool]:
+    """
+    Загружает детали и актеров фильма из TMDB. Возвращает (payload, можно ли кэшировать):
+    если бюджет времени запроса исчерпан после загрузки деталей, отдает их без актеров и не кэширует
+    """
+    api = api or tmdb
+    details = api.get_movie_details(tmdb_id)
+    credits = api.get_credits(tmdb_id)
+    if details and not credits and is_exhausted():
+        return {"details": details, "credits": {"cast": [], "crew": []}, "partial": True}, False
+    if not details or not credits:
+        logger.warning("TMDB payload FAIL: tmdb_id=%s details=%s credits=%s", tmdb_id, bool(details), bool(credits))
+        return None, False
+    return {"details": details, "credits": credits}, True
 
 
 def get_tmdb_movie_payload(tmdb_id: int) -> Optional[dict]:
-    """Кэширует данные из TMDB, если их еще нет, или возвращает данные из кэша (TTL: 12 часов)"""
-    cache_key = f"tmdb:movie:{tmdb_id}"
+    """
+    Кэширует данные из TMDB, если их еще нет, или возвращает данные из кэша (TTL: 12 часов).
+    Если бюджет времени запроса исчерпан после загрузки деталей, возвращает их без актеров и не кэширует
+    """
+    cache_key = payload_cache_key(tmdb_id)
 
     data = cache.get(cache_key)
     if data:
         return data
 
-    details = tmdb.get_movie_details(tmdb_id)
-    credits = tmdb.get_credits(tmdb_id)
-    if not details or not credits:
-        print(f"TMDB API failed: details={details}, credits={credits}")
-        return None
-    data = {
-        "details": details,
-        "credits": credits,
-    }
-    cache.set(cache_key, data, timeout=60 * 60 * 12)  # 12 часов
+    data, cacheable = _fetch_payload(tmdb_id)
+    if cacheable:
+        cache.set(cache_key, data, timeout=PAYLOAD_TTL)
     return data
+
+
+def _fetch_payloads(tmdb_ids: list[int], workers: int) -> list[tuple[Optional[dict], bool]]:
+    """
+    Загружает промахи из API TMDB: при одном воркере - в текущем потоке, иначе параллельно.
+    Каждый поток получает копию контекста запроса: бюджет времени и статистика TMDB остаются общими
+    """
+    if workers <= 1:
+        return [_fetch_payload(tmdb_id, tmdb_api) for tmdb_id in tmdb_ids]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, _fetch_payload, tmdb_id, tmdb_api) for tmdb_id in tmdb_ids
+        ]
+        return [future.result() for future in futures]
+
+
+def get_tmdb_movie_payloads(tmdb_ids: Iterable[int], workers: int | None = None) -> dict[int, dict]:
+    """
+    Пакетная версия get_tmdb_movie_payload: один cache.get_many на все фильмы,
+    промахи берутся из зеркала каталога одним запросом, остальные загружаются из API TMDB параллельно
+    (workers потоков, по умолчанию PAYLOAD_WORKERS; потоки к БД не обращаются) и сохраняются одним cache.set_many.
+    Возвращает {tmdb_id: payload} только для найденных фильмов
+    """
+    keys = {tmdb_id: payload_cache_key(tmdb_id) for tmdb_id in dict.fromkeys(tmdb_ids) if tmdb_id}
+    if not keys:
+        return {}
+
+    cached = cache.get_many(list(keys.values()))
+    payloads = {tmdb_id: cached[key] for tmdb_id, key in keys.items() if cached.get(key)}
+    misses = [tmdb_id for tmdb_id in keys if tmdb_id not in payloads]
+    if not misses:
+        return payloads
+
+    # зеркало каталога - одним запросом в текущем потоке; в потоки уходят только настоящие промахи к API
+    to_cache = {}
+    for tmdb_id, mirrored in tmdb._from_catalog_bulk(misses).items():
+        payloads[tmdb_id] = to_cache[keys[tmdb_id]] = {"details": mirrored.details, "credits": mirrored.credits}
+    misses = [tmdb_id for tmdb_id in misses if tmdb_id not in payloads]
+
+    if misses:
+        workers = min(workers or PAYLOAD_WORKERS, len(misses))
+        for tmdb_id, (data, cacheable) in zip(misses, _fetch_payloads(misses, workers)):
+            if not data:
+                continue
+            payloads[tmdb_id] = data
+            if cacheable:
+                to_cache[keys[tmdb_id]] = data
+
+    if to_cache:
+        cache.set_many(to_cache, timeout=PAYLOAD_TTL)
+    return payloads
@@ -1,3 +1,6 @@
+from films.services.posters import poster_url
+
+
 def format_nums(value: int | None) -> str:
     """Переводит целое число в строку формата 333,000,000"""
     if not value:
@@ -5,11 +8,9 @@ def format_nums(value: int | None) -> str:
     return f"{int(value):,}"
 
 
-def build_poster_url(path: str | None) -> str | None:
-    """Собирает полный url для постера фильма"""
-    if not path:
-        return None
-    return f"https://image.tmdb.org/t/p/w342{path}"
+def build_poster_url(path: str | None, variant: str = "card") -> str | None:
+    """Собирает полный url для постера фильма: локальный WebP из media или, пока его нет, ссылка TMDB"""
+    return poster_url(path, variant)
 
 
 def extract_year(release_date: str | None) -> str:
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from films.models import Film
+from films.services.film_context_cache import invalidate_film_context
+
+
+@receiver(post_save, sender=Film)
+def invalidate_film_context_on_save(sender, instance, **kwargs):
+    """Сбрасывает кэш страницы фильма после commit: к этому моменту сохранены и связи (актеры, команда, жанры)"""
+    transaction.on_commit(lambda: invalidate_film_context(instance.tmdb_id))
@@ -1,9 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.utils import timezone
 
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
+from films.models import UserFilmIntent
+from films.services.add_film import fail_intent, process_intent, stale_intent_ids
+from films.services.cache_warmup import warm_tmdb_cache
+from films.services.catalog_sync import id_export, ids_to_refresh, iter_export_ids, skip_fresh, sync_catalog
+from films.services.collections import refresh_all_snapshots
+from films.services.diary_import import recover_stale_imports, run_import
+from films.services.posters import cache_posters, pop_pending
 from services.recommendations import build_recommendations
 from services.tmdb import Tmdb
 
@@ -44,3 +52,103 @@ def recompute_all_recommendations(self):
     except Exception:
         logger.exception("Recs ALL FAIL: task=%s", self.request.id)
         raise
+
+
+@shared_task(bind=True)
+def sync_tmdb_catalog(self, use_export=False, min_popularity=10.0, limit=5000):
+    """
+    Периодическая задача: обновление локального зеркала каталога TMDB.
+    По умолчанию - фильмы библиотек, которых нет в зеркале, и устаревшие записи;
+    use_export=True - дополнительно самые популярные фильмы из ежедневной выгрузки id TMDB
+    """
+    try:
+        logger.info("Catalog sync START: export=%s task=%s", use_export, self.request.id)
+        stats = sync_catalog(ids_to_refresh(limit))
+        if use_export:
+            with id_export() as path:  # выгрузка - несколько МБ, после синхронизации файл удаляется
+                export_stats = sync_catalog(
+                    skip_fresh(iter_export_ids(path, min_popularity=min_popularity, limit=limit))
+                )
+            stats = {key: stats[key] + export_stats[key] for key in stats}
+        logger.info("Catalog sync SUCCESS: %s task=%s", stats, self.request.id)
+        return stats
+    except Exception:
+        logger.exception("Catalog sync FAIL: task=%s", self.request.id)
+        raise
+
+
+@shared_task(bind=True)
+def warm_tmdb_cache_task(self):
+    """Периодическая задача: прогрев кэша TMDB перед ночным пересчетом рекомендаций и утренним трафиком"""
+    try:
+        logger.info("Warmup START: task=%s", self.request.id)
+        stats = warm_tmdb_cache()
+        logger.info("Warmup SUCCESS: hit_ratio=%s stats=%s task=%s", stats["hit_ratio"], stats, self.request.id)
+        return stats
+    except Exception:
+        logger.exception("Warmup FAIL: task=%s", self.request.id)
+        raise
+
+
+@shared_task(bind=True)
+def refresh_collection_snapshots(self):
+    """Периодическая задача: пересборка общих снимков подборок (популярные, в кино, скоро, тренды, топ)"""
+    stats = refresh_all_snapshots()
+    logger.info("Collections refresh: %s task=%s", stats, self.request.id)
+    return stats
+
+
+@shared_task(bind=True)
+def cache_pending_posters(self, limit=200):
+    """Периодическая задача: скачивает постеры из очереди и нарезает WebP-варианты в media/posters"""
+    paths = pop_pending(limit)
+    if not paths:
+        return {"cached": 0, "failed": 0}
+    stats = cache_posters(paths)
+    logger.info("Posters cache: %s task=%s", stats, self.request.id)
+    return stats
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def ingest_user_film(self, intent_id):
+    """Отложенная задача: загрузка фильма из TMDB и добавление в библиотеку по намерению пользователя"""
+    try:
+        if process_intent(intent_id):
+            return
+    except Exception:
+        logger.exception("AddFilm async FAIL: intent=%s task=%s", intent_id, self.request.id)
+
+    if self.request.retries < self.max_retries:
+        raise self.retry()
+    fail_intent(intent_id, "Не удалось получить данные фильма из TMDB")
+    logger.warning("AddFilm async GAVE UP: intent=%s task=%s", intent_id, self.request.id)
+
+
+@shared_task(bind=True)
+def requeue_stale_film_intents(self):
+    """Периодическая задача: повторно ставит в очередь намерения, задачи которых потерялись"""
+    intent_ids = stale_intent_ids()
+    if not intent_ids:
+        return 0
+    UserFilmIntent.objects.filter(id__in=intent_ids).update(updated_at=timezone.now())
+    for intent_id in intent_ids:
+        ingest_user_film.delay(intent_id)
+    logger.info("AddFilm requeue: intents=%s task=%s", len(intent_ids), self.request.id)
+    return len(intent_ids)
+
+
+@shared_task(bind=True)
+def import_diary(self, import_id):
+    """Фоновая задача: импорт дневника из CSV Letterboxd / IMDb с сохранением прогресса после каждого пакета"""
+    logger.info("Import START: import=%s task=%s", import_id, self.request.id)
+    diary_import = run_import(import_id)
+    return diary_import.status if diary_import else None
+
+
+@shared_task(bind=True)
+def recover_stale_diary_imports(self):
+    """Периодическая задача: перезапускает потерявшиеся импорты дневника и завершает прерванные"""
+    requeued, failed = recover_stale_imports()
+    if requeued or failed:
+        logger.info("Import recover: requeued=%s failed=%s task=%s", requeued, failed, self.request.id)
+    return requeued, failed
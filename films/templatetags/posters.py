@@ -0,0 +1,23 @@
+from django import template
+
+from films.services.posters import poster_srcset as build_srcset, poster_url, profile_url
+
+register = template.Library()
+
+
+@register.filter
+def poster_src(poster_path, variant="card"):
+    """Ссылка на вариант постера (card/thumbnail/detail): локальный WebP или TMDB"""
+    return poster_url(poster_path, variant) or ""
+
+
+@register.filter
+def poster_srcset(poster_path):
+    """Значение srcset со всеми вариантами постера"""
+    return build_srcset(poster_path)
+
+
+@register.filter
+def profile_src(profile_path):
+    """Ссылка на фото актера: локальный WebP или TMDB"""
+    return profile_url(profile_path) or ""
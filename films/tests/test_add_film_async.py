@@ -0,0 +1,148 @@
+from datetime import timedelta
+from unittest.mock import Mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from films.models import Film, UserFilm, UserFilmIntent
+from films.services.add_film import STALE_AFTER, process_intent, request_add_film, stale_intent_ids
+from films.tasks import ingest_user_film, requeue_stale_film_intents
+from services.tmdb_deadline import mark_exhausted
+
+
+@pytest.fixture
+def enqueue(monkeypatch):
+    mock = Mock()
+    monkeypatch.setattr("films.services.add_film.enqueue_intent", mock)
+    return mock
+
+
+@pytest.mark.django_db
+def test_async_add_existing_film_is_immediate(client, user, film, enqueue):
+    """Фильм уже в БД: добавляется сразу, без фоновой задачи"""
+    client.force_login(user)
+
+    response = client.post(reverse("films:add_film"), {"tmdb_id": film.tmdb_id, "async": "1"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "added"
+    assert UserFilm.objects.filter(user=user, film=film).exists()
+    enqueue.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_async_add_new_film_returns_202(client, user, enqueue, django_capture_on_commit_callbacks):
+    """Фильма нет в БД: намерение записано, задача ставится после commit, ответ 202"""
+    client.force_login(user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse("films:add_film"), {"tmdb_id": 555, "async": "1"})
+
+    assert response.status_code == 202
+    assert response.json()["status_url"] == reverse("films:add_film_status", kwargs={"tmdb_id": 555})
+    intent = UserFilmIntent.objects.get(user=user, tmdb_id=555)
+    assert intent.status == UserFilmIntent.Status.PENDING
+    enqueue.assert_called_once_with(intent.id)
+
+
+@pytest.mark.django_db
+def test_sync_add_partial_payload_falls_back_to_async(client, user, enqueue, monkeypatch):
+    """Бюджет времени TMDB исчерпан после деталей: фильм не сохраняется, добавление уходит в фоновую задачу"""
+
+    def partial_payload(tmdb_id):
+        mark_exhausted()
+        return {"details": {"id": tmdb_id, "title": "Film"}, "credits": {"cast": [], "crew": []}, "partial": True}
+
+    monkeypatch.setattr("films.services.save_film.get_tmdb_movie_payload", partial_payload)
+    client.force_login(user)
+
+    response = client.post(reverse("films:add_film"), {"tmdb_id": 555})
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+    assert not Film.objects.filter(tmdb_id=555).exists()
+    assert UserFilmIntent.objects.filter(user=user, tmdb_id=555, status=UserFilmIntent.Status.PENDING).exists()
+
+
+@pytest.mark.django_db
+def test_sync_add_missing_payload_is_clean_error(client, user, enqueue, monkeypatch):
+    """TMDB не вернул фильм (бюджет не исчерпан): ответ 'не найден', а не ошибка распаковки результата"""
+    monkeypatch.setattr("films.services.save_film.get_tmdb_movie_payload", lambda tmdb_id: None)
+    client.force_login(user)
+
+    response = client.post(reverse("films:add_film"), {"tmdb_id": 555})
+
+    assert response.status_code == 500
+    assert response.json()["message"] == "Фильм не найден или не удалось сохранить"
+    enqueue.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_add_status_endpoint(client, user, film, enqueue):
+    """Статус: pending, пока фильм загружается, added - после добавления, 404 - если не добавлялся"""
+    client.force_login(user)
+    request_add_film(user, 555)
+    url = reverse("films:add_film_status", kwargs={"tmdb_id": 555})
+
+    assert client.get(url).json()["status"] == "pending"
+    assert client.get(reverse("films:add_film_status", kwargs={"tmdb_id": 777})).status_code == 404
+
+    UserFilm.objects.create(user=user, film=film)
+    assert client.get(reverse("films:add_film_status", kwargs={"tmdb_id": film.tmdb_id})).json() == {"status": "added"}
+
+
+@pytest.mark.django_db
+def test_process_intent_ingests_film(user, tmdb_payload, enqueue, monkeypatch):
+    """Фоновая обработка сохраняет фильм и добавляет его в библиотеку"""
+    monkeypatch.setattr("films.services.add_film.get_tmdb_movie_payload", Mock(return_value=tmdb_payload))
+    _, intent = request_add_film(user, 555)
+
+    assert process_intent(intent.id) is True
+
+    intent.refresh_from_db()
+    assert intent.status == UserFilmIntent.Status.DONE
+    assert UserFilm.objects.filter(user=user, film__tmdb_id=555).exists()
+    assert Film.objects.get(tmdb_id=555).actors.count() == 1
+
+
+@pytest.mark.django_db
+def test_ingest_task_marks_failed_after_retries(user, enqueue, monkeypatch):
+    """Если TMDB не ответил и на последней попытке, намерение помечается неудачным"""
+    payload = Mock(return_value=None)
+    monkeypatch.setattr("films.services.add_film.get_tmdb_movie_payload", payload)
+    _, intent = request_add_film(user, 555)
+
+    ingest_user_film.apply(args=[intent.id], retries=ingest_user_film.max_retries)
+
+    intent.refresh_from_db()
+    assert intent.status == UserFilmIntent.Status.FAILED
+    payload.assert_called_once_with(555)
+
+
+@pytest.mark.django_db
+def test_requeue_only_intents_idle_beyond_queue_latency(user, enqueue, monkeypatch):
+    """Намерение в очереди несколько минут не дублируется; потерянное (дольше STALE_AFTER) ставится повторно"""
+    delay = Mock()
+    monkeypatch.setattr("films.tasks.ingest_user_film.delay", delay)
+    _, queued = request_add_film(user, 555)
+    _, lost = request_add_film(user, 556)
+    UserFilmIntent.objects.filter(id=queued.id).update(updated_at=timezone.now() - timedelta(minutes=5))
+    UserFilmIntent.objects.filter(id=lost.id).update(updated_at=timezone.now() - STALE_AFTER - timedelta(minutes=1))
+
+    assert stale_intent_ids() == [lost.id]
+    assert requeue_stale_film_intents.apply().get() == 1
+    delay.assert_called_once_with(lost.id)
+    assert stale_intent_ids() == []
+
+
+@pytest.mark.django_db
+def test_running_task_refreshes_intent(user, enqueue, monkeypatch):
+    """Каждая попытка задачи обновляет updated_at: повторяемое намерение не считается потерянным"""
+    monkeypatch.setattr("films.services.add_film.get_tmdb_movie_payload", Mock(return_value=None))
+    _, intent = request_add_film(user, 555)
+    UserFilmIntent.objects.filter(id=intent.id).update(updated_at=timezone.now() - STALE_AFTER * 2)
+
+    assert process_intent(intent.id) is False
+    assert stale_intent_ids() == []
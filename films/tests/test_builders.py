@@ -1,6 +1,13 @@
+from unittest.mock import Mock
+
 import pytest
 
-from films.services.builders import build_film_card, build_recommendation_cards, build_tmdb_collection_cards
+from films.services.builders import (
+    build_film_card,
+    build_recommendation_cards,
+    build_recommendation_page,
+    build_tmdb_collection_cards,
+)
 
 
 @pytest.mark.django_db
@@ -63,3 +70,39 @@ def test_build_recommendation_cards_from_db(user, film, monkeypatch):
 
     assert len(cards) == 1
     assert cards[0]["tmdb_id"] == film.tmdb_id
+
+
+@pytest.mark.django_db
+def test_build_recommendation_cards_batches_tmdb_payloads(user, monkeypatch):
+    """Фильмы не из БД загружаются одним пакетом"""
+    monkeypatch.setattr(
+        "films.services.builders.get_user_recommendations",
+        lambda user, limit=None: [{"tmdb_id": 10}, {"tmdb_id": 11}],
+    )
+    batch = Mock(return_value={10: {"details": {"id": 10, "title": "A", "genres": [{"id": 1, "name": "драма"}]}}})
+    monkeypatch.setattr("films.services.builders.get_tmdb_movie_payloads", batch)
+
+    cards = build_recommendation_cards(user)
+
+    batch.assert_called_once_with([10, 11])
+    assert [c["tmdb_id"] for c in cards] == [10]
+    assert cards[0]["genres"] == "драма"
+
+
+@pytest.mark.django_db
+def test_build_recommendation_page_builds_visible_cards_only(user, film, monkeypatch, django_assert_num_queries):
+    """Карточки строятся только для видимой страницы, число запросов не зависит от числа карточек"""
+    recs = [{"tmdb_id": film.tmdb_id}] + [{"tmdb_id": 1000 + i} for i in range(29)]
+    monkeypatch.setattr("films.services.builders.get_user_recommendations", lambda user, limit=None: recs[:limit])
+    batch = Mock(side_effect=lambda ids: {i: {"details": {"id": i, "title": f"Film {i}"}} for i in ids})
+    monkeypatch.setattr("films.services.builders.get_tmdb_movie_payloads", batch)
+
+    # фильмы, жанры (prefetch), затем UserFilm / Review / календарь одним пакетом
+    with django_assert_num_queries(5):
+        page = build_recommendation_page(user, page_number=1, per_page=12)
+    assert [c["tmdb_id"] for c in page.object_list] == [r["tmdb_id"] for r in recs[:12]]
+
+    page = build_recommendation_page(user, page_number=3, per_page=12)
+    batch.assert_called_with([r["tmdb_id"] for r in recs[24:]])
+    assert len(page.object_list) == 6
+    assert page.paginator.num_pages == 3
@@ -0,0 +1,115 @@
+import json
+from datetime import date
+from unittest.mock import Mock
+
+from django.urls import reverse
+
+import pytest
+
+from films.models import Film, UserFilm, UserFilmIntent
+from films.services.bulk_library import bulk_add_films, bulk_update_status
+from reviews.models import Review
+
+
+@pytest.fixture
+def second_film(db):
+    return Film.objects.create(tmdb_id=200, title="Second film", overview="")
+
+
+@pytest.mark.django_db
+def test_bulk_add_films_statuses(user, film, second_film, tmdb_payload, monkeypatch):
+    """Пакет: существующий в библиотеке, новый из БД, новый из TMDB и не загрузившийся"""
+    UserFilm.objects.create(user=user, film=film)
+    batch = Mock(return_value={300: tmdb_payload})
+    monkeypatch.setattr("films.services.bulk_library.get_tmdb_movie_payloads", batch)
+
+    statuses = bulk_add_films(user, [film.tmdb_id, second_film.tmdb_id, 300, 400])
+
+    assert statuses == {film.tmdb_id: "exists", second_film.tmdb_id: "added", 300: "added", 400: "pending"}
+    batch.assert_called_once_with([300, 400])
+    assert UserFilm.objects.filter(user=user).count() == 3
+    assert UserFilmIntent.objects.get(user=user, tmdb_id=400).status == UserFilmIntent.Status.PENDING
+
+
+@pytest.mark.django_db
+def test_bulk_update_status_set_based(user, film, second_film, django_assert_num_queries):
+    """Статус меняется одним UPDATE на весь пакет"""
+    UserFilm.objects.create(user=user, film=film)
+    UserFilm.objects.create(user=user, film=second_film)
+
+    with django_assert_num_queries(6):  # SAVEPOINT, SELECT, UPDATE, пересчет UserStats (SELECT + upsert), RELEASE
+        statuses = bulk_update_status(user, [film.tmdb_id, second_film.tmdb_id, 999], "favorite")
+
+    assert statuses == {film.tmdb_id: "success", second_film.tmdb_id: "success", 999: "not_found"}
+    assert UserFilm.objects.filter(user=user, is_favorite=True).count() == 2
+
+
+@pytest.mark.django_db
+def test_bulk_delete_watched(user, film):
+    """delete-watched удаляет отзывы, фильм остается в библиотеке"""
+    UserFilm.objects.create(user=user, film=film)
+    Review.objects.create(
+        user=user,
+        film=film,
+        watched_at=date(2024, 1, 1),
+        plot_rating=8,
+        acting_rating=8,
+        directing_rating=8,
+        visuals_rating=8,
+        soundtrack_rating=8,
+    )
+
+    bulk_update_status(user, [film.tmdb_id], "delete-watched")
+
+    assert not Review.objects.filter(user=user).exists()
+    assert UserFilm.objects.filter(user=user, film=film).exists()
+
+
+@pytest.mark.django_db
+class TestBulkViews:
+    def test_bulk_update_json(self, client, user, film):
+        """JSON-запрос: статусы по каждому фильму в одном ответе"""
+        client.force_login(user)
+        UserFilm.objects.create(user=user, film=film, is_favorite=True)
+
+        response = client.post(
+            reverse("films:bulk_update_status"),
+            json.dumps({"tmdb_ids": [film.tmdb_id, 5], "action": "unfavorite"}),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"tmdb_id": film.tmdb_id, "status": "success"},
+            {"tmdb_id": 5, "status": "not_found"},
+        ]
+        assert UserFilm.objects.get(user=user, film=film).is_favorite is False
+
+    def test_bulk_add_form(self, client, user, film):
+        """Форма с повторяющимся tmdb_ids"""
+        client.force_login(user)
+
+        response = client.post(reverse("films:bulk_add_films"), {"tmdb_ids": [film.tmdb_id]})
+
+        assert response.json()["results"] == [{"tmdb_id": film.tmdb_id, "status": "added"}]
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"tmdb_ids": [], "action": "favorite"},
+            {"tmdb_ids": ["x"], "action": "favorite"},
+            {"tmdb_ids": [1]},
+            [1, 2],
+            "x",
+            3,
+        ],
+    )
+    def test_bulk_update_bad_request(self, client, user, payload):
+        """Пустой список, некорректный id, неизвестное действие или JSON не объект - 400"""
+        client.force_login(user)
+
+        response = client.post(
+            reverse("films:bulk_update_status"), json.dumps(payload), content_type="application/json"
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,105 @@
+from unittest.mock import Mock
+
+import pytest
+
+from films.services.cache_warmup import RateLimiter, warm_tmdb_cache
+
+
+@pytest.fixture
+def fake_tmdb_get(monkeypatch):
+    """Мок запросов к TMDB: подборки содержат фильмы 1 и 2"""
+
+    def fake_get(self, path, params=None, ttl_key="recommended", **kwargs):
+        if path.startswith("/movie/") and path.split("/")[2].isdigit():
+            return {"id": int(path.split("/")[2])}
+        return {"results": [{"id": 1}, {"id": 2}], "total_pages": 5}
+
+    mock_get = Mock(side_effect=fake_get, autospec=True)
+    monkeypatch.setattr("services.tmdb.Tmdb._get", lambda self, *a, **k: mock_get(self, *a, **k))
+    return mock_get
+
+
+@pytest.mark.django_db
+def test_warm_tmdb_cache_fetches_lists_and_members(fake_tmdb_get, monkeypatch):
+    """Прогрев загружает все страницы подборок, затем детали и актеров каждого фильма"""
+    monkeypatch.setattr("films.services.cache_warmup.cache.get_many", lambda keys: {})
+
+    stats = warm_tmdb_cache(rate=0)
+
+    assert stats["films"] == 2
+    assert stats["total"] == 11 + 4  # 11 страниц подборок + детали/актеры 2 фильмов
+    assert stats["hits"] == 0
+    assert stats["fetched"] == 15
+    assert fake_tmdb_get.call_count == 15
+
+
+@pytest.mark.django_db
+def test_warm_tmdb_cache_refreshes_cached_keys(fake_tmdb_get, monkeypatch):
+    """Ответы, которые уже в кэше, тоже загружаются заново: иначе истекли бы к ночному пересчету"""
+    monkeypatch.setattr(
+        "films.services.cache_warmup.cache.get_many",
+        lambda keys: {key: {"results": [{"id": 1}]} for key in keys},
+    )
+
+    stats = warm_tmdb_cache(rate=0)
+
+    assert stats["hit_ratio_before"] == 1.0
+    assert fake_tmdb_get.call_count == 15
+    assert all(c.kwargs == {"refresh": True} for c in fake_tmdb_get.call_args_list)
+
+
+@pytest.mark.django_db
+def test_warm_tmdb_cache_reports_hit_ratio_after_warming(fake_tmdb_get, monkeypatch):
+    """hit_ratio - доля ответов в кэше после прогрева, hit_ratio_before - до него"""
+    calls = []
+
+    def get_many(keys):
+        calls.append(keys)
+        return {} if len(calls) % 2 else {key: {"results": [{"id": 1}]} for key in keys}
+
+    monkeypatch.setattr("films.services.cache_warmup.cache.get_many", get_many)
+
+    stats = warm_tmdb_cache(rate=0)
+
+    assert stats["hit_ratio_before"] == 0.0
+    assert stats["hit_ratio"] == 1.0
+
+
+@pytest.mark.django_db
+def test_warm_tmdb_cache_invalidates_local_tier(fake_tmdb_get, monkeypatch):
+    """Обновленные в Redis подборки сбрасываются в локальном уровне; детали фильмов в нем не хранятся"""
+    monkeypatch.setattr("films.services.cache_warmup.cache.get_many", lambda keys: {})
+    invalidate = Mock()
+    monkeypatch.setattr("services.tmdb.Tmdb.invalidate_local_cache", invalidate)
+
+    warm_tmdb_cache(rate=0)
+
+    assert [c.args[0] for c in invalidate.call_args_list] == ["popular", "top_rated", "trending"]
+
+
+@pytest.mark.django_db
+def test_warm_tmdb_cache_keeps_local_tier_when_api_fails(monkeypatch):
+    """TMDB не ответил: в Redis остались прежние подборки, локальный уровень не сбрасывается"""
+    monkeypatch.setattr("services.tmdb.Tmdb._get", lambda self, *a, **k: {})
+    monkeypatch.setattr("films.services.cache_warmup.cache.get_many", lambda keys: {})
+    invalidate = Mock()
+    monkeypatch.setattr("services.tmdb.Tmdb.invalidate_local_cache", invalidate)
+
+    stats = warm_tmdb_cache(rate=0)
+
+    assert stats["failed"] == 11
+    invalidate.assert_not_called()
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    """Ограничитель раздает слоты с интервалом 1/rate"""
+    sleeps = []
+    monkeypatch.setattr("films.services.cache_warmup.time.monotonic", lambda: 100.0)
+    monkeypatch.setattr("films.services.cache_warmup.time.sleep", sleeps.append)
+    limiter = RateLimiter(rate=10)
+
+    limiter.wait()
+    limiter.wait()
+    limiter.wait()
+
+    assert sleeps == pytest.approx([0.1, 0.2])
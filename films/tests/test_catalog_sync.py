@@ -0,0 +1,152 @@
+import gzip
+import json
+from datetime import date, timedelta
+from unittest.mock import MagicMock, Mock
+
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+
+from films.models import CatalogFilm
+from films.services.catalog_sync import (
+    build_catalog_film,
+    id_export,
+    ids_to_refresh,
+    iter_export_ids,
+    skip_fresh,
+    sync_catalog,
+    upsert_catalog,
+)
+
+
+@pytest.fixture
+def catalog_entry():
+    return {
+        "details": {
+            "id": 100,
+            "title": "Test film",
+            "release_date": "2024-01-01",
+            "popularity": 12.5,
+            "genres": [{"id": 1, "name": "Action"}],
+        },
+        "credits": {
+            "cast": [{"id": i, "name": f"Actor {i}"} for i in range(30)],
+            "crew": [
+                {"id": 1, "name": "Director 1", "job": "Director"},
+                {"id": 2, "name": "Grip 1", "job": "Grip"},
+            ],
+        },
+        "keywords": [{"id": 5, "name": "dream"}],
+    }
+
+
+@pytest.fixture
+def fake_api(monkeypatch, catalog_entry):
+    """Мок TMDB клиента для синхронизации"""
+    api = Mock()
+    api.get_movie_details.side_effect = lambda tmdb_id: {**catalog_entry["details"], "id": tmdb_id}
+    api.get_credits.return_value = catalog_entry["credits"]
+    api.get_keywords.return_value = {"keywords": catalog_entry["keywords"]}
+    monkeypatch.setattr("films.services.catalog_sync.Tmdb", lambda use_catalog=False: api)
+    return api
+
+
+def test_build_catalog_film_trims_credits(catalog_entry):
+    """Зеркало хранит только топ актеров и ключевые должности"""
+    film = build_catalog_film(100, catalog_entry, timezone.now())
+
+    assert len(film.credits["cast"]) == 20
+    assert [c["job"] for c in film.credits["crew"]] == ["Director"]
+    assert film.genre_ids == [1]
+    assert film.release_date.year == 2024
+
+
+@pytest.mark.django_db
+def test_upsert_catalog_updates_existing(catalog_entry):
+    """Повторная синхронизация обновляет запись, а не создает дубль"""
+    upsert_catalog([build_catalog_film(100, catalog_entry, timezone.now())])
+    catalog_entry["details"]["title"] = "Renamed"
+    upsert_catalog([build_catalog_film(100, catalog_entry, timezone.now())])
+
+    assert CatalogFilm.objects.count() == 1
+    assert CatalogFilm.objects.get(tmdb_id=100).title == "Renamed"
+
+
+@pytest.mark.django_db
+def test_sync_catalog_fetches_and_saves(fake_api):
+    """Синхронизация загружает фильмы и сохраняет их пачками"""
+    stats = sync_catalog([1, 2, 2, 3], workers=2, chunk_size=2)
+
+    assert stats == {"requested": 3, "synced": 3, "failed": 0}
+    assert set(CatalogFilm.objects.values_list("tmdb_id", flat=True)) == {1, 2, 3}
+
+
+@pytest.mark.django_db
+def test_sync_catalog_is_rate_limited(fake_api, mocker):
+    """Каждый запрос к TMDB (детали, актеры, ключевые слова) проходит через общий ограничитель частоты"""
+    wait = mocker.patch("films.services.catalog_sync.RateLimiter.wait")
+    sync_catalog([1, 2], workers=2)
+
+    assert wait.call_count == 6
+
+
+@pytest.mark.django_db
+def test_sync_catalog_counts_failures(fake_api):
+    """Фильмы без ответа TMDB считаются ошибками и не сохраняются"""
+    fake_api.get_movie_details.side_effect = lambda tmdb_id: {}
+    stats = sync_catalog([1])
+
+    assert stats["failed"] == 1
+    assert not CatalogFilm.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ids_to_refresh_and_skip_fresh(film, catalog_entry):
+    """Плановая синхронизация берет фильмы библиотек без зеркала и устаревшие записи"""
+    upsert_catalog([build_catalog_film(200, catalog_entry, timezone.now() - timedelta(days=60))])
+    upsert_catalog([build_catalog_film(300, catalog_entry, timezone.now())])
+
+    assert ids_to_refresh() == [film.tmdb_id, 200]
+    assert list(skip_fresh([200, 300])) == [200]
+
+
+def test_iter_export_ids(tmp_path):
+    """Выгрузка TMDB читается построчно с фильтрами"""
+    path = tmp_path / "movie_ids.json.gz"
+    rows = [
+        {"id": 1, "popularity": 5.0, "adult": False, "video": False},
+        {"id": 2, "popularity": 50.0, "adult": False, "video": False},
+        {"id": 3, "popularity": 90.0, "adult": True, "video": False},
+        {"id": 4, "popularity": 20.0, "adult": False, "video": False},
+    ]
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(json.dumps(r) for r in rows))
+
+    assert list(iter_export_ids(path, min_popularity=10)) == [2, 4]
+    assert list(iter_export_ids(path, limit=1)) == [2]
+
+
+def test_id_export_removes_downloaded_file(tmp_path, monkeypatch):
+    """Скачанная выгрузка удаляется после использования, в том числе при ошибке синхронизации"""
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [b"chunk"]
+    monkeypatch.setattr("films.services.catalog_sync.requests.get", Mock(return_value=response))
+
+    with id_export(date(2024, 1, 1), tmp_path) as path:
+        assert path.read_bytes() == b"chunk"
+    assert not path.exists()
+
+    with pytest.raises(RuntimeError):
+        with id_export(date(2024, 1, 2), tmp_path) as path:
+            raise RuntimeError("sync failed")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_sync_tmdb_catalog_command(fake_api):
+    """Команда синхронизирует переданные tmdb_id"""
+    call_command("sync_tmdb_catalog", "--ids", "7", "8")
+
+    assert CatalogFilm.objects.filter(tmdb_id__in=[7, 8]).count() == 2
@@ -0,0 +1,108 @@
+from unittest.mock import Mock
+
+import pytest
+
+from films.models import UserFilm
+from films.services.collections import (
+    apply_status_overlay,
+    get_collection_page,
+    get_snapshot,
+    refresh_snapshot,
+    snapshot_key,
+)
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    yield
+    from django.core.cache import cache
+
+    cache.clear()
+
+
+@pytest.fixture
+def fake_tmdb(monkeypatch, film):
+    tmdb = Mock()
+    tmdb.get_popular.return_value = [{"id": film.tmdb_id, "genre_ids": []}] + [
+        {"id": 900 + i, "title": f"TMDB {i}", "genre_ids": [], "vote_average": 7} for i in range(14)
+    ]
+    monkeypatch.setattr("films.services.collections.Tmdb", Mock(return_value=tmdb))
+    return tmdb
+
+
+@pytest.mark.django_db
+def test_refresh_snapshot_is_user_independent(film, fake_tmdb, locmem_cache):
+    from django.core.cache import cache
+
+    assert refresh_snapshot("popular") == 15
+    cards = cache.get(snapshot_key("popular"))
+    assert cards[0]["tmdb_id"] == film.tmdb_id
+    assert cards[0]["in_library"] is False
+
+
+@pytest.mark.django_db
+def test_refresh_snapshot_keeps_previous_on_empty_response(fake_tmdb, locmem_cache):
+    from django.core.cache import cache
+
+    cache.set(snapshot_key("popular"), [{"tmdb_id": 1}])
+    fake_tmdb.get_popular.return_value = []
+
+    assert refresh_snapshot("popular") == 0
+    assert cache.get(snapshot_key("popular")) == [{"tmdb_id": 1}]
+
+
+@pytest.mark.django_db
+def test_refresh_snapshot_keeps_fuller_previous(fake_tmdb, locmem_cache):
+    """Часть страниц TMDB не загрузилась: более полный прежний снимок не заменяется урезанным"""
+    from django.core.cache import cache
+
+    previous = [{"tmdb_id": i} for i in range(60)]
+    cache.set(snapshot_key("popular"), previous)
+
+    assert refresh_snapshot("popular") == 15
+    assert cache.get(snapshot_key("popular")) == previous
+
+    fake_tmdb.get_popular.return_value = [{"id": 900 + i, "genre_ids": []} for i in range(60)]
+    refresh_snapshot("popular")
+    assert cache.get(snapshot_key("popular"))[0]["tmdb_id"] == 900
+
+
+@pytest.mark.django_db
+def test_get_snapshot_skips_caching_partial(fake_tmdb, locmem_cache, monkeypatch):
+    """Снимок, собранный на месте с неполными страницами или исчерпанным бюджетом, не кэшируется"""
+    from django.core.cache import cache
+
+    assert len(get_snapshot("popular")) == 15
+    assert cache.get(snapshot_key("popular")) is None
+
+    fake_tmdb.get_popular.return_value = [{"id": 900 + i, "genre_ids": []} for i in range(60)]
+    monkeypatch.setattr("films.services.collections.is_exhausted", lambda: True)
+    get_snapshot("popular")
+    assert cache.get(snapshot_key("popular")) is None
+
+    monkeypatch.setattr("films.services.collections.is_exhausted", lambda: False)
+    get_snapshot("popular")
+    assert len(cache.get(snapshot_key("popular"))) == 60
+
+
+@pytest.mark.django_db
+def test_collection_page_overlays_user_statuses(user, film, fake_tmdb, locmem_cache, django_assert_num_queries):
+    """Снимок собирается один раз, на запрос - только статусы пользователя для видимой страницы"""
+    UserFilm.objects.create(user=user, film=film, is_favorite=True)
+    refresh_snapshot("popular")
+
+    # id фильмов из БД, затем UserFilm / Review / календарь
+    with django_assert_num_queries(4):
+        page = get_collection_page("popular", user, page_number=1, per_page=12)
+
+    assert fake_tmdb.get_popular.call_count == 1
+    assert len(page.object_list) == 12
+    assert page.object_list[0]["in_library"] is True
+    assert page.object_list[0]["is_favorite"] is True
+    assert page.paginator.num_pages == 2
+
+
+def test_apply_status_overlay_anonymous(anon_user):
+    cards = [{"tmdb_id": 1}]
+    assert apply_status_overlay(cards, anon_user) is cards
@@ -0,0 +1,200 @@
+from datetime import date, timedelta
+from unittest.mock import Mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from films.models import CatalogFilm, DiaryImport, UserFilm
+from films.services.diary_import import STALE_IMPORT_AFTER, parse_row, run_import
+from films.tasks import recover_stale_diary_imports
+from reviews.models import Review
+
+LETTERBOXD_CSV = (
+    "Date,Name,Year,Letterboxd URI,Rating,Rewatch,Tags,Watched Date\n"
+    "2024-01-02,Test film,,https://boxd.it/a,4.5,,,2024-01-01\n"
+    "2024-02-02,Test film,,https://boxd.it/a,3,Yes,,2024-02-01\n"
+    "2024-03-02,New film,2020,https://boxd.it/b,,,,\n"
+    "2024-04-02,Unknown film,1999,https://boxd.it/c,2,,,\n"
+)
+
+IMDB_CSV = (
+    "Const,Your Rating,Date Rated,Title,URL,Title Type,IMDb Rating,Runtime (mins),Year\n"
+    "tt0000100,7,2023-05-06,Test film,https://imdb.com/title/tt0000100/,Movie,7.5,100,2020\n"
+    "tt0000200,9,2023-05-07,Some series,https://imdb.com/title/tt0000200/,TV Series,8.0,50,2019\n"
+)
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.PRIVATE_MEDIA_ROOT = tmp_path / "private"
+    return tmp_path
+
+
+def make_import(user, content: str, name="diary.csv") -> DiaryImport:
+    return DiaryImport.objects.create(user=user, file=SimpleUploadedFile(name, content.encode()))
+
+
+def test_parse_row_scales_letterboxd_stars():
+    row = parse_row("letterboxd", {"Name": "Film", "Year": "2001", "Rating": "0.5", "Date": "2024-01-01"})
+    assert row["rating"] == 1
+    assert row["year"] == 2001
+    assert row["watched_at"] == date(2024, 1, 1)
+
+
+def test_parse_row_skips_imdb_series():
+    assert parse_row("imdb", {"Const": "tt1", "Title": "Show", "Title Type": "TV Series"}) is None
+
+
+@pytest.mark.django_db
+def test_run_import_letterboxd(user, film, tmdb_payload, media, monkeypatch):
+    """Фильм из БД находится по названию, новый - через TMDB, ненайденный попадает в unresolved"""
+    api = Mock()
+    api.search_movie.side_effect = lambda title, year=None: {"results": [{"id": 300}] if title == "New film" else []}
+    monkeypatch.setattr("films.services.diary_import.Tmdb", Mock(return_value=api))
+    monkeypatch.setattr("films.services.diary_import.get_tmdb_movie_payloads", Mock(return_value={300: tmdb_payload}))
+    diary_import = make_import(user, LETTERBOXD_CSV)
+
+    run_import(diary_import.id)
+
+    diary_import.refresh_from_db()
+    assert diary_import.status == DiaryImport.Status.DONE
+    assert diary_import.source == "letterboxd"
+    assert (diary_import.total, diary_import.processed) == (4, 4)
+    assert (diary_import.imported, diary_import.reviews) == (2, 1)
+    assert diary_import.unresolved == ["Unknown film (1999)"]
+    assert set(UserFilm.objects.filter(user=user).values_list("film__tmdb_id", flat=True)) == {film.tmdb_id, 300}
+
+    review = Review.objects.get(user=user, film=film)  # из двух просмотров - последний
+    assert review.watched_at == date(2024, 2, 1)
+    assert review.user_rating == review.plot_rating == 6
+
+
+@pytest.mark.django_db
+def test_run_import_imdb_uses_catalog(user, film, media, monkeypatch):
+    """id IMDb сопоставляется по зеркалу каталога без запросов к TMDB; сериалы пропускаются"""
+    CatalogFilm.objects.create(tmdb_id=film.tmdb_id, details={"imdb_id": "tt0000100"}, synced_at=timezone.now())
+    api = Mock()
+    monkeypatch.setattr("films.services.diary_import.Tmdb", Mock(return_value=api))
+    diary_import = make_import(user, IMDB_CSV)
+
+    run_import(diary_import.id)
+
+    diary_import.refresh_from_db()
+    assert diary_import.source == "imdb"
+    assert (diary_import.processed, diary_import.reviews) == (1, 1)
+    assert Review.objects.get(user=user, film=film).user_rating == 7
+    api.find_by_imdb_id.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_run_import_keeps_existing_review(user, film, media):
+    Review.objects.create(
+        user=user,
+        film=film,
+        watched_at=date(2024, 1, 1),
+        plot_rating=10,
+        acting_rating=10,
+        directing_rating=10,
+        visuals_rating=10,
+        soundtrack_rating=10,
+    )
+    diary_import = make_import(user, "Date,Name,Year,Rating\n2024-01-02,Test film,,1\n")
+
+    run_import(diary_import.id)
+
+    diary_import.refresh_from_db()
+    assert diary_import.reviews == 0
+    assert Review.objects.get(user=user, film=film).user_rating == 10
+
+
+@pytest.mark.django_db
+def test_run_import_unknown_format_fails(user, media):
+    diary_import = make_import(user, "foo,bar\n1,2\n")
+
+    run_import(diary_import.id)
+
+    diary_import.refresh_from_db()
+    assert diary_import.status == DiaryImport.Status.FAILED
+    assert "Letterboxd" in diary_import.error
+
+
+@pytest.mark.django_db
+def test_run_import_deletes_file(user, media):
+    """Файл лежит вне MEDIA_ROOT и удаляется после завершения импорта - и удачного, и упавшего"""
+    done = make_import(user, "Date,Name,Year,Rating\n2024-01-02,Missing film,,1\n")
+    failed = make_import(user, "foo,bar\n1,2\n")
+    paths = [media / "private" / done.file.name, media / "private" / failed.file.name]
+    assert all(path.exists() for path in paths)
+    assert not (media / "media").exists()
+
+    assert run_import(done.id).status == DiaryImport.Status.DONE
+    assert run_import(failed.id).status == DiaryImport.Status.FAILED
+
+    assert not any(path.exists() for path in paths)
+    assert not DiaryImport.objects.exclude(file="").exists()
+
+
+@pytest.mark.django_db
+def test_recover_stale_imports(user, media, monkeypatch):
+    """Потерянный PENDING ставится в очередь повторно, RUNNING без пульса завершается с ошибкой, свежие не трогаются"""
+    delay = Mock()
+    monkeypatch.setattr("films.tasks.import_diary.delay", delay)
+    fresh, lost, dead = (make_import(user, LETTERBOXD_CSV) for _ in range(3))
+    DiaryImport.objects.filter(id=dead.id).update(status=DiaryImport.Status.RUNNING)
+    DiaryImport.objects.filter(id__in=[lost.id, dead.id]).update(
+        updated_at=timezone.now() - STALE_IMPORT_AFTER - timedelta(minutes=1)
+    )
+
+    assert tuple(recover_stale_diary_imports.apply().get()) == (1, 1)
+
+    delay.assert_called_once_with(lost.id)
+    dead.refresh_from_db()
+    assert dead.status == DiaryImport.Status.FAILED
+    assert dead.finished_at is not None and not dead.file
+    assert recover_stale_diary_imports.apply().get() == (0, 0)
+
+
+@pytest.mark.django_db
+def test_run_import_runs_once(user, media):
+    """Повторно поставленная задача не запускает уже захваченный импорт"""
+    diary_import = make_import(user, LETTERBOXD_CSV)
+    DiaryImport.objects.filter(id=diary_import.id).update(status=DiaryImport.Status.RUNNING)
+
+    assert run_import(diary_import.id).processed == 0
+
+
+@pytest.mark.django_db
+class TestDiaryImportViews:
+    def test_upload_enqueues_import(self, client, user, media, monkeypatch, django_capture_on_commit_callbacks):
+        enqueue = Mock()
+        monkeypatch.setattr("films.services.diary_import.enqueue_import", enqueue)
+        client.force_login(user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(
+                reverse("films:diary_import"), {"file": SimpleUploadedFile("ratings.csv", IMDB_CSV.encode())}
+            )
+
+        assert response.status_code == 302
+        diary_import = DiaryImport.objects.get(user=user)
+        enqueue.assert_called_once_with(diary_import.id)
+
+    def test_upload_rejects_non_csv(self, client, user, media):
+        client.force_login(user)
+        response = client.post(reverse("films:diary_import"), {"file": SimpleUploadedFile("a.txt", b"x")})
+        assert response.status_code == 200
+        assert not DiaryImport.objects.exists()
+
+    def test_status_only_for_owner(self, client, user, django_user_model, media):
+        diary_import = make_import(user, LETTERBOXD_CSV)
+        other = django_user_model.objects.create_user(username="other", email="o@example.com", password="x")
+        client.force_login(other)
+        url = reverse("films:diary_import_status", kwargs={"pk": diary_import.id})
+        assert client.get(url).status_code == 404
+
+        client.force_login(user)
+        assert client.get(url).json()["status"] == "pending"
@@ -0,0 +1,101 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.urls import reverse
+
+import pytest
+
+from calendar_events.models import CalendarEvent
+from films.models import UserFilm
+from films.services.export import export_diary
+from reviews.models import Review
+
+
+@pytest.fixture
+def diary(user, film):
+    UserFilm.objects.create(user=user, film=film, is_favorite=True)
+    Review.objects.create(
+        user=user,
+        film=film,
+        watched_at=date(2024, 1, 1),
+        plot_rating=8,
+        acting_rating=8,
+        directing_rating=8,
+        visuals_rating=8,
+        soundtrack_rating=8,
+        review="Хорошо",
+    )
+    CalendarEvent.objects.create(
+        user=user, film=film, planned_date=date.today() + timedelta(days=1), note="с друзьями"
+    )
+    return user
+
+
+@pytest.mark.django_db
+def test_export_csv_rows(diary, film):
+    """CSV содержит фильм, отзыв и запланированный просмотр"""
+    content = b"".join(export_diary(diary, "csv")).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(content)))
+
+    assert [r["kind"] for r in rows] == ["film", "review", "planned"]
+    assert rows[0]["is_favorite"] == "True"
+    assert rows[1]["user_rating"] == "8.0"
+    assert rows[2]["note"] == "с друзьями"
+    assert all(r["tmdb_id"] == str(film.tmdb_id) for r in rows)
+
+
+@pytest.mark.django_db
+def test_export_json_gzip(diary):
+    """JSON в gzip: валидный объект с тремя разделами"""
+    data = json.loads(gzip.decompress(b"".join(export_diary(diary, "json", gzip=True))))
+
+    assert len(data["films"]) == len(data["reviews"]) == len(data["calendar"]) == 1
+    assert data["reviews"][0]["review"] == "Хорошо"
+
+
+@pytest.mark.django_db
+def test_export_queries_do_not_grow_with_history(diary, django_assert_num_queries):
+    """По одному запросу на раздел: фильмы подтягиваются select_related"""
+    with django_assert_num_queries(3):
+        b"".join(export_diary(diary, "csv"))
+
+
+@pytest.mark.django_db
+def test_export_view_streams(client, diary):
+    """Представление отдает потоковый ответ-вложение"""
+    client.force_login(diary)
+
+    response = client.get(reverse("films:export_diary"), {"format": "csv", "gzip": "1"})
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/gzip"
+    assert "filmdiary_test.csv.gz" in response["Content-Disposition"]
+    assert gzip.decompress(b"".join(response.streaming_content)).startswith(b"kind,tmdb_id")
+    assert client.get(reverse("films:export_diary"), {"format": "xml"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_view_non_ascii_filename(client, diary):
+    """Кириллическое имя пользователя передается в filename*= (RFC 5987), а не MIME-кодировкой заголовка"""
+    diary.username = "кино"
+    diary.save()
+    client.force_login(diary)
+
+    response = client.get(reverse("films:export_diary"), {"format": "json"})
+
+    assert response["Content-Disposition"] == "attachment; filename*=utf-8''filmdiary_%D0%BA%D0%B8%D0%BD%D0%BE.json"
+
+
+@pytest.mark.django_db
+def test_export_command(diary, tmp_path):
+    """Команда пишет выгрузку в файл"""
+    path = tmp_path / "diary.json"
+
+    call_command("export_diary", diary.username, "--format", "json", "--output", str(path), stdout=io.StringIO())
+
+    assert json.loads(path.read_text(encoding="utf-8"))["films"][0]["title"] == "Test film"
@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+
+import pytest
+
+from calendar_events.models import CalendarEvent
+from films.models import Film, UserFilm
+from films.services.builders import build_film_card
+from films.services.film_statuses import (
+    FilmStatusResolver,
+    end_status_scope,
+    get_status_resolver,
+    start_status_scope,
+)
+from reviews.models import Review
+
+
+@pytest.fixture
+def films(db):
+    return [Film.objects.create(tmdb_id=700 + i, title=f"Film {i}", overview="") for i in range(10)]
+
+
+@pytest.mark.django_db
+def test_resolver_loads_statuses_once(user, films, django_assert_num_queries):
+    """Статусы набора фильмов - три запроса, повторные обращения из памяти"""
+    UserFilm.objects.create(user=user, film=films[0], is_favorite=True)
+    Review.objects.create(
+        user=user,
+        film=films[0],
+        watched_at=date(2024, 1, 1),
+        plot_rating=9,
+        acting_rating=9,
+        directing_rating=9,
+        visuals_rating=9,
+        soundtrack_rating=9,
+    )
+    CalendarEvent.objects.create(user=user, film=films[1], planned_date=date.today() + timedelta(days=1))
+    resolver = FilmStatusResolver(user)
+
+    with django_assert_num_queries(3):
+        resolver.load(f.id for f in films)
+        resolver.load(f.id for f in films)
+        status = resolver.card_status(films[0].id)
+        planned = [f.id for f in films if resolver.is_planned(f.id)]
+
+    assert status["in_library"] is True
+    assert status["is_favorite"] is True
+    assert status["user_rating"] == 9
+    assert status["rating_color"] == "high"
+    assert planned == [films[1].id]
+
+
+@pytest.mark.django_db
+def test_resolver_prime_skips_known_rows(user, films, django_assert_num_queries):
+    user_films = [UserFilm.objects.create(user=user, film=f) for f in films[:3]]
+    resolver = FilmStatusResolver(user)
+    resolver.prime(user_films=user_films)
+
+    with django_assert_num_queries(2):  # только отзывы и календарь
+        resolver.load(uf.film_id for uf in user_films)
+
+
+@pytest.mark.django_db
+def test_build_film_card_uses_request_resolver(user, films, django_assert_num_queries):
+    """Карточки фильмов из БД не делают запрос на каждую карточку"""
+    token = start_status_scope()
+    try:
+        get_status_resolver(user).load(f.id for f in films)
+        with django_assert_num_queries(len(films)):  # только жанры каждой карточки (без prefetch в тесте)
+            cards = [build_film_card(film=f, user=user) for f in films]
+    finally:
+        end_status_scope(token)
+
+    assert all(card["in_library"] is False for card in cards)
+
+
+@pytest.mark.django_db
+def test_resolver_anonymous_makes_no_queries(django_assert_num_queries, anon_user):
+    resolver = FilmStatusResolver(anon_user)
+    with django_assert_num_queries(0):
+        assert resolver.card_status(1)["in_library"] is False
@@ -1,6 +1,7 @@
+import threading
 from unittest.mock import Mock
 
-from films.services.tmdb_movie_payload import get_tmdb_movie_payload
+from films.services.tmdb_movie_payload import get_tmdb_movie_payload, get_tmdb_movie_payloads
 
 
 def test_get_tmdb_movie_payload_from_cache(monkeypatch):
@@ -45,3 +46,94 @@ def test_get_tmdb_movie_payload_cache_miss(monkeypatch):
         "credits": mock_credits,
     }
     mock_cache_set.assert_called_once()
+
+
+def test_get_tmdb_movie_payload_failure_is_logged(monkeypatch, capsys):
+    """Сбой TMDB пишется в лог, а не в stdout, и не кэшируется"""
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.get", Mock(return_value=None))
+    monkeypatch.setattr(
+        "films.services.tmdb_movie_payload.tmdb",
+        Mock(get_movie_details=Mock(return_value={"title": "Test"}), get_credits=Mock(return_value={})),
+    )
+    mock_cache_set = Mock()
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.set", mock_cache_set)
+    logger = Mock()
+    monkeypatch.setattr("films.services.tmdb_movie_payload.logger", logger)
+
+    assert get_tmdb_movie_payload(123) is None
+
+    logger.warning.assert_called_once_with("TMDB payload FAIL: tmdb_id=%s details=%s credits=%s", 123, True, False)
+    assert capsys.readouterr().out == ""
+    mock_cache_set.assert_not_called()
+
+
+def test_get_tmdb_movie_payloads_batches_cache(monkeypatch):
+    """Пакетная загрузка: один get_many, промахи из TMDB, сохранение одним set_many"""
+    cached = {"tmdb:movie:1": {"details": {"id": 1}, "credits": {"cast": []}}}
+    get_many = Mock(return_value=cached)
+    set_many = Mock()
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.get_many", get_many)
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.set_many", set_many)
+    monkeypatch.setattr("films.services.tmdb_movie_payload.tmdb", Mock(_from_catalog_bulk=Mock(return_value={})))
+    monkeypatch.setattr(
+        "films.services.tmdb_movie_payload.tmdb_api",
+        Mock(
+            get_movie_details=Mock(side_effect=lambda tmdb_id: {"id": tmdb_id} if tmdb_id == 2 else {}),
+            get_credits=Mock(side_effect=lambda tmdb_id: {"cast": []} if tmdb_id == 2 else {}),
+        ),
+    )
+
+    result = get_tmdb_movie_payloads([1, 2, 3, 2])
+
+    get_many.assert_called_once_with(["tmdb:movie:1", "tmdb:movie:2", "tmdb:movie:3"])
+    assert set(result) == {1, 2}
+    set_many.assert_called_once_with({"tmdb:movie:2": {"details": {"id": 2}, "credits": {"cast": []}}}, timeout=43200)
+
+
+def test_get_tmdb_movie_payloads_all_cached(monkeypatch):
+    """Если все фильмы в кэше, к TMDB не обращаемся"""
+    monkeypatch.setattr(
+        "films.services.tmdb_movie_payload.cache.get_many", lambda keys: {key: {"details": {}} for key in keys}
+    )
+    tmdb = Mock()
+    monkeypatch.setattr("films.services.tmdb_movie_payload.tmdb", tmdb)
+
+    assert set(get_tmdb_movie_payloads([1, 2])) == {1, 2}
+    tmdb.get_movie_details.assert_not_called()
+
+
+def test_get_tmdb_movie_payloads_reads_catalog_before_threads(monkeypatch):
+    """Фильмы из зеркала каталога берутся одним запросом в текущем потоке, в потоки к API уходят только промахи"""
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.get_many", lambda keys: {})
+    set_many = Mock()
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.set_many", set_many)
+    mirrored = Mock(details={"id": 1}, credits={"cast": []})
+    monkeypatch.setattr(
+        "films.services.tmdb_movie_payload.tmdb", Mock(_from_catalog_bulk=Mock(return_value={1: mirrored}))
+    )
+    api = Mock(get_movie_details=Mock(return_value={"id": 2}), get_credits=Mock(return_value={"cast": []}))
+    monkeypatch.setattr("films.services.tmdb_movie_payload.tmdb_api", api)
+
+    result = get_tmdb_movie_payloads([1, 2])
+
+    assert result[1] == {"details": {"id": 1}, "credits": {"cast": []}}
+    api.get_movie_details.assert_called_once_with(2)
+    assert set(set_many.call_args.args[0]) == {"tmdb:movie:1", "tmdb:movie:2"}
+
+
+def test_get_tmdb_movie_payloads_single_worker_runs_inline(monkeypatch):
+    """PAYLOAD_WORKERS = 1: промахи загружаются в текущем потоке, без пула"""
+    monkeypatch.setattr("films.services.tmdb_movie_payload.PAYLOAD_WORKERS", 1)
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.get_many", lambda keys: {})
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.set_many", Mock())
+    monkeypatch.setattr("films.services.tmdb_movie_payload.tmdb", Mock(_from_catalog_bulk=Mock(return_value={})))
+    threads = []
+    api = Mock(
+        get_movie_details=Mock(side_effect=lambda tmdb_id: threads.append(threading.get_ident()) or {"id": tmdb_id}),
+        get_credits=Mock(return_value={"cast": []}),
+    )
+    monkeypatch.setattr("films.services.tmdb_movie_payload.tmdb_api", api)
+    monkeypatch.setattr("films.services.tmdb_movie_payload.ThreadPoolExecutor", Mock(side_effect=AssertionError))
+
+    assert set(get_tmdb_movie_payloads([1, 2, 3])) == {1, 2, 3}
+    assert threads == [threading.get_ident()] * 3
@@ -0,0 +1,217 @@
+from io import BytesIO
+from unittest.mock import ANY, Mock
+
+from django.template import Context, Template
+
+import pytest
+from PIL import Image
+
+from films.services import posters
+from films.services.posters import (
+    cache_poster,
+    cache_posters,
+    end_poster_batch,
+    pop_pending,
+    poster_name,
+    poster_srcset,
+    poster_urls,
+    queue_poster,
+    queue_posters,
+    start_poster_batch,
+)
+from services.tmdb import Tmdb
+
+
+@pytest.fixture(autouse=True)
+def clear_resolved():
+    posters._resolved.clear()
+    yield
+    posters._resolved.clear()
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MEDIA_URL = "/media/"
+    return tmp_path
+
+
+@pytest.fixture
+def tmdb_image(monkeypatch):
+    buffer = BytesIO()
+    Image.new("RGB", (780, 1170), "red").save(buffer, "JPEG")
+    get = Mock(return_value=Mock(content=buffer.getvalue(), raise_for_status=Mock()))
+    monkeypatch.setattr("films.services.posters.requests.get", get)
+    return get
+
+
+def test_poster_name_rejects_unsafe_paths():
+    """Из пути TMDB берется только имя файла, подозрительные пути отбрасываются"""
+    assert poster_name("/abc_123.jpg") == "abc_123"
+    assert poster_name("/../../etc/passwd.jpg") is None
+    assert poster_name(None) is None
+
+
+def test_uncached_poster_links_tmdb_and_queues(media, monkeypatch):
+    """Пока постера нет в media, отдаются ссылки TMDB, а постер ставится в очередь"""
+    queue = Mock()
+    monkeypatch.setattr("films.services.posters.queue_poster", queue)
+
+    urls = poster_urls("/abc.jpg")
+
+    assert urls["card"] == "https://image.tmdb.org/t/p/w342/abc.jpg"
+    queue.assert_called_once_with("/abc.jpg")
+
+
+def test_queue_poster_deduplicates(monkeypatch):
+    """Постер попадает в очередь один раз за QUEUED_TTL"""
+    monkeypatch.setattr("films.services.posters.cache.add", Mock(side_effect=[True, False]))
+    monkeypatch.setattr("films.services.posters.cache.get", Mock(return_value=["/old.jpg"]))
+    cache_set = Mock()
+    monkeypatch.setattr("films.services.posters.cache.set", cache_set)
+
+    queue_poster("/abc.jpg")
+    queue_poster("/abc.jpg")
+
+    cache_set.assert_called_once_with(posters.PENDING_KEY, ["/old.jpg", "/abc.jpg"], None)
+
+
+def _redis_pipelines(monkeypatch, added):
+    """Мок клиента Redis: первый pipeline - SET NX флагов (результаты added), второй - RPUSH + LTRIM"""
+    flags, push = Mock(), Mock()
+    flags.execute.return_value = added
+    push.rpush.return_value = push
+    push.ltrim.return_value = push
+    client = Mock(pipeline=Mock(side_effect=[flags, push]))
+    monkeypatch.setattr("films.services.posters._redis", Mock(return_value=client))
+    return flags, push
+
+
+def test_queue_poster_uses_atomic_redis_list(monkeypatch):
+    """В Redis постер добавляется в список одним RPUSH + LTRIM, без чтения и перезаписи всей очереди"""
+    flags, push = _redis_pipelines(monkeypatch, [True])
+    cache_set = Mock()
+    monkeypatch.setattr("films.services.posters.cache.set", cache_set)
+
+    queue_poster("/abc.jpg")
+
+    flags.set.assert_called_once_with(ANY, 1, nx=True, ex=posters.QUEUED_TTL)
+    key = push.rpush.call_args.args[0]
+    push.rpush.assert_called_once_with(key, "/abc.jpg")
+    push.ltrim.assert_called_once_with(key, -posters.PENDING_LIMIT, -1)
+    cache_set.assert_not_called()
+
+
+def test_queue_posters_batches_redis_calls(monkeypatch):
+    """Пакет страницы: флаги всех постеров - один pipeline, в список попадают только еще не стоявшие в очереди"""
+    flags, push = _redis_pipelines(monkeypatch, [True, None, True])
+
+    queue_posters(["/a.jpg", "/b.jpg", "/a.jpg", "profile:/c.jpg", "/../bad.jpg"])
+
+    assert flags.set.call_count == 3
+    flags.execute.assert_called_once()
+    push.rpush.assert_called_once_with(ANY, "/a.jpg", "profile:/c.jpg")
+
+
+def test_page_queues_posters_once_after_render(media, monkeypatch):
+    """Внутри HTTP-запроса постеры карточек копятся и ставятся в очередь одним пакетом в конце"""
+    queue = Mock()
+    monkeypatch.setattr("films.services.posters.queue_posters", queue)
+
+    token = start_poster_batch()
+    for path in ("/a.jpg", "/b.jpg"):
+        posters.poster_url(path)
+        poster_srcset(path)
+    posters.profile_url("/c.jpg")
+    queue.assert_not_called()
+    end_poster_batch(token)
+
+    queue.assert_called_once_with(["/a.jpg", "/b.jpg", "profile:/c.jpg"])
+
+
+def test_poster_batch_failure_does_not_break_page(monkeypatch):
+    monkeypatch.setattr("films.services.posters.queue_posters", Mock(side_effect=ConnectionError("redis down")))
+
+    token = start_poster_batch()
+    posters._batch.get().append("/a.jpg")
+    end_poster_batch(token)
+
+    assert posters._batch.get() is None
+
+
+def test_pop_pending_from_redis_list(monkeypatch):
+    """Очередь забирается LRANGE + LTRIM одной транзакцией, дубликаты отбрасываются"""
+    pipeline = Mock()
+    pipeline.lrange.return_value = pipeline
+    pipeline.ltrim.return_value = pipeline
+    pipeline.execute.return_value = [[b"/a.jpg", b"/b.jpg", b"/a.jpg"], True]
+    client = Mock(pipeline=Mock(return_value=pipeline))
+    monkeypatch.setattr("films.services.posters._redis", Mock(return_value=client))
+
+    assert pop_pending(3) == ["/a.jpg", "/b.jpg"]
+    client.pipeline.assert_called_once_with(transaction=True)
+    pipeline.ltrim.assert_called_once_with(pipeline.lrange.call_args.args[0], 3, -1)
+
+
+def test_card_resolves_poster_once(media, monkeypatch):
+    """src и srcset одной карточки: одна проверка файла и одна постановка в очередь"""
+    is_cached = Mock(return_value=False)
+    queue = Mock()
+    monkeypatch.setattr("films.services.posters.is_cached", is_cached)
+    monkeypatch.setattr("films.services.posters.queue_poster", queue)
+
+    posters.poster_url("/abc.jpg")
+    poster_srcset("/abc.jpg")
+
+    is_cached.assert_called_once()
+    queue.assert_called_once()
+
+
+def test_cache_poster_writes_webp_variants(media, tmdb_image):
+    """Постер скачивается один раз и нарезается на WebP-варианты нужной ширины"""
+    assert cache_poster("/abc.jpg") is True
+    assert cache_poster("/abc.jpg") is True
+
+    tmdb_image.assert_called_once()
+    for variant, width in posters.POSTER_VARIANTS.items():
+        with Image.open(media / "posters" / variant / "abc.webp") as image:
+            assert image.format == "WEBP"
+            assert image.width == width
+    assert poster_urls("/abc.jpg")["card"] == "/media/posters/card/abc.webp"
+    assert "/media/posters/detail/abc.webp 500w" in poster_srcset("/abc.jpg")
+
+
+def test_template_filters_render_srcset(media, tmdb_image):
+    """Шаблонные фильтры отдают src и srcset локальных вариантов"""
+    cache_poster("/abc.jpg")
+    html = Template(
+        '{% load posters %}<img src="{{ p|poster_src:"thumbnail" }}" srcset="{{ p|poster_srcset }}">'
+    ).render(Context({"p": "/abc.jpg"}))
+
+    assert 'src="/media/posters/thumbnail/abc.webp"' in html
+    assert "/media/posters/card/abc.webp 342w" in html
+
+
+def test_actor_photos_use_profile_variant(media, tmdb_image):
+    """Фото актеров скачиваются из TMDB в размере профиля и отдаются из media фильтром profile_src"""
+    html = Template('{% load posters %}<img src="{{ p|profile_src }}">').render(Context({"p": "/face.jpg"}))
+    assert 'src="https://image.tmdb.org/t/p/w92/face.jpg"' in html
+
+    assert cache_posters(["profile:/face.jpg"]) == {"cached": 1, "failed": 0}
+    assert tmdb_image.call_args.args[0] == "https://image.tmdb.org/t/p/w185/face.jpg"
+    with Image.open(media / "posters" / "profile" / "face.webp") as image:
+        assert image.width == 92
+
+    posters._resolved.clear()
+    html = Template('{% load posters %}<img src="{{ p|profile_src }}">').render(Context({"p": "/face.jpg"}))
+    assert 'src="/media/posters/profile/face.webp"' in html
+
+
+def test_tmdb_get_poster_url_uses_poster_cache(media, tmdb_image):
+    """Tmdb.get_poster_url отдает локальный вариант для размеров кэша и TMDB для остальных"""
+    cache_poster("/abc.jpg")
+
+    assert Tmdb().get_poster_url("/abc.jpg") == "/media/posters/card/abc.webp"
+    assert Tmdb().get_poster_url("/abc.jpg", "w500") == "/media/posters/detail/abc.webp"
+    assert Tmdb().get_poster_url("/abc.jpg", "original") == "https://image.tmdb.org/t/p/original/abc.jpg"
+    assert Tmdb().get_poster_url(None) is None
@@ -2,8 +2,8 @@ from unittest.mock import Mock
 
 import pytest
 
-from films.models import Film, UserFilm
-from films.services.save_film import save_film_from_tmdb
+from films.models import Actor, Film, FilmActor, FilmCrew, UserFilm
+from films.services.save_film import ingest_film, save_film_from_tmdb
 
 
 def test_film_exists_returns_film(film, user):
@@ -16,10 +16,10 @@ def test_film_exists_returns_film(film, user):
 
 @pytest.mark.django_db
 def test_no_payload_returns_none(monkeypatch, user):
-    """Нет payload - возвращает (None, False)"""
+    """Нет payload - возвращает (None, False, None, False)"""
     monkeypatch.setattr("films.services.save_film.get_tmdb_movie_payload", lambda tid: None)
     result = save_film_from_tmdb(tmdb_id=999, user=user)
-    assert result == (None, False)
+    assert result == (None, False, None, False)
 
 
 @pytest.mark.django_db
@@ -84,7 +84,7 @@ def test_save_film_tmdb_fail_rollback(user, monkeypatch):
     user_films_amount = UserFilm.objects.count()
     result = save_film_from_tmdb(tmdb_id=123, user=user)
 
-    assert result == (None, False)
+    assert result == (None, False, None, False)
     assert Film.objects.count() == films_amount
     assert UserFilm.objects.count() == user_films_amount
 
@@ -98,3 +98,57 @@ def test_save_film_user_film_exists(user, film, monkeypatch):
     _, _, _, created_user_film = save_film_from_tmdb(tmdb_id=film.tmdb_id, user=user)
 
     assert created_user_film is False
+
+
+def _big_payload(actors=20):
+    return {
+        "details": {"title": "Big Film", "genres": [{"id": 1, "name": "Action"}, {"id": 2, "name": "Drama"}]},
+        "credits": {
+            "cast": [{"id": 1000 + i, "name": f"Actor {i}", "character": f"Role {i}"} for i in range(actors)],
+            "crew": [
+                {"id": 2000, "name": "Director", "job": "Director"},
+                {"id": 2000, "name": "Director", "job": "Writer"},
+                {"id": 2001, "name": "Composer", "job": "Composer"},
+                {"id": 2002, "name": "Grip", "job": "Grip"},
+            ],
+        },
+    }
+
+
+@pytest.mark.django_db
+def test_ingest_film_constant_queries(django_assert_max_num_queries):
+    """Число запросов не зависит от числа актеров и команды"""
+    payload = _big_payload()
+    Actor.objects.create(tmdb_id=1000, name="Уже есть")
+
+    with django_assert_max_num_queries(15):  # с учетом SAVEPOINT внутри тестовой транзакции
+        film, created = ingest_film(555, payload["details"], payload["credits"])
+
+    assert created is True
+    assert film.genres.count() == 2
+    assert FilmActor.objects.filter(film=film).count() == 20
+    assert Actor.objects.get(tmdb_id=1000).name == "Уже есть"
+    assert set(FilmCrew.objects.filter(film=film).values_list("job", flat=True)) == {"Director", "Writer", "Composer"}
+
+
+@pytest.mark.django_db
+def test_ingest_film_existing_film_is_not_duplicated(film):
+    """Фильм, который уже создал параллельный запрос, не дублируется и его связи не пишутся повторно"""
+    payload = _big_payload()
+
+    result, created = ingest_film(film.tmdb_id, payload["details"], payload["credits"])
+
+    assert result == film
+    assert created is False
+    assert Film.objects.filter(tmdb_id=film.tmdb_id).count() == 1
+    assert not FilmActor.objects.filter(film=film).exists()
+
+
+@pytest.mark.django_db
+def test_save_film_skips_partial_payload(user, monkeypatch):
+    """Неполные данные TMDB (без актеров из-за бюджета времени) не сохраняются"""
+    payload = {**_big_payload(), "partial": True}
+    monkeypatch.setattr("films.services.save_film.get_tmdb_movie_payload", Mock(return_value=payload))
+
+    assert save_film_from_tmdb(tmdb_id=777, user=user) == (None, False, None, False)
+    assert not Film.objects.filter(tmdb_id=777).exists()
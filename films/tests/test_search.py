@@ -2,10 +2,12 @@ from unittest.mock import Mock
 
 import pytest
 
-from films.models import UserFilm
+from films.models import Film, UserFilm
+from films.services.library_search import _like_pattern
 from films.services.search import (
     search_favorite_films,
     search_films,
+    search_films_page,
     search_tmdb_film,
     search_user_film,
 )
@@ -58,3 +60,57 @@ def test_search_films_tmdb_default(monkeypatch, user):
 
     result = search_films("test", user)
     assert result == ["tmdb result"]
+
+
+@pytest.mark.django_db
+def test_search_user_film_by_original_title(user, film):
+    """Поиск по библиотеке учитывает оригинальное название, а не только title"""
+    film.original_title = "Original Name"
+    film.save()
+    UserFilm.objects.create(user=user, film=film)
+
+    assert [item["film"] for item in search_user_film("original", user)] == [film]
+    assert search_user_film("missing", user) == []
+
+
+def test_like_pattern_escapes_wildcards():
+    assert _like_pattern("50%_off") == "%50\\%\\_off%"
+
+
+def _tmdb_page(page, total=45):
+    start = (page - 1) * 20
+    return {
+        "results": [{"id": i, "title": f"Film {i}"} for i in range(start + 1, min(start + 20, total) + 1)],
+        "total_results": total,
+    }
+
+
+@pytest.mark.django_db
+def test_search_films_page_maps_to_tmdb_pages(user, monkeypatch):
+    """Наша 2-я страница (фильмы 13-24) собирается из 1-й и 2-й страниц TMDB, 1-я - только из 1-й"""
+    search = Mock(side_effect=lambda query, page: _tmdb_page(page))
+    monkeypatch.setattr("films.services.search.tmdb.search_movie", search)
+
+    page = search_films_page("q", user, page_number=2)
+
+    assert [item["film"]["tmdb_id"] for item in page.object_list] == list(range(13, 25))
+    assert page.paginator.count == 45
+    assert [c.kwargs["page"] for c in search.call_args_list] == [1, 2]
+
+    search.reset_mock()
+    search_films_page("q", user, page_number=1)
+    assert [c.kwargs["page"] for c in search.call_args_list] == [1]
+
+
+@pytest.mark.django_db
+def test_search_films_page_library_limits_queries(user, django_assert_num_queries):
+    """Библиотека режется в БД, статусы считаются только для видимой страницы"""
+    films = [Film.objects.create(tmdb_id=500 + i, title=f"Film {i}", overview="") for i in range(15)]
+    UserFilm.objects.bulk_create([UserFilm(user=user, film=film) for film in films])
+
+    # COUNT, страница UserFilm + фильм, жанры, отзывы, план
+    with django_assert_num_queries(5):
+        page = search_films_page("", user, page_number=2, source="user_films")
+
+    assert len(page.object_list) == 3
+    assert page.paginator.num_pages == 2
@@ -0,0 +1,75 @@
+"""
+Поиск по библиотеке на PostgreSQL: колонка search_vector, GIN- и pg_trgm-индексы миграции 0011_film_search
+и сырой SQL films.services.library_search. Выполняется в джобе test-postgres (TEST_DB_ENGINE=postgresql,
+pytest --migrations); на SQLite поиск идет через icontains, и эти тесты пропускаются
+"""
+
+from django.db import connection
+from django.urls import reverse
+
+import pytest
+
+from films.models import Film, UserFilm
+from films.services.search import search_user_film
+
+pytestmark = [
+    pytest.mark.skipif(connection.vendor != "postgresql", reason="поиск pg_trgm / tsvector есть только на PostgreSQL"),
+    pytest.mark.django_db,
+]
+
+
+@pytest.fixture
+def library(user):
+    films = [
+        Film.objects.create(tmdb_id=157336, title="Интерстеллар", original_title="Interstellar", overview=""),
+        Film.objects.create(
+            tmdb_id=27205,
+            title="Начало",
+            original_title="Inception",
+            overview="Кобб проникает в сны людей и похищает их секреты",
+        ),
+        Film.objects.create(tmdb_id=603, title="Матрица", original_title="The Matrix", overview=""),
+    ]
+    UserFilm.objects.bulk_create(UserFilm(user=user, film=film) for film in films)
+    return {film.original_title: film for film in films}
+
+
+def _found(query, user):
+    return {item["film"].original_title for item in search_user_film(query, user)}
+
+
+def test_migration_creates_search_column_and_indexes():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'films_film' AND column_name = 'search_vector'"
+        )
+        assert cursor.fetchone() == ("tsvector",)
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'films_film'")
+        indexes = {row[0] for row in cursor.fetchall()}
+
+    assert {"films_film_search_vector_gin", "films_film_title_trgm", "films_film_original_title_trgm"} <= indexes
+
+
+def test_trigram_finds_misspelled_title(user, library):
+    """Опечатка не совпадает ни по tsquery, ни по ILIKE - фильм находит только триграммное сравнение"""
+    assert _found("Interstelar", user) == {"Interstellar"}
+
+
+def test_full_text_uses_russian_morphology(user, library):
+    """'секретов' - другая словоформа слова 'секреты' из описания"""
+    assert _found("секретов", user) == {"Inception"}
+
+
+def test_substring_and_wildcards(user, library):
+    assert _found("atri", user) == {"The Matrix"}
+    assert _found("%", user) == set()
+
+
+def test_library_view_search(client, user, library):
+    """Сырой SQL поиска внутри film_id__in в запросе представления с курсорной пагинацией"""
+    client.force_login(user)
+    response = client.get(reverse("films:my_films"), {"q": "Interstelar"})
+
+    assert response.status_code == 200
+    assert [user_film.film.original_title for user_film in response.context["page_obj"]] == ["Interstellar"]
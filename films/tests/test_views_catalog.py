@@ -1,8 +1,12 @@
+from datetime import date, timedelta
+from unittest.mock import Mock
+
 from django.urls import reverse
 
 import pytest
 
-from films.models import UserFilm
+from calendar_events.models import CalendarEvent
+from films.models import Actor, FilmActor, FilmCrew, Person, UserFilm
 from reviews.models import Review
 
 
@@ -56,6 +60,39 @@ class TestFilmViewsCatalog:
         assert film_ctx["has_review"] is True
         assert film_ctx["user_rating"] == 8.0
 
+    def test_film_detail_fixed_query_count(self, client, user, film, django_assert_num_queries):
+        """Число запросов страницы фильма из БД не зависит от размера каста и команды"""
+        for i in range(12):
+            actor = Actor.objects.create(tmdb_id=1000 + i, name=f"Actor {i}")
+            FilmActor.objects.create(film=film, actor=actor, character=f"Role {i}", order=i)
+        for i, job in enumerate(["Director", "Writer", "Composer", "Producer", "Editor"]):
+            FilmCrew.objects.create(film=film, person=Person.objects.create(tmdb_id=2000 + i, name=job), job=job)
+        UserFilm.objects.create(user=user, film=film, is_favorite=True)
+        Review.objects.create(
+            user=user,
+            film=film,
+            plot_rating=6,
+            acting_rating=6,
+            directing_rating=6,
+            visuals_rating=6,
+            soundtrack_rating=6,
+            watched_at="2026-01-11",
+        )
+        CalendarEvent.objects.create(user=user, film=film, planned_date=date.today() + timedelta(days=1))
+        client.force_login(user)
+
+        # сессия, пользователь, фильм (с Exists по календарю), жанры, актеры, команда, UserFilm, отзыв
+        # и проверка группы Manager в меню base.html
+        with django_assert_num_queries(9):
+            response = client.get(reverse("films:film_detail", kwargs={"tmdb_id": film.tmdb_id}))
+
+        film_ctx = response.context["film"]
+        assert len(film_ctx["actors"]) == 12
+        assert film_ctx["director"] == ["Director"]
+        assert film_ctx["is_favorite"] is True
+        assert film_ctx["is_planned"] is True
+        assert film_ctx["user_rating"] == 6
+
     def test_film_search_view(self, client, user):
         """GET /search/ - поисковый запрос фильма"""
         client.force_login(user)
@@ -67,8 +104,88 @@ class TestFilmViewsCatalog:
     def test_film_search_tmdb(self, client, user, monkeypatch):
         """GET /search/ - поисковый запрос фильма из TMDB"""
         client.force_login(user)
-        monkeypatch.setattr("films.views.catalog.search_films", lambda **kwargs: ["film1", "film2"])
-        response = client.get(reverse("films:film_search"), {"q": "test"})
+        search = Mock(
+            return_value={"results": [{"id": i, "title": f"Film {i}"} for i in range(1, 21)], "total_results": 45}
+        )
+        monkeypatch.setattr("films.services.search.tmdb.search_movie", search)
+        response = client.get(reverse("films:film_search"), {"q": "test", "page": 4})
 
         assert response.status_code == 200
         assert response.context["is_user_films"] is False
+        assert response.context["page_obj"].paginator.num_pages == 4
+        assert len(response.context["items"]) == 9  # 45 - 3 * 12
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    yield
+    from django.core.cache import cache
+
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestFilmDetailCache:
+    def test_shared_context_cached_with_user_overlay(self, client, user, film, locmem_cache, monkeypatch):
+        """Повторный показ берет общую часть из кэша, пользовательская считается заново"""
+        client.force_login(user)
+        url = reverse("films:film_detail", kwargs={"tmdb_id": film.tmdb_id})
+        client.get(url)
+
+        build = Mock(side_effect=AssertionError("контекст должен браться из кэша"))
+        monkeypatch.setattr("films.views.catalog.build_film_context", build)
+        UserFilm.objects.create(user=user, film=film, is_favorite=True)
+        response = client.get(url)
+
+        assert response.context["film"]["title"] == film.title
+        assert response.context["film"]["in_library"] is True
+        assert response.context["film"]["is_favorite"] is True
+
+    def test_film_save_invalidates_context(self, client, user, film, locmem_cache, django_capture_on_commit_callbacks):
+        client.force_login(user)
+        url = reverse("films:film_detail", kwargs={"tmdb_id": film.tmdb_id})
+        client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            film.title = "Renamed film"
+            film.save()
+
+        assert client.get(url).context["film"]["title"] == "Renamed film"
+
+    def test_partial_tmdb_context_not_cached(self, client, user, locmem_cache, monkeypatch):
+        payload = {
+            "details": {"id": 555, "title": "TMDB film", "vote_average": 7.0, "vote_count": 10},
+            "credits": {"cast": [], "crew": []},
+            "partial": True,
+        }
+        monkeypatch.setattr("films.views.catalog.get_tmdb_movie_payload", Mock(return_value=payload))
+        client.force_login(user)
+
+        client.get(reverse("films:film_detail", kwargs={"tmdb_id": 555}))
+
+        from films.services.film_context_cache import get_shared_context
+
+        assert get_shared_context(555)[0] is None
+
+    def test_context_built_before_film_save_is_not_served(self, client, user, locmem_cache, monkeypatch):
+        """Фильм сохранен в БД, пока страница ждала TMDB: контекст из TMDB не попадает под новую версию"""
+        from films.services.film_context_cache import get_shared_context, invalidate_film_context
+
+        payload = {
+            "details": {"id": 555, "title": "TMDB film", "vote_average": 7.0, "vote_count": 10},
+            "credits": {"cast": [], "crew": []},
+        }
+
+        def slow_payload(tmdb_id):
+            invalidate_film_context(tmdb_id)  # on_commit сохранения Film во время запроса к TMDB
+            return payload
+
+        monkeypatch.setattr("films.views.catalog.get_tmdb_movie_payload", slow_payload)
+        client.force_login(user)
+
+        client.get(reverse("films:film_detail", kwargs={"tmdb_id": 555}))
+
+        film_data, version = get_shared_context(555)
+        assert version == 1
+        assert film_data is None
@@ -2,7 +2,7 @@ from django.urls import reverse
 
 import pytest
 
-from films.models import UserFilm
+from films.models import Film, UserFilm
 
 
 @pytest.mark.django_db
@@ -26,7 +26,8 @@ class TestFilmViewsCatalog:
     def test_recommends_personal(self, client, user, monkeypatch):
         """Вывод на главной странице ежедневных рекомендаций для авторизованного пользователя: успешно"""
         client.force_login(user)
-        monkeypatch.setattr("films.views.library.build_recommendation_cards", lambda u, limit: ["film"])
+        monkeypatch.setattr("films.services.builders.get_user_recommendations", lambda u, limit: [{"tmdb_id": 1}])
+        monkeypatch.setattr("films.services.builders.build_recommendation_cards", lambda u, recs: ["film"])
         response = client.get(reverse("films:recommends"), {"type": "recommended"})
 
         assert response.context["recommend_type"] == "recommended"
@@ -40,11 +41,15 @@ class TestFilmViewsCatalog:
             def get_popular(self, pages):
                 return [{"id": 1}]
 
-        monkeypatch.setattr("films.views.library.Tmdb", lambda: FakeTmdb())
-        monkeypatch.setattr("films.views.library.build_tmdb_collection_cards", lambda films, user=None: films)
+        monkeypatch.setattr("films.services.collections.Tmdb", lambda: FakeTmdb())
+        monkeypatch.setattr(
+            "films.services.collections.build_tmdb_collection_cards",
+            lambda films, user=None: [{"tmdb_id": f["id"]} for f in films],
+        )
         response = client.get(reverse("films:recommends"), {"type": "popular"})
 
         assert response.context["recommend_title"] == "Популярные фильмы"
+        assert response.context["films"] == [{"tmdb_id": 1}]
 
     def test_my_films_view(self, client, user, film):
         """Вывод фильмов авторизованного пользователя"""
@@ -55,6 +60,21 @@ class TestFilmViewsCatalog:
         assert response.status_code == 200
         assert len(response.context["items"]) == 1
 
+    def test_my_films_keyset_pages(self, client, user):
+        """Курсорная пагинация 'Мои фильмы': вторая страница по next_cursor и JSON для бесконечной прокрутки"""
+        client.force_login(user)
+        for i in range(15):
+            UserFilm.objects.create(user=user, film=Film.objects.create(tmdb_id=500 + i, title=f"Film {i}"))
+
+        first = client.get(reverse("films:my_films"))
+        page = first.context["page_obj"]
+        assert len(first.context["items"]) == 12
+        assert page.has_next() and page.count == 15
+
+        second = client.get(reverse("films:my_films"), {"after": page.next_cursor, "format": "json"}).json()
+        assert second["has_next"] is False
+        assert second["html"].count('<div class="movie-card glass-card">') == 3
+
     def test_favorite_films_view(self, client, user, film):
         """Вывод любимых фильмов авторизованного пользователя"""
         client.force_login(user)
@@ -1,14 +1,20 @@
 from django.urls import path
 
 from films.views import (
+    AddFilmStatusView,
     AddFilmView,
+    BulkAddFilmView,
+    BulkUpdateFilmStatusView,
     DeleteFilmView,
+    DiaryImportStatusView,
+    DiaryImportView,
     FavoriteFilmsView,
     FilmDetailView,
     FilmRecommendsView,
     HomeView,
     UpdateFilmStatusView,
     UserListFilmView,
+    diary_export_view,
     film_search_view,
 )
 
@@ -22,6 +28,12 @@ urlpatterns = [
     path("favorite/", FavoriteFilmsView.as_view(), name="favorite_films"),
     path("film/<int:tmdb_id>/", FilmDetailView.as_view(), name="film_detail"),
     path("add_film/", AddFilmView.as_view(), name="add_film"),
+    path("add_film/<int:tmdb_id>/status/", AddFilmStatusView.as_view(), name="add_film_status"),
+    path("add_film/bulk/", BulkAddFilmView.as_view(), name="bulk_add_films"),
     path("update-status/", UpdateFilmStatusView.as_view(), name="update_status"),
+    path("update-status/bulk/", BulkUpdateFilmStatusView.as_view(), name="bulk_update_status"),
     path("<int:tmdb_id>/delete/", DeleteFilmView.as_view(), name="delete_film"),
+    path("export/", diary_export_view, name="export_diary"),
+    path("import/", DiaryImportView.as_view(), name="diary_import"),
+    path("import/<int:pk>/status/", DiaryImportStatusView.as_view(), name="diary_import_status"),
 ]
@@ -1,2 +1,5 @@
 from .catalog import *  # noqa F403 F401
+from .diary_import import *  # noqa F403 F401
+from .export import *  # noqa F403 F401
 from .library import *  # noqa F403 F401
+from .metrics import *  # noqa F403 F401
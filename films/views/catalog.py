@@ -1,15 +1,13 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator
 from django.http import Http404
 from django.shortcuts import render
 from django.views.generic import TemplateView
 
-from films.models import Film
-from films.services.context import build_film_context
-from films.services.search import search_films
+from films.services.context import build_film_context, film_detail_queryset
+from films.services.film_context_cache import get_shared_context, get_user_overlay, set_shared_context
+from films.services.search import search_films_page
 from films.services.tmdb_movie_payload import get_tmdb_movie_payload
-from films.services.user_film_services import get_user_film
-from reviews.models import Review
+from services.tmdb_deadline import is_exhausted
 
 
 class FilmDetailView(LoginRequiredMixin, TemplateView):
@@ -26,36 +24,39 @@ class FilmDetailView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         tmdb_id = self.kwargs["tmdb_id"]
 
-        film_obj = (
-            Film.objects.filter(tmdb_id=tmdb_id)
-            .prefetch_related(
-                "genres",
-                "actors",
-                "crew",
-            )
-            .first()
-        )
-
         user_film = None
         review = None
+        is_planned = False
 
-        if film_obj:
-            user_film = get_user_film(self.request.user, film_obj)  # model
+        film_data, context_version = get_shared_context(tmdb_id)
+        if film_data is not None:
+            # общая часть из кэша, считаем только пользовательскую; фильма не из БД у пользователя быть не может
+            if film_data["source"] == "db":
+                user_film, review, is_planned = get_user_overlay(self.request.user, tmdb_id)
+        else:
+            cacheable = True
+            film_obj = film_detail_queryset(self.request.user).filter(tmdb_id=tmdb_id).first()
 
-            if user_film:
-                review = Review.objects.filter(user=self.request.user, film=film_obj).first()
+            if film_obj:
+                user_film = film_obj.user_films[0] if film_obj.user_films else None
+                if user_film:
+                    review = film_obj.user_reviews[0] if film_obj.user_reviews else None
+                is_planned = film_obj.is_planned
 
-            film_data = build_film_context(film=film_obj)  # dict для шаблона
+                film_data = build_film_context(film=film_obj)  # dict для шаблона
 
-        else:
-            payload = get_tmdb_movie_payload(tmdb_id)
-            if not payload:
-                raise Http404("Фильм не найден")
+            else:
+                payload = get_tmdb_movie_payload(tmdb_id)
+                if not payload:
+                    raise Http404("Фильм не найден")
 
-            film_data = build_film_context(tmdb_data=payload["details"], credits=payload["credits"])
+                film_data = build_film_context(tmdb_data=payload["details"], credits=payload["credits"])
+                cacheable = not payload.get("partial")  # неполный ответ TMDB (исчерпан бюджет) не кэшируем
 
-        if not film_data:
-            raise Http404("Фильм не найден")
+            if not film_data:
+                raise Http404("Фильм не найден")
+            if cacheable:
+                set_shared_context(tmdb_id, film_data, context_version)
 
         film_data.update(
             {
@@ -63,12 +64,14 @@ class FilmDetailView(LoginRequiredMixin, TemplateView):
                 "has_review": bool(review),
                 "user_rating": review.user_rating if review else None,
                 "is_favorite": user_film.is_favorite if user_film else False,
+                "is_planned": is_planned,
             }
         )
 
         context["film"] = film_data
         context["user_film"] = user_film
         context["review"] = review
+        context["tmdb_partial"] = is_exhausted()
         return context
 
 
@@ -78,14 +81,11 @@ def film_search_view(request):
     query = request.GET.get("q", "").strip()
     source = request.GET.get("source", "tmdb")  # 'tmdb' или 'user_films' или 'favorites'
     params = f"&q={query}&source={source}" if query else ""
-    page_number = int(request.GET.get("page", 1))
     user = request.user if request.user.is_authenticated else None
-    results = search_films(query=query, user=user, page_num=1, source=source)
+    page_obj = search_films_page(query=query, user=user, page_number=request.GET.get("page", 1), source=source)
 
     is_user_films = source in ["user_films", "favorites", "watched", "reviewed"]
     is_tmdb = source == "tmdb"
-    paginator = Paginator(results, 12)
-    page_obj = paginator.get_page(page_number)
 
     context = {
         "search_type": source,
@@ -93,6 +93,7 @@ def film_search_view(request):
         "is_tmdb": is_tmdb,
         "query": query,
         "page_obj": page_obj,
+        "page_range": page_obj.paginator.get_elided_page_range(page_obj.number),
         "items": page_obj.object_list,
         "params": params,
         "view_url": "films:film_search",
@@ -0,0 +1,40 @@
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views import View
+
+from films.forms import DiaryImportForm
+from films.models import DiaryImport
+from films.services.diary_import import import_status, start_import
+
+RECENT_IMPORTS = 5
+
+
+class DiaryImportView(LoginRequiredMixin, View):
+    """Загрузка CSV Letterboxd / IMDb: файл сохраняется, импорт выполняет Celery-задача"""
+
+    template_name = "films/diary_import.html"
+
+    def get(self, request, *args, **kwargs):
+        return self._render(request, DiaryImportForm())
+
+    def post(self, request, *args, **kwargs):
+        form = DiaryImportForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return self._render(request, form)
+        start_import(request.user, form.cleaned_data["file"])
+        messages.success(request, "Файл загружен, импорт выполняется в фоне")
+        return redirect("films:diary_import")
+
+    def _render(self, request, form):
+        imports = DiaryImport.objects.filter(user=request.user)[:RECENT_IMPORTS]
+        return render(request, self.template_name, {"form": form, "imports": imports})
+
+
+class DiaryImportStatusView(LoginRequiredMixin, View):
+    """Прогресс импорта дневника для опроса со страницы импорта"""
+
+    def get(self, request, *args, **kwargs):
+        diary_import = get_object_or_404(DiaryImport, id=self.kwargs["pk"], user=request.user)
+        return JsonResponse(import_status(diary_import))
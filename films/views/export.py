@@ -0,0 +1,31 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from films.services.export import FORMATS, export_diary, export_filename
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
+
+
+@login_required
+def diary_export_view(request):
+    """
+    Потоковая выгрузка дневника пользователя (библиотека, отзывы, календарь).
+    Параметры: format=csv|json, gzip=1 - сжатый файл
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest("Формат должен быть csv или json")
+    gzip = request.GET.get("gzip") == "1"
+
+    response = StreamingHttpResponse(
+        export_diary(request.user, fmt, gzip),
+        content_type="application/gzip" if gzip else CONTENT_TYPES[fmt],
+    )
+    # filename*= (RFC 5987): имя пользователя может быть кириллическим
+    response["Content-Disposition"] = content_disposition_header(True, export_filename(request.user, fmt, gzip))
+    response["X-Accel-Buffering"] = "no"  # nginx отдает куски сразу, не буферизуя весь ответ
+    return response
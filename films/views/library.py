@@ -1,3 +1,4 @@
+import json
 import logging
 
 from django.contrib import messages
@@ -6,17 +7,21 @@ from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
-from django.utils import timezone
 from django.views import View
 from django.views.generic import ListView, TemplateView
 
-from calendar_events.models import CalendarEvent
 from films.models import UserFilm
-from films.services.builders import build_recommendation_cards, build_tmdb_collection_cards
+from films.services.add_film import get_add_status, request_add_film
+from films.services.builders import build_recommendation_cards, build_recommendation_page
+from films.services.bulk_library import BULK_LIMIT, STATUS_ACTIONS, bulk_add_films, bulk_update_status
+from films.services.collections import COLLECTIONS, get_collection_page
+from films.services.film_statuses import get_status_resolver
+from films.services.library_search import film_search_q
 from films.services.save_film import save_film_from_tmdb
 from reviews.models import Review
+from services.keyset import KeysetPaginationMixin
 from services.permissions import is_manager
-from services.tmdb import Tmdb
+from services.tmdb_deadline import is_exhausted
 
 logger = logging.getLogger("filmdiary.films")
 
@@ -28,24 +33,26 @@ class HomeView(TemplateView):
         context = super().get_context_data(**kwargs)
 
         if self.request.user.is_authenticated:
-            recent_watched = (
-                Review.objects.filter(user=self.request.user).select_related("film").order_by("-watched_at")[:5]
+            recent_watched = list(
+                Review.objects.filter(user=self.request.user)
+                .select_related("film")
+                .prefetch_related("film__genres")
+                .order_by("-watched_at")[:5]
             )
 
-            film_ids = [r.film_id for r in recent_watched]
-            user_films = UserFilm.objects.filter(user=self.request.user, film_id__in=film_ids)
-            user_films_map = {uf.film_id: uf for uf in user_films}
+            statuses = get_status_resolver(self.request.user)
+            statuses.prime(reviews=recent_watched)
+            statuses.load(r.film_id for r in recent_watched)
 
             recent_watched_with_status = []
             for review in recent_watched:
+                user_film = statuses.user_film(review.film_id)
                 recent_watched_with_status.append(
                     {
                         "film": review.film,
-                        "user_film": user_films_map.get(review.film_id),
+                        "user_film": user_film,
                         "review": review,
-                        "is_favorite": bool(
-                            user_films_map.get(review.film_id) and user_films_map[review.film_id].is_favorite
-                        ),
+                        "is_favorite": bool(user_film and user_film.is_favorite),
                     }
                 )
 
@@ -68,43 +75,22 @@ class FilmRecommendsView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
 
         recommend_type = self.request.GET.get("type", "recommended")
-        tmdb = Tmdb()
+        page_number = self.request.GET.get("page")
 
         title = ""
-        cards = []
+        page_obj = None
 
         if recommend_type == "recommended":
             title = "Персональные рекомендации"
-            cards = build_recommendation_cards(self.request.user, limit=50)
-
-        elif recommend_type == "popular":
-            title = "Популярные фильмы"
-            films = tmdb.get_popular(pages=3)
-            cards = build_tmdb_collection_cards(films, user=self.request.user)
-
-        elif recommend_type == "now_playing":
-            title = "Сейчас в кино"
-            films = tmdb.get_now_playing(pages=2)
-            cards = build_tmdb_collection_cards(films, user=self.request.user)
-
-        elif recommend_type == "upcoming":
-            title = "Скоро в кино"
-            films = tmdb.get_upcoming(pages=2)
-            cards = build_tmdb_collection_cards(films, user=self.request.user)
-
-        elif recommend_type == "trending":
-            title = "Тренды недели"
-            films = tmdb.get_trending().get("results", [])
-            cards = build_tmdb_collection_cards(films, user=self.request.user)
-
-        elif recommend_type == "top_rated":
-            title = "Топ-рейтинговые фильмы"
-            films = tmdb.get_top_rated(pages=2)
-            cards = build_tmdb_collection_cards(films, user=self.request.user)
-
-        paginator = Paginator(cards, self.paginate_by)
-        page_number = self.request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
+            page_obj = build_recommendation_page(self.request.user, page_number, self.paginate_by, limit=50)
+
+        elif recommend_type in COLLECTIONS:
+            title = COLLECTIONS[recommend_type][0]
+            page_obj = get_collection_page(recommend_type, self.request.user, page_number, self.paginate_by)
+
+        if page_obj is None:
+            page_obj = Paginator([], self.paginate_by).get_page(page_number)
+
         params = self.request.GET.copy()
         params.pop("page", None)
 
@@ -116,54 +102,48 @@ class FilmRecommendsView(LoginRequiredMixin, TemplateView):
                 "params": f"&{params.urlencode()}" if params else "",
                 "recommend_type": recommend_type,
                 "recommend_title": title,
+                "tmdb_partial": is_exhausted(),
             }
         )
         return context
 
 
-class UserListFilmView(LoginRequiredMixin, ListView):
-    """Представление для отображения списка 'Мои фильмы'"""
+class UserListFilmView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    """Представление для отображения списка 'Мои фильмы'. Курсорная пагинация по (created_at, id)"""
 
     model = UserFilm
     context_object_name = "items"
     paginate_by = 12
     template_name = "films/my_films.html"
+    items_template = "films/includes/my_film_items.html"
 
     def get_queryset(self):
         """Возвращает список пользователя 'Мои фильмы', осуществляет поиск по q"""
         if self.request.user.is_superuser or is_manager(self.request.user):
-            queryset = UserFilm.objects.filter(film__tmdb_id__isnull=False).select_related("film")
+            queryset = UserFilm.objects.filter(film__tmdb_id__isnull=False)
         else:
-            queryset = UserFilm.objects.filter(user=self.request.user, film__tmdb_id__isnull=False).select_related(
-                "film"
-            )
+            queryset = UserFilm.objects.filter(user=self.request.user, film__tmdb_id__isnull=False)
+        queryset = queryset.select_related("film").prefetch_related("film__genres")
 
         query = self.request.GET.get("q", "").strip()
         if query:
-            queryset = queryset.filter(film__title__icontains=query)
-        return queryset.order_by("-created_at")
+            queryset = queryset.filter(film_search_q(query))
+        return queryset
 
     def get_context_data(self, **kwargs):
         """Добавляет данные в контекст для поиска"""
         context = super().get_context_data(**kwargs)
         items = context[self.context_object_name]  # список user_films на странице
 
-        film_ids = [uf.film_id for uf in items]
-        reviews_map = {
-            r.film_id: r for r in Review.objects.filter(user=self.request.user, film_id__in=film_ids)
-        }  # Получаем все отзывы пользователя на фильмы из текущего queryset
-
-        planned_film_ids = set(
-            CalendarEvent.objects.filter(
-                user=self.request.user, film_id__in=film_ids, planned_date__gte=timezone.now().date()
-            ).values_list("film_id", flat=True)
-        )
+        statuses = get_status_resolver(self.request.user)
+        statuses.prime(user_films=[uf for uf in items if uf.user_id == self.request.user.id])
+        statuses.load(uf.film_id for uf in items)
 
         context[self.context_object_name] = [
             {
                 "user_film": uf,
-                "review": reviews_map.get(uf.film_id),
-                "is_planned": uf.film_id in planned_film_ids,
+                "review": statuses.review(uf.film_id),
+                "is_planned": statuses.is_planned(uf.film_id),
             }
             for uf in items
         ]
@@ -191,12 +171,12 @@ class FavoriteFilmsView(UserListFilmView):
         queryset = (
             UserFilm.objects.filter(user=self.request.user, is_favorite=True)
             .select_related("film")
-            .order_by("-created_at")
+            .prefetch_related("film__genres")
         )
 
         query = self.request.GET.get("q", "").strip()
         if query:
-            queryset = queryset.filter(film__title__icontains=query)
+            queryset = queryset.filter(film_search_q(query))
 
         return queryset
 
@@ -218,13 +198,20 @@ class AddFilmView(LoginRequiredMixin, View):
     """Представление для добавления фильма в список 'Мои фильмы'"""
 
     def post(self, request, *args, **kwargs):
-        """Добавляет фильм в список пользователя 'Мои фильмы'"""
+        """
+        Добавляет фильм в список пользователя 'Мои фильмы'.
+        async=1: фильм, которого нет в БД, загружается фоновой задачей, ответ 202 со ссылкой на статус;
+        так же отвечает и синхронное добавление, если данные TMDB не успели загрузиться за бюджет времени
+        """
         tmdb_id = request.POST.get("tmdb_id")
 
-        if not tmdb_id:
+        if not tmdb_id or not tmdb_id.isdigit():
             logger.warning("AddFilm: missing tmdb_id=%s", tmdb_id)
             return JsonResponse({"status": "error", "message": "Нет ID фильма"}, status=400)
 
+        if request.POST.get("async") == "1":
+            return self.add_async(request, int(tmdb_id))
+
         try:
             logger.debug("AddFilm: tmdb_id=%s user=%s", tmdb_id, request.user.id)
             film, created_film, user_film, created_user_film = save_film_from_tmdb(
@@ -234,6 +221,11 @@ class AddFilmView(LoginRequiredMixin, View):
             logger.exception("AddFilm FAIL tmdb_id=%s: %s", tmdb_id, e)
             return JsonResponse({"status": "error", "message": "Ошибка при сохранении фильма"}, status=500)
 
+        if not film and is_exhausted():
+            # бюджет времени TMDB исчерпан (например, актеры не загрузились): дозагрузит фоновая задача
+            logger.info("AddFilm: TMDB deadline exhausted, falling back to async tmdb_id=%s", tmdb_id)
+            return self.add_async(request, int(tmdb_id))
+
         if not film or not user_film:
             logger.warning("AddFilm: no film/user_film tmdb_id=%s", tmdb_id)
             return JsonResponse({"status": "error", "message": "Фильм не найден или не удалось сохранить"}, status=500)
@@ -245,6 +237,33 @@ class AddFilmView(LoginRequiredMixin, View):
             logger.debug("AddFilm OK: exists tmdb_id=%s", tmdb_id)
             return JsonResponse({"status": "exists"})
 
+    @staticmethod
+    def add_async(request, tmdb_id: int):
+        """Записывает намерение добавить фильм и сразу отвечает, не дожидаясь TMDB"""
+        try:
+            status, intent = request_add_film(request.user, tmdb_id)
+        except Exception as e:
+            logger.exception("AddFilm async FAIL tmdb_id=%s: %s", tmdb_id, e)
+            return JsonResponse({"status": "error", "message": "Ошибка при сохранении фильма"}, status=500)
+
+        if status != "pending":
+            return JsonResponse({"status": status})
+        logger.info("AddFilm PENDING: intent=%s tmdb_id=%s", intent.id, tmdb_id)
+        return JsonResponse(
+            {"status": "pending", "status_url": reverse("films:add_film_status", kwargs={"tmdb_id": tmdb_id})},
+            status=202,
+        )
+
+
+class AddFilmStatusView(LoginRequiredMixin, View):
+    """Статус отложенного добавления фильма: pending / added / failed"""
+
+    def get(self, request, *args, **kwargs):
+        status = get_add_status(request.user, self.kwargs["tmdb_id"])
+        if status is None:
+            return JsonResponse({"status": "error", "message": "Фильм не добавлялся"}, status=404)
+        return JsonResponse(status)
+
 
 class UpdateFilmStatusView(LoginRequiredMixin, View):
     """Обновляет статус фильма"""
@@ -306,6 +325,84 @@ class UpdateFilmStatusView(LoginRequiredMixin, View):
             return JsonResponse({"status": "error", "message": str(e)}, status=500)
 
 
+def _parse_bulk_request(request) -> tuple[list[int], str | None]:
+    """
+    Разбирает пакетный запрос: JSON {"tmdb_ids": [...], "action": "..."} или форма с повторяющимся tmdb_ids.
+    Возвращает (tmdb_ids, action); ValueError - некорректный запрос
+    """
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except json.JSONDecodeError:
+            raise ValueError("Некорректный JSON")
+        if not isinstance(data, dict):
+            raise ValueError("Ожидается JSON-объект")
+        raw_ids, action = data.get("tmdb_ids") or [], data.get("action")
+    else:
+        raw_ids, action = request.POST.getlist("tmdb_ids"), request.POST.get("action")
+
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise ValueError("Нет ID фильмов")
+    if len(raw_ids) > BULK_LIMIT:
+        raise ValueError(f"Не больше {BULK_LIMIT} фильмов за запрос")
+    try:
+        tmdb_ids = [int(tmdb_id) for tmdb_id in raw_ids]
+    except (TypeError, ValueError):
+        raise ValueError("Некорректный ID фильма")
+    return tmdb_ids, action
+
+
+class BulkAddFilmView(LoginRequiredMixin, View):
+    """Пакетное добавление фильмов в 'Мои фильмы': один запрос на ряд рекомендаций"""
+
+    def post(self, request, *args, **kwargs):
+        try:
+            tmdb_ids, _ = _parse_bulk_request(request)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+        try:
+            statuses = bulk_add_films(request.user, tmdb_ids)
+        except Exception as e:
+            logger.exception("BulkAddFilm FAIL user=%s: %s", request.user.id, e)
+            return JsonResponse({"status": "error", "message": "Ошибка при сохранении фильмов"}, status=500)
+
+        logger.info("BulkAddFilm OK: user=%s films=%s", request.user.id, len(statuses))
+        return JsonResponse(
+            {
+                "status": "success",
+                "results": [{"tmdb_id": tmdb_id, "status": status} for tmdb_id, status in statuses.items()],
+            }
+        )
+
+
+class BulkUpdateFilmStatusView(LoginRequiredMixin, View):
+    """Пакетное изменение статуса фильмов: favorite, unfavorite, delete, delete-watched"""
+
+    def post(self, request, *args, **kwargs):
+        try:
+            tmdb_ids, action = _parse_bulk_request(request)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        if action not in STATUS_ACTIONS:
+            return JsonResponse({"status": "error", "message": "Неизвестное действие"}, status=400)
+
+        try:
+            statuses = bulk_update_status(request.user, tmdb_ids, action)
+        except Exception as e:
+            logger.exception("BulkUpdateFilm FAIL user=%s action=%s: %s", request.user.id, action, e)
+            return JsonResponse({"status": "error", "message": str(e)}, status=500)
+
+        logger.info("BulkUpdateFilm OK: user=%s action=%s films=%s", request.user.id, action, len(statuses))
+        return JsonResponse(
+            {
+                "status": "success",
+                "action": action,
+                "results": [{"tmdb_id": tmdb_id, "status": status} for tmdb_id, status in statuses.items()],
+            }
+        )
+
+
 class DeleteFilmView(LoginRequiredMixin, View):
     """Представление для удаления фильма из коллекции пользователя"""
 
@@ -0,0 +1,22 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from services.tmdb_metrics import collect_snapshots, merge_snapshots, render_prometheus
+
+
+def tmdb_metrics_view(request):
+    """
+    Отдает метрики клиента TMDB в текстовом формате Prometheus (все процессы).
+    Доступ: администратор или сборщик с заголовком Authorization: Bearer <METRICS_TOKEN>
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    header = request.headers.get("Authorization", "")
+    # байты, а не str: compare_digest падает с TypeError на не-ASCII символах в заголовке
+    authorized_by_token = token and hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
+    if not (authorized_by_token or request.user.is_superuser):
+        return HttpResponseForbidden()
+
+    body = render_prometheus(merge_snapshots(collect_snapshots()))
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
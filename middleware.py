@@ -1,7 +1,16 @@
+import logging
+
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.shortcuts import redirect
 
+from films.services.film_statuses import end_status_scope, start_status_scope
+from films.services.posters import end_poster_batch, start_poster_batch
+from services.tmdb_deadline import end_deadline, start_deadline
+from services.tmdb_metrics import end_request_stats, start_request_stats
+
+logger = logging.getLogger("filmdiary.tmdb")
+
 
 class BlockUserMiddleware:
     def __init__(self, get_response):
@@ -13,3 +22,79 @@ class BlockUserMiddleware:
             messages.error(request, "Аккаунт заблокирован администратором")
             return redirect("users:login")
         return self.get_response(request)
+
+
+class TmdbMetricsMiddleware:
+    """Считает вызовы TMDB за запрос: пишет сводку в лог и заголовок Server-Timing"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_request_stats()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = end_request_stats(token)
+
+        if stats.get("calls"):
+            logger.info(
+                "TMDB page: path=%s calls=%s local_hits=%s hits=%s misses=%s errors=%s upstream=%.3fs",
+                request.path,
+                stats["calls"],
+                stats["hit_local"],
+                stats["hit"],
+                stats["miss"],
+                stats["error"],
+                stats["seconds"],
+            )
+            response["Server-Timing"] = f'tmdb;dur={stats["seconds"] * 1000:.1f};desc="{stats["calls"]} calls"'
+        return response
+
+
+class TmdbDeadlineMiddleware:
+    """
+    Ограничивает суммарное время запросов к TMDB за один HTTP-запрос (settings.TMDB_REQUEST_DEADLINE):
+    страница рендерится с тем, что успело загрузиться. Фоновые задачи бюджета не имеют
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_deadline()
+        try:
+            return self.get_response(request)
+        finally:
+            end_deadline(token)
+
+
+class FilmStatusMiddleware:
+    """Область запроса для резолвера статусов фильмов: статусы пользователя загружаются один раз за страницу"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_status_scope()
+        try:
+            return self.get_response(request)
+        finally:
+            end_status_scope(token)
+
+
+class PosterQueueMiddleware:
+    """
+    Постеры без локальной копии, показанные страницей, ставятся в очередь загрузки одним пакетом после ответа,
+    а не обращением к Redis на каждую карточку
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_poster_batch()
+        try:
+            return self.get_response(request)
+        finally:
+            end_poster_batch(token)
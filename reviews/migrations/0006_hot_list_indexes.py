@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("films", "0012_hot_list_indexes"),
+        ("reviews", "0005_alter_review_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["user", "created_at", "id"], name="review_user_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["user", "user_rating", "id"], name="review_user_rating_idx"),
+        ),
+    ]
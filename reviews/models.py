@@ -56,4 +56,7 @@ class Review(models.Model):
         indexes = [
             models.Index(fields=["user", "film"]),
             models.Index(fields=["-updated_at"]),
+            # "Просмотрено" и "Отзывы": курсор (created_at, id) или (user_rating, id) в пределах пользователя
+            models.Index(fields=["user", "created_at", "id"], name="review_user_created_idx"),
+            models.Index(fields=["user", "user_rating", "id"], name="review_user_rating_idx"),
         ]
@@ -1,7 +1,12 @@
+from datetime import date, timedelta
+
 from django.urls import reverse
 
 import pytest
 
+from calendar_events.models import CalendarEvent
+from films.models import UserFilm
+
 
 @pytest.mark.django_db
 def test_review_detail_owner(client, user, review):
@@ -23,3 +28,33 @@ def test_review_detail_forbidden(client, other_user, review):
     response = client.get(url)
 
     assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_watched_sort_by_rating_keeps_sort_in_params(client, user, review):
+    """Курсор строится по ключу сортировки, параметр sort сохраняется в ссылках пагинации"""
+    client.force_login(user)
+
+    response = client.get(reverse("reviews:watched"), {"sort": "rating"})
+
+    assert response.status_code == 200
+    assert list(response.context["reviews"]) == [review]
+    assert "&sort=rating" in response.context["params"]
+
+
+@pytest.mark.django_db
+def test_watched_statuses_for_visible_page_only(client, user, review, django_assert_num_queries):
+    """Статусы карточек (любимое, план) загружаются пакетно для страницы, без подзапросов на каждую строку"""
+    UserFilm.objects.create(user=user, film=review.film, is_favorite=True)
+    CalendarEvent.objects.create(user=user, film=review.film, planned_date=date.today() + timedelta(days=1))
+    client.force_login(user)
+
+    # сессия, пользователь, группа Manager (представление и меню), страница, жанры, количество,
+    # UserFilm и календарь страницы (отзывы уже загружены)
+    with django_assert_num_queries(9):
+        response = client.get(reverse("reviews:watched"))
+
+    card = response.context["reviews"][0]
+    assert card.is_favorite is True
+    assert card.is_planned is True
+    assert "EXISTS" not in str(response.context["page_obj"]._queryset.query)
@@ -2,49 +2,56 @@ import logging
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import models
-from django.db.models import Exists, OuterRef, Subquery
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
-from django.utils.timezone import now
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
-from calendar_events.models import CalendarEvent
-from films.models import Film, UserFilm
+from films.models import Film
+from films.services.film_statuses import get_status_resolver
+from films.services.library_search import film_search_q
 from reviews.forms import ReviewForm
 from reviews.models import Review
+from services.keyset import KeysetPaginationMixin
 from services.permissions import can_user_delete, can_user_edit, can_user_view, is_manager
 
 logger = logging.getLogger("filmdiary.reviews")
 
 
-class BaseReviewListView(LoginRequiredMixin, ListView):
-    """Базовый класс для списков просмотренных фильмов"""
+class BaseReviewListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    """Базовый класс для списков просмотренных фильмов. Курсорная пагинация по (created_at, id) / (user_rating, id)"""
 
     model = Review
     context_object_name = "reviews"
     paginate_by = 12
+    items_template = "reviews/includes/review_items.html"
+
+    def get_keyset_ordering(self):
+        if self.request.GET.get("sort", "date") == "rating":
+            return "-user_rating", "-id"
+        return "-created_at", "-id"
 
     def get_base_queryset(self):
-        """Базовый queryset с annotate для карточек"""
-        qs = Review.objects.select_related("film").order_by("-updated_at")
+        """Базовый queryset карточек: статусы фильмов добавляются только для видимой страницы"""
+        qs = Review.objects.select_related("film").prefetch_related("film__genres")
         user = self.request.user
         if not (user.is_superuser or is_manager(user)):
             qs = qs.filter(user=user)
+        return qs
 
-        sort = self.request.GET.get("sort", "date")
-        if sort == "rating":
-            qs = qs.order_by("-user_rating", "-created_at")
-        else:
-            qs = qs.order_by("-created_at")
-
-        user_films = UserFilm.objects.filter(user=user, film=OuterRef("film"))
-        planned_events = CalendarEvent.objects.filter(user=user, film=OuterRef("film"), planned_date__gte=now().date())
-
-        return qs.annotate(
-            user_film_id=Subquery(user_films.values("id")[:1]),
-            is_favorite=Exists(user_films.filter(is_favorite=True)),
-            is_planned=Exists(planned_events),
-        )
+    def get_context_data(self, **kwargs):
+        """Отмечает карточки страницы статусами текущего пользователя (UserFilm, любимое, план) - до трех запросов"""
+        context = super().get_context_data(**kwargs)
+        reviews = context[self.context_object_name]
+
+        statuses = get_status_resolver(self.request.user)
+        statuses.prime(reviews=[r for r in reviews if r.user_id == self.request.user.id])
+        statuses.load(r.film_id for r in reviews)
+        for review in reviews:
+            user_film = statuses.user_film(review.film_id)
+            review.user_film_id = user_film.id if user_film else None
+            review.is_favorite = bool(user_film and user_film.is_favorite)
+            review.is_planned = statuses.is_planned(review.film_id)
+        return context
 
 
 class WatchedListView(BaseReviewListView):
@@ -56,13 +63,14 @@ class WatchedListView(BaseReviewListView):
         """Добавляет поиск по просмотренному=оцененному в контекст"""
         context = super().get_context_data(**kwargs)
         query = self.request.GET.get("q", "").strip()
+        sort = self.request.GET.get("sort", "date")
 
         context.update(
             {
                 "search_type": "watched",
                 "query": query,
-                "params": f"&q={query}&source=watched" if query else "&source=watched",
-                "current_sort": self.request.GET.get("sort", "date"),
+                "params": (f"&q={query}&source=watched" if query else "&source=watched") + f"&sort={sort}",
+                "current_sort": sort,
                 "template": "reviews",
             }
         )
@@ -74,7 +82,7 @@ class WatchedListView(BaseReviewListView):
 
         query = self.request.GET.get("q", "").strip()
         if query:
-            queryset = queryset.filter(models.Q(film__title__icontains=query))
+            queryset = queryset.filter(film_search_q(query))
         return queryset
 
 
@@ -91,20 +99,21 @@ class ReviewsListView(WatchedListView):
 
         query = self.request.GET.get("q", "").strip()
         if query:
-            queryset = queryset.filter(models.Q(film__title__icontains=query) | models.Q(user__email__icontains=query))
+            queryset = queryset.filter(film_search_q(query) | models.Q(user__email__icontains=query))
         return queryset
 
     def get_context_data(self, **kwargs):
         """Добавляет данные в контекст для поиска в списке отзывов на фильмы"""
         context = super().get_context_data(**kwargs)
         query = self.request.GET.get("q", "").strip()
+        sort = self.request.GET.get("sort", "date")
 
         context.update(
             {
                 "search_type": "reviewed",
                 "query": query,
-                "params": f"&q={query}&source=reviewed" if query else "&source=reviewed",
-                "current_sort": self.request.GET.get("sort", "date"),
+                "params": (f"&q={query}&source=reviewed" if query else "&source=reviewed") + f"&sort={sort}",
+                "current_sort": sort,
                 "template": "reviews",
             }
         )
@@ -1,12 +1,24 @@
 TMDB_TTL = {
     "movie_detail": 60 * 60 * 12,  # 12 часов
     "movie_credits": 60 * 60 * 12,  # 12 часов
+    "movie_keywords": 60 * 60 * 12,  # 12 часов
     "search": 60 * 10,  # 10 минут
+    "find": 60 * 60 * 24 * 7,  # 7 дней: соответствие id IMDb -> TMDB не меняется
     "popular": 60 * 60 * 12,  # 12 часов
     "top_rated": 60 * 60 * 12,  # 12 часов
     "trending": 60 * 60 * 3,  # 3 часа
     "genres": 60 * 60 * 24 * 7,  # 7 дней
+    "discover": 60 * 60 * 12,  # 12 часов: подборки по жанру, в локальный уровень не попадают
     "similar": 60 * 60 * 12,  # 12 часов
     "recommended": 60 * 60 * 12,  # 12 часов
     "config": 60 * 60 * 24 * 7,  # 7 дней
 }
+
+# Локальный (in-process) уровень кэша перед Redis: только для редко меняющихся ключей
+TMDB_LOCAL_TTL = {
+    "genres": 60 * 15,  # 15 минут
+    "config": 60 * 15,  # 15 минут
+    "popular": 60 * 5,  # 5 минут
+    "top_rated": 60 * 5,  # 5 минут
+    "trending": 60 * 5,  # 5 минут
+}
@@ -0,0 +1,199 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+EXACT_COUNT_LIMIT = 1000  # до стольких строк считаем точно: COUNT(*) по малому набору дешев
+
+
+def encode_cursor(values: list) -> str:
+    """Курсор - значения ключа сортировки последней (первой) строки страницы в base64"""
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, model, fields: list[str]) -> list | None:
+    """Значения ключа из курсора, приведенные к типам полей модели. None - курсор поврежден"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+    except Exception:
+        return None
+
+
+def _parse_ordering(ordering) -> list[tuple[str, bool]]:
+    """("-created_at", "-id") -> [("created_at", True), ("id", True)]"""
+    return [(item.lstrip("-"), item.startswith("-")) for item in ordering]
+
+
+def _keyset_q(keys: list[tuple[str, bool]], values: list, forward: bool) -> Q:
+    """
+    Условие "строго после (до) курсора" для составного ключа:
+    (a < va) OR (a = va AND b < vb) OR ...; направление сравнения - по направлению сортировки поля
+    """
+    condition = Q()
+    for i, (field, desc) in enumerate(keys):
+        lookup = "lt" if desc == forward else "gt"
+        equal = {prev_field: values[j] for j, (prev_field, _) in enumerate(keys[:i])}
+        condition |= Q(**equal, **{f"{field}__{lookup}": values[i]})
+    return condition
+
+
+def estimate_count(queryset: QuerySet) -> tuple[int, bool]:
+    """
+    Количество строк. Сначала один COUNT(*) не более чем по EXACT_COUNT_LIMIT + 1 строкам - для малых наборов
+    это точный ответ за один запрос на любой СУБД. Только если предел превышен, второй запрос: оценка
+    планировщика PostgreSQL (EXPLAIN, без обхода таблицы) или точный COUNT(*) на других СУБД.
+    Возвращает (количество, оценка ли это)
+    """
+    queryset = queryset.order_by()
+    capped = queryset[: EXACT_COUNT_LIMIT + 1].count()
+    if capped <= EXACT_COUNT_LIMIT:
+        return capped, False
+    if connection.vendor == "postgresql":
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return max(int(plan[0]["Plan"]["Plan Rows"]), capped), True
+    return queryset.count(), False
+
+
+class KeysetPage:
+    """
+    Страница курсорной пагинации: next_cursor / previous_cursor вместо номеров страниц.
+    Количество строк не считается, пока его не запросят (count)
+    """
+
+    def __init__(self, object_list, queryset, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self._queryset = queryset
+        self._fields = [field for field, _ in _parse_ordering(ordering)]
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self._count = None
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def _cursor(self, obj) -> str:
+        return encode_cursor([getattr(obj, field) for field in self._fields])
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self) -> str | None:
+        return self._cursor(self.object_list[-1]) if self._has_next and self.object_list else None
+
+    @property
+    def previous_cursor(self) -> str | None:
+        return self._cursor(self.object_list[0]) if self._has_previous and self.object_list else None
+
+    def _estimate(self):
+        if self._count is None:
+            self._count = estimate_count(self._queryset)
+        return self._count
+
+    @property
+    def count(self) -> int:
+        return self._estimate()[0]
+
+    @property
+    def count_is_estimated(self) -> bool:
+        return self._estimate()[1]
+
+
+def paginate_keyset(
+    queryset: QuerySet, ordering, per_page: int, after: str | None = None, before: str | None = None
+) -> KeysetPage:
+    """
+    Курсорная (keyset) пагинация: WHERE (ключ) < (курсор) ORDER BY ключ LIMIT per_page + 1.
+    Стоимость страницы не зависит от ее глубины, COUNT(*) не нужен.
+    ordering должен однозначно упорядочивать строки (последним полем - id)
+    """
+    keys = _parse_ordering(ordering)
+    fields = [field for field, _ in keys]
+    queryset = queryset.order_by(*ordering)
+
+    cursor = before or after
+    values = decode_cursor(cursor, queryset.model, fields) if cursor else None
+    backward = bool(before) and values is not None
+
+    page_qs = queryset
+    if values is not None:
+        page_qs = page_qs.filter(_keyset_q(keys, values, forward=not backward))
+    if backward:
+        page_qs = page_qs.reverse()
+
+    rows = list(page_qs[: per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backward:
+        rows.reverse()
+        return KeysetPage(rows, queryset, ordering, has_next=True, has_previous=has_more)
+    return KeysetPage(rows, queryset, ordering, has_next=has_more, has_previous=values is not None)
+
+
+class KeysetPaginationMixin:
+    """
+    Курсорная пагинация для ListView: ?after=<курсор> / ?before=<курсор>.
+    ?format=json отдает следующую порцию карточек (items_template) для бесконечной прокрутки
+    """
+
+    keyset_ordering = ("-created_at", "-id")
+    items_template = None  # шаблон с карточками одной страницы
+    show_count = True  # показывать количество (для больших наборов - оценку планировщика)
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate_keyset(
+            queryset,
+            self.get_keyset_ordering(),
+            page_size,
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["show_count"] = self.show_count
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get("format") != "json" or not self.items_template:
+            return super().render_to_response(context, **response_kwargs)
+
+        page = context["page_obj"]
+        return JsonResponse(
+            {
+                "html": render_to_string(self.items_template, context, request=self.request),
+                "has_next": page.has_next(),
+                "next_cursor": page.next_cursor,
+            }
+        )
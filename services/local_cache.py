@@ -0,0 +1,101 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCAL_CACHE_MAX_SIZE: int = getattr(settings, "TMDB_LOCAL_CACHE_MAX_SIZE", 256)
+VERSION_CHECK_INTERVAL: int = getattr(settings, "TMDB_LOCAL_CACHE_VERSION_CHECK", 30)  # секунд
+
+
+class LocalLRUCache:
+    """
+    Ограниченный по размеру in-process LRU-кэш с TTL - первый уровень перед Redis.
+    Хранит записи вида key: (expires_at, version, pickled), при переполнении вытесняет самую старую по обращению.
+    Значение хранится сериализованным: каждый get отдает новый объект, и вызывающий код, меняющий ответ TMDB,
+    не портит его для следующих запросов процесса. pickle.loads заметно дешевле copy.deepcopy того же словаря,
+    а по сравнению с Redis экономится сетевой запрос
+    """
+
+    def __init__(self, max_size: int = LOCAL_CACHE_MAX_SIZE) -> None:
+        self.max_size = max_size
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()  # gunicorn/celery могут работать в нескольких потоках
+
+    def get(self, key: str, version: int = 0):
+        """Возвращает копию значения, если оно не истекло и версия совпадает, иначе None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, entry_version, pickled = entry
+            if expires_at <= time.monotonic() or entry_version != version:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)  # отмечаем как недавно использованный
+        return pickle.loads(pickled)
+
+    def set(self, key: str, value, ttl: int, version: int = 0) -> None:
+        """Сохраняет значение на ttl секунд, вытесняя наименее используемые записи"""
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, version, pickled)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очищает локальный кэш процесса"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+tmdb_local_cache = LocalLRUCache()
+
+_versions: dict[str, tuple[float, int]] = {}  # namespace: (время проверки, версия)
+_versions_lock = threading.Lock()  # _versions меняют потоки запросов и пул загрузки payload
+
+
+def _version_key(namespace: str) -> str:
+    return f"tmdb_local:version:{namespace}"
+
+
+def get_local_version(namespace: str) -> int:
+    """
+    Возвращает текущую версию пространства ключей (ttl_key).
+    Версия хранится в Redis (общая для всех процессов), но читается не чаще раза в VERSION_CHECK_INTERVAL
+    """
+    now = time.monotonic()
+    with _versions_lock:
+        checked = _versions.get(namespace)
+    if checked is not None and now - checked[0] < VERSION_CHECK_INTERVAL:
+        return checked[1]
+
+    version = cache.get(_version_key(namespace)) or 0  # сетевой запрос - вне блокировки
+    with _versions_lock:
+        current = _versions.get(namespace)
+        if current is not None and current[0] > now:  # пока читали Redis, версию обновил invalidate_local
+            return current[1]
+        _versions[namespace] = (now, version)
+    return version
+
+
+def invalidate_local(namespace: str) -> int:
+    """
+    Инвалидирует локальный уровень для ttl_key во всех процессах: увеличивает версию в Redis.
+    Остальные процессы увидят новую версию не позже чем через VERSION_CHECK_INTERVAL
+    """
+    key = _version_key(namespace)
+    try:
+        version = cache.incr(key)
+    except ValueError:  # ключа ещё нет
+        version = 1
+        cache.set(key, version, None)
+    with _versions_lock:
+        _versions[namespace] = (time.monotonic(), version)
+    return version
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+
+class PrivateMediaStorage(FileSystemStorage):
+    """
+    Файлы пользователей вне MEDIA_ROOT (settings.PRIVATE_MEDIA_ROOT): nginx их не отдает,
+    читают только Django и Celery. Публичных ссылок у файлов нет
+    """
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == "PRIVATE_MEDIA_ROOT":
+            self.__dict__.pop("base_location", None)
+            self.__dict__.pop("location", None)
+
+    def url(self, name):
+        raise ValueError("У приватных файлов нет публичной ссылки")
+
+
+private_storage = PrivateMediaStorage()
+
+
+def get_private_storage() -> PrivateMediaStorage:
+    """Хранилище для FileField(storage=...): вызываемый объект, чтобы миграции не зависели от пути на диске"""
+    return private_storage
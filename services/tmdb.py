@@ -2,39 +2,92 @@ import hashlib
 import json
 import os
 import time
+from datetime import timedelta
 from json import JSONDecodeError
+from typing import TYPE_CHECKING, Callable
 
+from django.conf import settings
 from django.core.cache import cache
+from django.utils import timezone
 
 import requests
 from dotenv import load_dotenv
 
-from services.cache_ttl import TMDB_TTL
+from services import tmdb_deadline
+from services.cache_ttl import TMDB_LOCAL_TTL, TMDB_TTL
+from services.local_cache import get_local_version, invalidate_local, tmdb_local_cache
 from services.tmdb_film import TmdbFilm
+from services.tmdb_metrics import endpoint_label, tmdb_metrics
+
+if TYPE_CHECKING:
+    from films.models import CatalogFilm
 
 load_dotenv()
 
 API_KEY = os.getenv("TMDB_API_KEY")
-BASE = "https://api.themoviedb.org/3"
+BASE = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")  # для офлайн-прогонов - адрес tmdb_stub
 LANG = "ru-RU"
+DETAILS_PARAMS = {"append_to_response": "images", "include_image_language": "en-US,null"}
+CATALOG_MAX_AGE_DAYS: int = getattr(settings, "TMDB_CATALOG_MAX_AGE_DAYS", 14)
 
 
 class Tmdb:
     """Класс для работы с TMDB API"""
 
-    def __init__(self) -> None:
-        """Конструктор для получения вакансий через API"""
+    def __init__(self, use_catalog: bool = True) -> None:
+        """
+        Конструктор для получения данных через API.
+        use_catalog: сначала искать фильм в локальном зеркале каталога (CatalogFilm), затем в API
+        """
         self._base_url: str = BASE
         self._base_params: dict = {"api_key": API_KEY, "language": LANG}
+        self.use_catalog = use_catalog
+
+    @staticmethod
+    def _catalog_fresh_since():
+        """Граница свежести записей зеркала каталога"""
+        return timezone.now() - timedelta(days=CATALOG_MAX_AGE_DAYS)
+
+    def _from_catalog(self, movie_id) -> "CatalogFilm | None":
+        """Возвращает свежую запись фильма из локального зеркала каталога или None"""
+        if not self.use_catalog:
+            return None
+        from films.models import CatalogFilm  # модель приложения - лениво: services не зависит от порядка импорта
+
+        return CatalogFilm.objects.filter(tmdb_id=movie_id, synced_at__gte=self._catalog_fresh_since()).first()
+
+    def _catalog_payload(self, movie_id, field: str) -> dict | None:
+        """Ответ в формате API из свежей записи зеркала каталога (details/credits/keywords) или None"""
+        mirrored = self._from_catalog(movie_id)
+        if mirrored is None:
+            return None
+        if field == "keywords":
+            return {"id": movie_id, "keywords": mirrored.keywords}
+        return getattr(mirrored, field)
 
-    def _build_tmdb_film(self, raw: dict) -> TmdbFilm | None:
-        """Превращает сырые данные с фильмом-рекомендацией TMDB в структурированный TmdbFilm"""
+    def _from_catalog_bulk(self, movie_ids) -> "dict[int, CatalogFilm]":
+        """Возвращает свежие записи зеркала каталога одним запросом: {tmdb_id: CatalogFilm}"""
+        if not self.use_catalog or not movie_ids:
+            return {}
+        from films.models import CatalogFilm
+
+        rows = CatalogFilm.objects.filter(tmdb_id__in=movie_ids, synced_at__gte=self._catalog_fresh_since())
+        return {row.tmdb_id: row for row in rows}
+
+    def _build_tmdb_film(self, raw: dict, catalog: "CatalogFilm | None" = None) -> TmdbFilm | None:
+        """
+        Превращает сырые данные с фильмом-рекомендацией TMDB в структурированный TmdbFilm:
+        если фильм есть в зеркале каталога - без запросов к API
+        """
         tmdb_id = raw.get("id")
         if not tmdb_id:
             return None
 
-        details = self.get_movie_details(tmdb_id)
-        credits = self.get_credits(tmdb_id)
+        if catalog:
+            details, credits = catalog.details, catalog.credits
+        else:
+            details = self.get_movie_details(tmdb_id)
+            credits = self.get_credits(tmdb_id)
 
         genres = [g["name"].lower() for g in details.get("genres", [])]
 
@@ -78,10 +131,11 @@ class Tmdb:
                 break
 
         films: list[TmdbFilm] = []
+        catalog = self._from_catalog_bulk(list(raw_movies))  # один запрос к зеркалу вместо 2 запросов к API на фильм
 
-        for raw in raw_movies.values():
+        for tmdb_id, raw in raw_movies.items():
             try:
-                film = self._build_tmdb_film(raw)
+                film = self._build_tmdb_film(raw, catalog.get(tmdb_id))
                 if film:
                     films.append(film)
             except Exception:
@@ -102,46 +156,115 @@ class Tmdb:
         digest = hashlib.md5(raw).hexdigest()
         return f"tmdb_{prefix}:{path}:{digest}"[:200]  # укорачиваем
 
-    def _get(self, path: str, params: dict | None = None, ttl_key: str = "recommended", retries=3, timeout=5) -> dict:
+    def cache_key(self, path: str, params: dict | None = None) -> str:
+        """Возвращает ключ кэша, под которым _get хранит ответ для path и params"""
+        return self._make_cache_key("tmdb", path, {**self._base_params, **(params or {})})
+
+    def _get(
+        self,
+        path: str,
+        params: dict | None = None,
+        ttl_key: str = "recommended",
+        retries=3,
+        timeout=5,
+        refresh: bool = False,
+        fallback: Callable[[], dict | None] | None = None,
+    ) -> dict:
         """
         Внутренний метод для GET запросов:
         timeout: 5 сек (защита от зависания)
         retries: 3 попытки
-        Берет данные из кэша или кэширует (TTL: 1 час)
+        Берет данные из кэша или кэширует (TTL: 1 час).
+        refresh: не читать кэш, а загрузить ответ заново и перезаписать его (прогрев кэша)
+        fallback: источник ответа без API (зеркало каталога) - вызывается только при промахе кэша
+        Для ключей из TMDB_LOCAL_TTL перед Redis стоит локальный LRU-кэш процесса.
+        Внутри HTTP-запроса время запросов к API ограничено бюджетом tmdb_deadline:
+        когда он исчерпан, запрос не выполняется и возвращается {}
         """
         url = f"{self._base_url}{path}"
         params = {**self._base_params, **(params or {})}
+        endpoint = endpoint_label(path)
 
         cache_key = self._make_cache_key("tmdb", path, params)  # создаем уникальный кэш-ключ
-        cached = cache.get(cache_key)  # берем из кэша, если есть
+
+        local_ttl = TMDB_LOCAL_TTL.get(ttl_key)
+        local_version = get_local_version(ttl_key) if local_ttl else 0
+        if local_ttl and not refresh:
+            cached = tmdb_local_cache.get(cache_key, local_version)  # берем из памяти процесса, если есть
+            if cached is not None:
+                tmdb_metrics.record(endpoint, ttl_key, "hit_local")
+                return cached
+
+        cached = None if refresh else cache.get(cache_key)  # берем из кэша, если есть
         if cached is not None:
+            if local_ttl:
+                tmdb_local_cache.set(cache_key, cached, local_ttl, local_version)
+            tmdb_metrics.record(endpoint, ttl_key, "hit")
             return cached
 
+        data = fallback() if fallback else None
+        if data:  # ответ из зеркала кэшируется как ответ API: следующие вызовы не обращаются к базе
+            self._cache_set(cache_key, data, ttl_key, local_ttl, local_version)
+            tmdb_metrics.record(endpoint, ttl_key, "hit")  # запроса к API не было
+            return data
+
+        if tmdb_deadline.attempt_timeout(timeout) is None:
+            tmdb_metrics.record(endpoint, ttl_key, "deadline")
+            return {}
+
+        started = time.monotonic()
+        data = self._fetch(url, params, endpoint, retries, timeout)
+        tmdb_metrics.record(endpoint, ttl_key, "miss" if data is not None else "error", time.monotonic() - started)
+        if data is None:
+            return {}
+
+        self._cache_set(cache_key, data, ttl_key, local_ttl, local_version)
+        return data
+
+    @staticmethod
+    def _cache_set(cache_key: str, data: dict, ttl_key: str, local_ttl: int | None, local_version: int) -> None:
+        """Сохраняет ответ в Redis и, для ключей из TMDB_LOCAL_TTL, в локальный кэш процесса"""
+        cache.set(cache_key, data, TMDB_TTL.get(ttl_key, 60 * 60 * 12))  # по умолчанию кэширем на 12 часов
+        if local_ttl:
+            tmdb_local_cache.set(cache_key, data, local_ttl, local_version)
+
+    @staticmethod
+    def _fetch(url: str, params: dict, endpoint: str, retries: int, timeout: int) -> dict | None:
+        """
+        Запрос к API с повторами: Backoff 1s → 2s → 4s для таймаутов, 429 и 5xx. None - запрос не удался.
+        Таймаут попытки и повторы урезаются до оставшегося бюджета tmdb_deadline, если он задан
+        """
         for attempt in range(1, retries + 1):
+            attempt_timeout = tmdb_deadline.attempt_timeout(timeout)
+            if attempt_timeout is None:
+                return None
             try:
-                response = requests.get(url, params=params, timeout=timeout)
+                response = requests.get(url, params=params, timeout=attempt_timeout)
                 response.raise_for_status()
                 data = response.json()
-
-                cache.set(cache_key, data, TMDB_TTL.get(ttl_key, 60 * 60 * 12))  # по умолчанию кэширем на 12 часов
+                tmdb_metrics.record_bytes(endpoint, len(response.content))
                 return data
 
             except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-                if attempt < retries:
-                    time.sleep(2 ** (attempt - 1))  # Backoff: 1s → 2s → 4s
-                    continue
-                return {}
+                pass
             except requests.exceptions.HTTPError as e:
-                status = e.response.status_code
-                if status in (429, 500, 502, 503, 504):
-                    if attempt < retries:
-                        time.sleep(2 ** (attempt - 1))
-                        continue
-                    return {}
-                return {}
+                if e.response.status_code not in (429, 500, 502, 503, 504):
+                    return None
             except JSONDecodeError:
-                return {}
-        return {}
+                return None
+
+            if attempt < retries:
+                backoff = 2 ** (attempt - 1)
+                if not tmdb_deadline.can_retry(backoff):
+                    return None
+                tmdb_metrics.record_retry(endpoint, backoff)
+                time.sleep(backoff)
+        return None
+
+    @staticmethod
+    def invalidate_local_cache(ttl_key: str) -> int:
+        """Сбрасывает локальный уровень кэша для ttl_key во всех процессах (например, после обновления жанров)"""
+        return invalidate_local(ttl_key)
 
     def _get_multipage(self, path: str, pages: int = 1, params: dict = None, ttl_key: str = "recommended") -> list:
         """Возвращает несколько страниц результатов"""
@@ -164,16 +287,27 @@ class Tmdb:
                 break
         return all_results
 
-    def search_movie(self, query, page=1):
-        """Возвращает список фильмов по поисковой строке. Используется на странице поиска"""
-        return self._get("/search/movie", {"query": query, "page": page}, "search")
+    def search_movie(self, query, page=1, year=None):
+        """Возвращает список фильмов по поисковой строке. Используется на странице поиска и при импорте дневника"""
+        params = {"query": query, "page": page}
+        if year:
+            params["year"] = year
+        return self._get("/search/movie", params, "search")
+
+    def find_by_imdb_id(self, imdb_id):
+        """Находит фильм TMDB по id IMDb (tt0111161). Используется при импорте дневника из IMDb"""
+        return self._get(f"/find/{imdb_id}", {"external_source": "imdb_id"}, "find")
 
     def get_movie_details(self, movie_id):
-        """Возвращает подробную информацию о фильме. Используется в просмотре карточки фильма"""
+        """
+        Возвращает подробную информацию о фильме. Используется в просмотре карточки фильма.
+        При промахе кэша ответ берется из зеркала каталога, и только затем из API
+        """
         return self._get(
             f"/movie/{movie_id}",
-            {"append_to_response": "images", "include_image_language": "en-US,null"},
+            DETAILS_PARAMS,
             "movie_detail",
+            fallback=lambda: self._catalog_payload(movie_id, "details"),
         )
 
     def get_config(self):
@@ -190,7 +324,21 @@ class Tmdb:
         Возвращает актёров(cast) и команду(crew) для отображения актёров, режиссёров,
         сценаристов, продюсеров, операторов
         """
-        return self._get(f"/movie/{movie_id}/credits", {}, "movie_credits")
+        return self._get(
+            f"/movie/{movie_id}/credits",
+            {},
+            "movie_credits",
+            fallback=lambda: self._catalog_payload(movie_id, "credits"),
+        )
+
+    def get_keywords(self, movie_id):
+        """Возвращает ключевые слова фильма"""
+        return self._get(
+            f"/movie/{movie_id}/keywords",
+            {},
+            "movie_keywords",
+            fallback=lambda: self._catalog_payload(movie_id, "keywords"),
+        )
 
     def get_now_playing(self, pages=1):
         """Возвращает фильмы, которые сейчас в кино"""
@@ -227,12 +375,18 @@ class Tmdb:
 
     def get_movies_by_genre(self, genre_id, page=1):
         """Возвращает фильмы по жанру"""
-        return self._get("/discover/movie", {"with_genres": genre_id, "page": page}, "genres")
+        return self._get("/discover/movie", {"with_genres": genre_id, "page": page}, "discover")
 
-    def get_poster_url(self, path: str, size: str = "w342") -> str | None:  # w185, w342, w500
-        """Строит полный URL постера из относительного path"""
+    def get_poster_url(self, path: str, size: str = "w342") -> str | None:  # w154, w342, w500
+        """
+        Строит полный URL постера из относительного path: для размеров вариантов кэша постеров (w154/w342/w500) -
+        локальный WebP (или TMDB, пока постер в очереди на загрузку), для остальных размеров - image.tmdb.org
+        """
         if not path:
             return None
+        from films.services.posters import POSTER_VARIANTS, TMDB_IMAGE_BASE, poster_url  # приложение - лениво
 
-        BASE_URL = "https://image.tmdb.org/t/p/"
-        return f"{BASE_URL}{size}{path}"
+        variant = next((name for name, width in POSTER_VARIANTS.items() if f"w{width}" == size), None)
+        if variant:
+            return poster_url(path, variant)
+        return f"{TMDB_IMAGE_BASE}{size}{path}"
@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REQUEST_DEADLINE: float = getattr(settings, "TMDB_REQUEST_DEADLINE", 8.0)  # секунд на все запросы к TMDB за страницу
+MIN_ATTEMPT_TIMEOUT = 0.5  # меньше нет смысла начинать запрос к API
+
+_deadline: ContextVar[dict | None] = ContextVar("tmdb_deadline", default=None)
+
+
+def start_deadline(seconds: float = REQUEST_DEADLINE) -> object:
+    """Задает бюджет времени на запросы к TMDB для текущего HTTP-запроса, возвращает токен для end_deadline"""
+    return _deadline.set({"expires_at": time.monotonic() + seconds, "exhausted": False})
+
+
+def end_deadline(token) -> None:
+    """Снимает бюджет времени текущего HTTP-запроса"""
+    _deadline.reset(token)
+
+
+@contextmanager
+def tmdb_deadline(seconds: float = REQUEST_DEADLINE):
+    """Ограничивает суммарное время запросов к TMDB внутри блока"""
+    token = start_deadline(seconds)
+    try:
+        yield
+    finally:
+        end_deadline(token)
+
+
+def remaining() -> float | None:
+    """Оставшийся бюджет в секундах; None - бюджета нет (фоновые задачи, команды)"""
+    state = _deadline.get()
+    if state is None:
+        return None
+    return max(0.0, state["expires_at"] - time.monotonic())
+
+
+def attempt_timeout(timeout: float) -> float | None:
+    """
+    Таймаут очередной попытки запроса с учетом бюджета.
+    None - бюджет исчерпан, запрос не начинаем и отмечаем страницу как неполную
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left < MIN_ATTEMPT_TIMEOUT:
+        mark_exhausted()
+        return None
+    return min(timeout, left)
+
+
+def can_retry(backoff: float) -> bool:
+    """Хватит ли бюджета на сон backoff и еще одну попытку"""
+    left = remaining()
+    if left is None:
+        return True
+    if left < backoff + MIN_ATTEMPT_TIMEOUT:
+        mark_exhausted()
+        return False
+    return True
+
+
+def mark_exhausted() -> None:
+    """Отмечает, что часть данных TMDB для текущего запроса не загружена из-за бюджета"""
+    state = _deadline.get()
+    if state is not None:
+        state["exhausted"] = True
+
+
+def is_exhausted() -> bool:
+    """Были ли запросы к TMDB в текущем HTTP-запросе пропущены или прерваны из-за бюджета"""
+    state = _deadline.get()
+    return bool(state and state["exhausted"])
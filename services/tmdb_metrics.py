@@ -0,0 +1,216 @@
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger("filmdiary.tmdb")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FLUSH_INTERVAL: int = getattr(settings, "TMDB_METRICS_FLUSH_INTERVAL", 15)  # секунд
+SNAPSHOT_TTL = 60 * 60  # снимок процесса живет час после последнего сброса
+INDEX_KEY = "tmdb_metrics:index"
+
+RESULTS = ("hit_local", "hit", "miss", "error", "deadline")
+
+_request_stats: ContextVar[dict | None] = ContextVar("tmdb_request_stats", default=None)
+
+
+def endpoint_label(path: str) -> str:
+    """
+    Нормализует путь запроса в метку эндпоинта: /movie/550/credits -> /movie/{id}/credits,
+    /find/tt0111161 -> /find/{id} (внешние id не числовые, а каждый импорт дневника приносит новые)
+    """
+    path = re.sub(r"^/find/[^/]+", "/find/{id}", path)
+    return re.sub(r"/\d+", "/{id}", path)
+
+
+class TmdbMetrics:
+    """
+    Метрики клиента TMDB в памяти процесса: счетчики запросов по эндпоинту/ttl_key/результату,
+    гистограммы задержек запросов к API, повторы, время backoff и объем ответов.
+    Раз в FLUSH_INTERVAL снимок процесса сбрасывается в общий кэш, откуда его читает эндпоинт метрик
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.process_key = f"tmdb_metrics:proc:{socket.gethostname()}:{os.getpid()}"
+        self._last_flush = time.monotonic()
+        self.reset()
+
+    def reset(self) -> None:
+        """Обнуляет метрики процесса"""
+        with self._lock:
+            self.requests: dict[tuple[str, str, str], int] = defaultdict(int)
+            self.latency: dict[str, list] = {}  # endpoint: [счетчики по бакетам..., +Inf, sum, count]
+            self.retries: dict[str, int] = defaultdict(int)
+            self.backoff: dict[str, float] = defaultdict(float)
+            self.bytes: dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, ttl_key: str, result: str, duration: float | None = None) -> None:
+        """Учитывает вызов Tmdb._get: результат (hit_local/hit/miss/error/deadline) и, для запросов к API, задержку"""
+        with self._lock:
+            self.requests[(endpoint, ttl_key, result)] += 1
+            if duration is not None:
+                self._observe(endpoint, duration)
+
+        stats = _request_stats.get()
+        if stats is not None:
+            stats["calls"] += 1
+            stats[result] += 1
+            stats["seconds"] += duration or 0.0
+
+        self.maybe_flush()
+
+    def record_retry(self, endpoint: str, backoff: float) -> None:
+        """Учитывает повтор запроса и время сна перед ним"""
+        with self._lock:
+            self.retries[endpoint] += 1
+            self.backoff[endpoint] += backoff
+
+    def record_bytes(self, endpoint: str, size: int) -> None:
+        """Учитывает объем ответа API"""
+        with self._lock:
+            self.bytes[endpoint] += size
+
+    def _observe(self, endpoint: str, duration: float) -> None:
+        hist = self.latency.setdefault(endpoint, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0, 0])
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                hist[i] += 1
+                break
+        else:
+            hist[len(LATENCY_BUCKETS)] += 1
+        hist[-2] += duration
+        hist[-1] += 1
+
+    def snapshot(self) -> dict:
+        """Копия метрик процесса"""
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "latency": {k: list(v) for k, v in self.latency.items()},
+                "retries": dict(self.retries),
+                "backoff": dict(self.backoff),
+                "bytes": dict(self.bytes),
+            }
+
+    def maybe_flush(self) -> None:
+        """Сбрасывает снимок в общий кэш, если с прошлого сброса прошло FLUSH_INTERVAL"""
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        """Сохраняет снимок процесса в общий кэш и пишет сводку в лог. Ошибки кэша не влияют на запросы к TMDB"""
+        self._last_flush = time.monotonic()
+        snapshot = self.snapshot()
+        try:
+            cache.set(self.process_key, snapshot, SNAPSHOT_TTL)
+            index = cache.get(INDEX_KEY)
+            index = index if isinstance(index, list) else []
+            if self.process_key not in index:
+                cache.set(INDEX_KEY, [*index, self.process_key], None)
+        except Exception:
+            logger.warning("TMDB metrics flush FAIL", exc_info=True)
+        logger.info("TMDB metrics: %s", summarize(snapshot))
+
+
+tmdb_metrics = TmdbMetrics()
+
+
+def summarize(snapshot: dict) -> str:
+    """Короткая сводка для лога: вызовы, доля попаданий в кэш, ошибки, повторы и время backoff"""
+    totals = defaultdict(int)
+    for (_, _, result), count in snapshot["requests"].items():
+        totals[result] += count
+    calls = sum(totals.values())
+    hits = totals["hit_local"] + totals["hit"]
+    hit_ratio = hits / calls if calls else 0.0
+    return (
+        f"calls={calls} hit_ratio={hit_ratio:.1%} local_hits={totals['hit_local']} misses={totals['miss']} "
+        f"errors={totals['error']} deadline_skips={totals['deadline']} retries={sum(snapshot['retries'].values())} "
+        f"backoff={sum(snapshot['backoff'].values()):.1f}s bytes={sum(snapshot['bytes'].values())}"
+    )
+
+
+def collect_snapshots() -> list[dict]:
+    """Снимки всех процессов (веб-воркеры, Celery) из общего кэша; текущий процесс сбрасывается перед чтением"""
+    tmdb_metrics.flush()
+    index = cache.get(INDEX_KEY)
+    index = index if isinstance(index, list) else []
+    snapshots = cache.get_many(index) if index else {}
+    alive = [key for key in index if key in snapshots]
+    if alive != index:
+        cache.set(INDEX_KEY, alive, None)  # чистим индекс от процессов, чьи снимки истекли
+    return list(snapshots.values()) or [tmdb_metrics.snapshot()]
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    """Суммирует снимки нескольких процессов"""
+    merged = {
+        "requests": defaultdict(int),
+        "latency": {},
+        "retries": defaultdict(int),
+        "backoff": defaultdict(float),
+        "bytes": defaultdict(int),
+    }
+    for snap in snapshots:
+        for name in ("requests", "retries", "backoff", "bytes"):
+            for key, value in snap.get(name, {}).items():
+                merged[name][key] += value
+        for endpoint, hist in snap.get("latency", {}).items():
+            target = merged["latency"].setdefault(endpoint, [0] * len(hist))
+            for i, value in enumerate(hist):
+                target[i] += value
+    return merged
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """Формирует метрики в текстовом формате Prometheus (exposition format 0.0.4)"""
+    lines = [
+        "# HELP tmdb_requests_total Вызовы клиента TMDB по эндпоинту, ttl_key и результату",
+        "# TYPE tmdb_requests_total counter",
+    ]
+    for (endpoint, ttl_key, result), count in sorted(snapshot["requests"].items()):
+        lines.append(f'tmdb_requests_total{{endpoint="{endpoint}",ttl_key="{ttl_key}",result="{result}"}} {count}')
+
+    lines += [
+        "# HELP tmdb_request_duration_seconds Длительность запросов к TMDB API с учетом повторов и backoff",
+        "# TYPE tmdb_request_duration_seconds histogram",
+    ]
+    for endpoint, hist in sorted(snapshot["latency"].items()):
+        cumulative = 0
+        for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], hist[: len(LATENCY_BUCKETS) + 1]):
+            cumulative += count
+            lines.append(f'tmdb_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+        lines.append(f'tmdb_request_duration_seconds_sum{{endpoint="{endpoint}"}} {hist[-2]:.6f}')
+        lines.append(f'tmdb_request_duration_seconds_count{{endpoint="{endpoint}"}} {hist[-1]}')
+
+    for name, key, help_text, metric_type in (
+        ("tmdb_retries_total", "retries", "Повторы запросов к TMDB API", "counter"),
+        ("tmdb_backoff_seconds_total", "backoff", "Время сна перед повторами запросов к TMDB API", "counter"),
+        ("tmdb_response_bytes_total", "bytes", "Объем ответов TMDB API", "counter"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+        for endpoint, value in sorted(snapshot[key].items()):
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+    return "\n".join(lines) + "\n"
+
+
+def start_request_stats() -> object:
+    """Начинает подсчет вызовов TMDB для текущего HTTP-запроса, возвращает токен для end_request_stats"""
+    return _request_stats.set({"calls": 0, "seconds": 0.0, **{result: 0 for result in RESULTS}})
+
+
+def end_request_stats(token) -> dict:
+    """Завершает подсчет вызовов TMDB для текущего HTTP-запроса и возвращает статистику"""
+    stats = _request_stats.get() or {}
+    _request_stats.reset(token)
+    return stats
@@ -0,0 +1,308 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+logger = logging.getLogger("filmdiary.films")
+
+UPSTREAM = "https://api.themoviedb.org/3"
+MODES = ("replay", "record", "synthetic")
+
+GENRES = [
+    {"id": 28, "name": "боевик"},
+    {"id": 12, "name": "приключения"},
+    {"id": 16, "name": "мультфильм"},
+    {"id": 35, "name": "комедия"},
+    {"id": 80, "name": "криминал"},
+    {"id": 18, "name": "драма"},
+    {"id": 14, "name": "фэнтези"},
+    {"id": 27, "name": "ужасы"},
+    {"id": 9648, "name": "детектив"},
+    {"id": 878, "name": "фантастика"},
+    {"id": 53, "name": "триллер"},
+]
+CREW_JOBS = ["Director", "Writer", "Producer", "Composer"]
+PAGE_SIZE = 20
+TOTAL_PAGES = 500
+
+
+class UpstreamStatus(Exception):
+    """Ответ TMDB с кодом ошибки клиента (4xx): записывается в фикстуру и воспроизводится с тем же кодом"""
+
+    def __init__(self, status: int, body: dict) -> None:
+        super().__init__(status)
+        self.status = status
+        self.body = body
+
+
+def fixture_name(path: str, params: dict) -> str:
+    """Имя файла фикстуры: читаемый путь + хэш параметров запроса (без api_key, значения как в query string)"""
+    params = {k: str(v) for k, v in params.items() if k != "api_key" and v is not None}
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    slug = path.strip("/").replace("/", "_") or "root"
+    return f"{slug}-{hashlib.md5(raw).hexdigest()[:12]}.json"
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.md5(":".join(map(str, parts)).encode("utf-8")).hexdigest()[:8], 16)
+
+
+def synthetic_movie(tmdb_id: int) -> dict:
+    """Краткая карточка фильма для списков (как в results подборок TMDB)"""
+    rnd = random.Random(tmdb_id)
+    return {
+        "id": tmdb_id,
+        "title": f"Фильм {tmdb_id}",
+        "original_title": f"Movie {tmdb_id}",
+        "overview": f"Синтетическое описание фильма {tmdb_id}.",
+        "poster_path": f"/poster_{tmdb_id}.jpg",
+        "backdrop_path": f"/backdrop_{tmdb_id}.jpg",
+        "genre_ids": [g["id"] for g in rnd.sample(GENRES, 2)],
+        "release_date": f"{rnd.randint(1970, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "vote_average": round(rnd.uniform(4, 9), 1),
+        "vote_count": rnd.randint(10, 30000),
+        "popularity": round(rnd.uniform(1, 500), 2),
+        "adult": False,
+        "video": False,
+    }
+
+
+def synthetic_details(tmdb_id: int) -> dict:
+    """Подробная информация о фильме (/movie/{id})"""
+    rnd = random.Random(tmdb_id)
+    movie = synthetic_movie(tmdb_id)
+    genre_ids = movie.pop("genre_ids")
+    return {
+        **movie,
+        "genres": [g for g in GENRES if g["id"] in genre_ids],
+        "tagline": f"Слоган {tmdb_id}",
+        "runtime": rnd.randint(80, 180),
+        "budget": rnd.randint(1, 200) * 1_000_000,
+        "revenue": rnd.randint(1, 900) * 1_000_000,
+        "origin_country": ["US"],
+        "production_companies": [{"id": 1, "name": "Synthetic Pictures"}],
+        "images": {"backdrops": [], "posters": []},
+    }
+
+
+def synthetic_credits(tmdb_id: int) -> dict:
+    """Актеры и команда (/movie/{id}/credits)"""
+    return {
+        "id": tmdb_id,
+        "cast": [
+            {
+                "id": tmdb_id * 100 + i,
+                "name": f"Актер {tmdb_id}-{i}",
+                "original_name": f"Actor {tmdb_id}-{i}",
+                "character": f"Роль {i}",
+                "profile_path": None,
+                "order": i,
+            }
+            for i in range(15)
+        ],
+        "crew": [
+            {"id": tmdb_id * 100 + 50 + i, "name": f"{job} {tmdb_id}", "job": job, "profile_path": None}
+            for i, job in enumerate(CREW_JOBS)
+        ],
+    }
+
+
+def synthetic_page(key: str, page: int) -> dict:
+    """Страница подборки: фильмы детерминированы по имени подборки и номеру страницы"""
+    rnd = random.Random(_seed(key, page))
+    return {
+        "page": page,
+        "results": [synthetic_movie(rnd.randint(1, 1_000_000)) for _ in range(PAGE_SIZE)],
+        "total_pages": TOTAL_PAGES,
+        "total_results": TOTAL_PAGES * PAGE_SIZE,
+    }
+
+
+SYNTHETIC_ROUTES = [
+    (re.compile(r"^/configuration$"), lambda m, p: _configuration()),
+    (re.compile(r"^/genre/movie/list$"), lambda m, p: {"genres": GENRES}),
+    (re.compile(r"^/movie/(\d+)$"), lambda m, p: synthetic_details(int(m[1]))),
+    (re.compile(r"^/movie/(\d+)/credits$"), lambda m, p: synthetic_credits(int(m[1]))),
+    (
+        re.compile(r"^/movie/(\d+)/keywords$"),
+        lambda m, p: {"id": int(m[1]), "keywords": [{"id": int(m[1]), "name": f"keyword {m[1]}"}]},
+    ),
+    (re.compile(r"^/movie/(\d+)/(similar|recommendations)$"), lambda m, p: synthetic_page(m[0], _page(p))),
+    (re.compile(r"^/movie/(popular|top_rated|upcoming|now_playing)$"), lambda m, p: synthetic_page(m[0], _page(p))),
+    (re.compile(r"^/trending/movie/(day|week)$"), lambda m, p: synthetic_page(m[0], _page(p))),
+    (re.compile(r"^/discover/movie$"), lambda m, p: synthetic_page(f"{m[0]}:{p.get('with_genres')}", _page(p))),
+    (re.compile(r"^/find/(tt\d+)$"), lambda m, p: {"movie_results": [synthetic_movie(int(m[1][2:]))]}),
+    (re.compile(r"^/search/movie$"), lambda m, p: synthetic_page(f"{m[0]}:{p.get('query')}", _page(p))),
+]
+
+
+def _page(params: dict) -> int:
+    try:
+        return max(1, int(params.get("page", 1)))
+    except ValueError:
+        return 1
+
+
+def _configuration() -> dict:
+    return {
+        "images": {
+            "secure_base_url": "https://image.tmdb.org/t/p/",
+            "poster_sizes": ["w92", "w154", "w185", "w342", "w500", "w780", "original"],
+            "backdrop_sizes": ["w300", "w780", "w1280", "original"],
+        }
+    }
+
+
+def synthetic_response(path: str, params: dict) -> dict | None:
+    """Синтетический ответ для любого эндпоинта, который использует services/tmdb.py, или None"""
+    for pattern, build in SYNTHETIC_ROUTES:
+        match = pattern.match(path)
+        if match:
+            return build(match, params)
+    return None
+
+
+class TmdbStubServer(ThreadingHTTPServer):
+    """
+    Локальный заменитель TMDB API для офлайн-тестов и нагрузочных прогонов, с задержкой и внедрением ошибок.
+    Режимы:
+    - replay — отдает записанные фикстуры, для отсутствующих генерирует синтетический ответ (или 404 при strict);
+    - record — проксирует запросы в настоящий TMDB и сохраняет ответы в фикстуры;
+    - synthetic — всегда отдает синтетические, детерминированные по пути и параметрам ответы.
+    Клиент Tmdb направляется на заменитель переменной окружения TMDB_BASE_URL=http://127.0.0.1:<port>/3
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        *,
+        mode: str = "replay",
+        fixtures_dir: str | Path | None = None,
+        upstream: str = UPSTREAM,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        strict: bool = False,
+        seed: int | None = None,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"mode должен быть одним из {MODES}")
+        if mode == "record" and not fixtures_dir:
+            raise ValueError("Для режима record нужен fixtures_dir")
+        super().__init__(address, TmdbStubHandler)
+        self.mode = mode
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.upstream = upstream.rstrip("/")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.strict = strict
+        self.random = random.Random(seed)
+        self.hits: Counter = Counter()  # число запросов по пути - для нагрузочных прогонов
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Базовый URL для TMDB_BASE_URL / Tmdb._base_url"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    def delay(self) -> float:
+        """Задержка ответа: latency ± jitter секунд"""
+        with self._lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self) -> bool:
+        """Нужно ли вернуть внедренную ошибку"""
+        with self._lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def resolve(self, path: str, params: dict) -> dict | None:
+        """Возвращает тело ответа согласно режиму или None (404)"""
+        if self.mode == "synthetic":
+            return synthetic_response(path, params)
+
+        fixture = self.fixtures_dir / fixture_name(path, params) if self.fixtures_dir else None
+        if self.mode == "record":
+            response = requests.get(f"{self.upstream}{path}", params=params, timeout=10)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            data = response.json()
+            if response.status_code >= 400:  # "не найдено" и т.п. - тоже ответ, который нужно воспроизводить
+                data = {"stub_status": response.status_code, "body": data}
+            fixture.parent.mkdir(parents=True, exist_ok=True)
+            fixture.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            return self._unwrap(data)
+
+        if fixture and fixture.exists():
+            return self._unwrap(json.loads(fixture.read_text(encoding="utf-8")))
+        return None if self.strict else synthetic_response(path, params)
+
+    @staticmethod
+    def _unwrap(data: dict) -> dict:
+        """Фикстура записанной ошибки upstream -> UpstreamStatus, иначе тело ответа"""
+        if set(data) == {"stub_status", "body"}:
+            raise UpstreamStatus(data["stub_status"], data["body"])
+        return data
+
+
+class TmdbStubHandler(BaseHTTPRequestHandler):
+    """Обработчик GET-запросов в формате TMDB API v3"""
+
+    server: TmdbStubServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path[2:] if url.path.startswith("/3/") else url.path  # клиент ходит на {base}/3/...
+        params = dict(parse_qsl(url.query))
+        self.server.hits[path] += 1
+
+        delay = self.server.delay()
+        if delay:
+            time.sleep(delay)
+
+        if self.server.should_fail():
+            return self._send(self.server.error_status, {"status_code": self.server.error_status, "success": False})
+
+        try:
+            data = self.server.resolve(path, params)
+        except UpstreamStatus as e:
+            return self._send(e.status, e.body)
+        except requests.RequestException as e:
+            logger.warning("TMDB stub upstream FAIL: path=%s error=%s", path, e)
+            return self._send(502, {"status_code": 502, "status_message": str(e), "success": False})
+
+        if data is None:
+            return self._send(404, {"status_code": 34, "status_message": "Not found", "success": False})
+        return self._send(200, data)
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug("TMDB stub: " + format, *args)
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, **options) -> TmdbStubServer:
+    """Запускает заменитель TMDB в фоновом потоке (для тестов и нагрузочных прогонов); остановка - server.shutdown()"""
+    server = TmdbStubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from calendar_events.models import CalendarEvent
+from films.models import UserFilm
+from reviews.models import Review
+from users.models import CustomUser, UserStats
+
+COUNTERS = ("films_count", "favorites_count", "reviews_count", "planned_count")
+RECONCILE_BATCH_SIZE = 500
+
+_deferred: ContextVar[set[int] | None] = ContextVar("user_stats_deferred", default=None)
+
+
+def apply_delta(user_id: int, **deltas: int) -> None:
+    """
+    Инкрементально меняет счетчики пользователя одним UPDATE (F-выражения, без гонок между процессами)
+    и отмечает активность. Строки счетчиков еще нет - пересчитывает их целиком; при удалении не создает
+    (каскадное удаление пользователя уже удалило его счетчики)
+    """
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred.add(user_id)
+        return
+    changes = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    updated = UserStats.objects.filter(user_id=user_id).update(**changes, last_activity_at=timezone.now())
+    if not updated and all(delta >= 0 for delta in deltas.values()):
+        refresh_user_stats([user_id])
+
+
+@contextmanager
+def deferred_stats(*user_ids: int) -> Iterator[None]:
+    """
+    Пакетная операция: сигналы не обновляют счетчики построчно, затронутые пользователи (и user_ids -
+    bulk_create сигналов не шлет) пересчитываются один раз на выходе
+    """
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred.update(user_ids)
+        yield
+        return
+    token = _deferred.set(set(user_ids))
+    try:
+        yield
+    finally:
+        touched = _deferred.get()
+        _deferred.reset(token)
+        # и при исключении: строки до него уже сохранены (автокоммит или внешняя транзакция продолжится);
+        # прерванная транзакция откатится целиком - пересчитывать нечего, а запрос в ней упал бы
+        if touched and not transaction.get_connection().needs_rollback:
+            refresh_user_stats(touched)
+
+
+def _count(model, **filters) -> Coalesce:
+    """Коррелированный COUNT по пользователю: считается отдельно для каждой таблицы, без взрыва строк JOIN"""
+    counts = model.objects.filter(user=OuterRef("pk"), **filters).order_by().values("user").annotate(n=Count("id"))
+    return Coalesce(Subquery(counts.values("n"), output_field=IntegerField()), Value(0))
+
+
+def _last(model, field: str) -> Subquery:
+    latest = model.objects.filter(user=OuterRef("pk")).order_by().values("user").annotate(last=Max(field))
+    return Subquery(latest.values("last"))
+
+
+def compute_user_stats(user_ids: Iterable[int]) -> list[UserStats]:
+    """Точные значения счетчиков для пользователей (по запросу на пакет)"""
+    rows = (
+        CustomUser.objects.filter(id__in=list(user_ids))
+        .annotate(
+            films_count=_count(UserFilm),
+            favorites_count=_count(UserFilm, is_favorite=True),
+            reviews_count=_count(Review),
+            planned_count=_count(CalendarEvent),
+            last_film=_last(UserFilm, "created_at"),
+            last_review=_last(Review, "updated_at"),
+            last_event=_last(CalendarEvent, "created_at"),
+        )
+        .values("id", *COUNTERS, "last_film", "last_review", "last_event")
+    )
+    stats = []
+    for row in rows:
+        activity = [row[key] for key in ("last_film", "last_review", "last_event") if row[key]]
+        stats.append(
+            UserStats(
+                user_id=row["id"],
+                last_activity_at=max(activity) if activity else None,
+                **{name: row[name] for name in COUNTERS},
+            )
+        )
+    return stats
+
+
+def refresh_user_stats(user_ids: Iterable[int]) -> list[UserStats]:
+    """Пересчитывает и сохраняет счетчики пользователей (после пакетных операций, которые не шлют сигналы)"""
+    stats = compute_user_stats(user_ids)
+    UserStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=[*COUNTERS, "last_activity_at"],
+    )
+    return stats
+
+
+def reconcile_user_stats(batch_size: int = RECONCILE_BATCH_SIZE) -> tuple[int, int]:
+    """
+    Сверяет счетчики всех пользователей с данными пакетами по batch_size и исправляет расхождения.
+    Возвращает (проверено пользователей, исправлено)
+    """
+    checked = fixed = 0
+    user_ids = CustomUser.objects.order_by("id").values_list("id", flat=True)
+    last_id = 0
+    while True:
+        batch = list(user_ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return checked, fixed
+        last_id = batch[-1]
+
+        stored = {s.user_id: s for s in UserStats.objects.filter(user_id__in=batch)}
+        actual = compute_user_stats(batch)
+        drifted = [
+            s
+            for s in actual
+            if s.user_id not in stored or any(getattr(s, n) != getattr(stored[s.user_id], n) for n in COUNTERS)
+        ]
+        if drifted:
+            UserStats.objects.bulk_create(
+                drifted,
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=[*COUNTERS, "last_activity_at"],
+            )
+        checked += len(batch)
+        fixed += len(drifted)
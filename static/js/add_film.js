@@ -22,14 +22,19 @@ document.addEventListener('click', async function (e) {
                 'X-CSRFToken': csrfToken,
                 'X-Requested-With': 'XMLHttpRequest',
             },
-            body: `tmdb_id=${encodeURIComponent(tmdbId)}`
+            body: `tmdb_id=${encodeURIComponent(tmdbId)}&async=1`
         });
 
         if (!response.ok) {
             throw new Error(`HTTP ${response.status}`);
         }
 
-        const data = await response.json();
+        let data = await response.json();
+
+        if (data.status === 'pending') {
+            button.innerHTML = '<span>Загружаем из TMDB...</span>';
+            data = await waitForFilm(data.status_url);
+        }
 
         if (data.status === 'added' || data.status === 'exists') {
             button.outerHTML = `
@@ -54,6 +59,21 @@ document.addEventListener('click', async function (e) {
     }
 });
 
+// опрос статуса отложенного добавления фильма
+async function waitForFilm(statusUrl, attempts = 30, interval = 1500) {
+    for (let i = 0; i < attempts; i++) {
+        await new Promise(resolve => setTimeout(resolve, interval));
+        const response = await fetch(statusUrl, {headers: {'X-Requested-With': 'XMLHttpRequest'}});
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const data = await response.json();
+        if (data.status === 'added') return data;
+        if (data.status === 'failed') throw new Error(data.message || 'Не удалось добавить фильм');
+    }
+    throw new Error('Фильм ещё загружается, обновите страницу позже');
+}
+
 // функция для CSRF токена
 function getCookie(name) {
     let cookieValue = null;
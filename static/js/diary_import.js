@@ -0,0 +1,28 @@
+const IMPORT_POLL_INTERVAL = 2000;
+const IMPORT_STATUSES = {pending: 'В очереди', running: 'Выполняется', done: 'Завершен', failed: 'Ошибка'};
+
+async function pollImport(block) {
+    try {
+        const response = await fetch(block.dataset.statusUrl, {headers: {'X-Requested-With': 'XMLHttpRequest'}});
+        if (!response.ok) return;
+
+        const data = await response.json();
+        block.querySelector('.diary-import__status').textContent = IMPORT_STATUSES[data.status] || data.status;
+        block.querySelector('.diary-import__progress').textContent =
+            `Обработано ${data.processed} из ${data.total}, добавлено фильмов: ${data.imported}, оценок: ${data.reviews}`;
+
+        if (data.status === 'pending' || data.status === 'running') {
+            setTimeout(() => pollImport(block), IMPORT_POLL_INTERVAL);
+        } else {
+            window.location.reload();
+        }
+    } catch (error) {
+        console.error('Import status error:', error);
+    }
+}
+
+document.querySelectorAll('.diary-import').forEach(block => {
+    if (block.dataset.status === 'pending' || block.dataset.status === 'running') {
+        setTimeout(() => pollImport(block), IMPORT_POLL_INTERVAL);
+    }
+});
@@ -0,0 +1,46 @@
+// Бесконечная прокрутка списков с курсорной пагинацией: следующая порция карточек подгружается
+// с ?format=json, когда пользователь докрутил до конца сетки. Ссылки "Назад/Вперед" остаются без JS
+document.addEventListener('DOMContentLoaded', () => {
+  const sentinel = document.querySelector('.infinite-scroll');
+  const grid = document.querySelector('.movie-search-grid');
+  if (!sentinel || !grid || !('IntersectionObserver' in window)) return;
+
+  const pagination = document.querySelector('.glass-pagination');
+  if (pagination) pagination.classList.add('d-none');
+
+  let nextUrl = sentinel.dataset.nextUrl;
+  let loading = false;
+
+  const observer = new IntersectionObserver(async (entries) => {
+    if (!entries[0].isIntersecting || loading || !nextUrl) return;
+    loading = true;
+
+    try {
+      const url = new URL(nextUrl, window.location.href);
+      url.searchParams.set('format', 'json');
+      const response = await fetch(url, {headers: {'X-Requested-With': 'XMLHttpRequest'}});
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+      const data = await response.json();
+      grid.insertAdjacentHTML('beforeend', data.html);
+
+      if (data.has_next) {
+        url.searchParams.delete('format');
+        url.searchParams.set('after', data.next_cursor);
+        nextUrl = url.search;
+      } else {
+        nextUrl = null;
+        observer.disconnect();
+        sentinel.remove();
+      }
+    } catch (error) {
+      console.error('Infinite scroll error:', error);
+      observer.disconnect();
+      if (pagination) pagination.classList.remove('d-none');
+    } finally {
+      loading = false;
+    }
+  }, {rootMargin: '400px'});
+
+  observer.observe(sentinel);
+});
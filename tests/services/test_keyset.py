@@ -0,0 +1,102 @@
+from datetime import date
+
+from django.db import connection
+
+import pytest
+
+from films.models import Film, UserFilm
+from reviews.models import Review
+from services.keyset import decode_cursor, encode_cursor, estimate_count, paginate_keyset
+
+
+@pytest.fixture
+def library(user):
+    """25 фильмов в библиотеке, часть с одинаковым created_at"""
+    films = Film.objects.bulk_create(Film(tmdb_id=1000 + i, title=f"Film {i}") for i in range(25))
+    user_films = UserFilm.objects.bulk_create(UserFilm(user=user, film=film) for film in films)
+    # одинаковые created_at: порядок между ними определяет id
+    UserFilm.objects.filter(id__in=[uf.id for uf in user_films[:10]]).update(created_at=user_films[0].created_at)
+    return UserFilm.objects.filter(user=user)
+
+
+def _walk(queryset, ordering, per_page):
+    """Обходит все страницы по next_cursor"""
+    ids, cursor = [], None
+    while True:
+        page = paginate_keyset(queryset, ordering, per_page, after=cursor)
+        ids.extend(obj.id for obj in page)
+        if not page.has_next():
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.django_db
+def test_keyset_walk_matches_offset_order(library):
+    """Обход по курсорам дает тот же порядок, что и ORDER BY, без пропусков и повторов (в т.ч. при равных ключах)"""
+    ordering = ("-created_at", "-id")
+    expected = list(library.order_by(*ordering).values_list("id", flat=True))
+
+    assert _walk(library, ordering, per_page=7) == expected
+
+
+@pytest.mark.django_db
+def test_keyset_previous_page(library):
+    ordering = ("-created_at", "-id")
+    first = paginate_keyset(library, ordering, 10)
+    second = paginate_keyset(library, ordering, 10, after=first.next_cursor)
+    back = paginate_keyset(library, ordering, 10, before=second.previous_cursor)
+
+    assert [obj.id for obj in back] == [obj.id for obj in first]
+    assert back.has_next() and not back.has_previous()
+    assert second.has_previous()
+
+
+@pytest.mark.django_db
+def test_keyset_page_query_count(library, django_assert_num_queries):
+    """Страница - один запрос, без COUNT(*); количество считается только по запросу"""
+    first = paginate_keyset(library, ("-created_at", "-id"), 10)
+    with django_assert_num_queries(1):
+        page = paginate_keyset(library, ("-created_at", "-id"), 10, after=first.next_cursor)
+        assert len(page) == 10
+    with django_assert_num_queries(1):
+        assert page.count == 25
+        assert page.count_is_estimated is False
+
+
+@pytest.mark.django_db
+def test_keyset_count_same_queries_on_every_database(library, monkeypatch, django_assert_num_queries):
+    """Малый набор - один ограниченный COUNT(*) и на SQLite, и на PostgreSQL; больше предела - два запроса"""
+    with django_assert_num_queries(1):
+        assert estimate_count(library) == (25, False)
+
+    monkeypatch.setattr("services.keyset.EXACT_COUNT_LIMIT", 10)
+    with django_assert_num_queries(2):
+        count, estimated = estimate_count(library)
+    assert estimated is (connection.vendor == "postgresql")
+    assert count == 25 or (estimated and count > 10)
+
+
+@pytest.mark.django_db
+def test_keyset_rating_ordering(user):
+    for i in range(5):
+        film = Film.objects.create(tmdb_id=2000 + i, title=f"Film {i}")
+        rating = 5 + i % 3
+        Review.objects.create(
+            user=user,
+            film=film,
+            watched_at=date(2024, 1, 1),
+            plot_rating=rating,
+            acting_rating=rating,
+            directing_rating=rating,
+            visuals_rating=rating,
+            soundtrack_rating=rating,
+        )
+    queryset = Review.objects.filter(user=user)
+    ordering = ("-user_rating", "-id")
+
+    assert _walk(queryset, ordering, per_page=2) == list(queryset.order_by(*ordering).values_list("id", flat=True))
+
+
+def test_decode_broken_cursor():
+    assert decode_cursor("not-a-cursor", UserFilm, ["created_at", "id"]) is None
+    assert decode_cursor(encode_cursor([1]), UserFilm, ["created_at", "id"]) is None
@@ -0,0 +1,149 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from services import local_cache
+from services.local_cache import LocalLRUCache, get_local_version, invalidate_local, tmdb_local_cache
+from services.tmdb import Tmdb
+from services.tmdb_metrics import tmdb_metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_local_cache(monkeypatch):
+    """Изолирует локальный кэш процесса между тестами; периодический сброс метрик TMDB не обращается к кэшу"""
+    monkeypatch.setattr(tmdb_metrics, "_last_flush", time.monotonic())
+    tmdb_local_cache.clear()
+    local_cache._versions.clear()
+    yield
+    tmdb_local_cache.clear()
+    local_cache._versions.clear()
+
+
+def test_lru_evicts_least_recently_used():
+    """При переполнении вытесняется наименее используемая запись"""
+    lru = LocalLRUCache(max_size=2)
+    lru.set("a", 1, ttl=60)
+    lru.set("b", 2, ttl=60)
+    lru.get("a")
+    lru.set("c", 3, ttl=60)
+
+    assert lru.get("a") == 1
+    assert lru.get("b") is None
+    assert lru.get("c") == 3
+
+
+def test_lru_expires_by_ttl(monkeypatch):
+    """Запись истекает по TTL"""
+    lru = LocalLRUCache()
+    monkeypatch.setattr("services.local_cache.time.monotonic", lambda: 100.0)
+    lru.set("a", 1, ttl=10)
+    monkeypatch.setattr("services.local_cache.time.monotonic", lambda: 111.0)
+
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+def test_lru_ignores_stale_version():
+    """Запись с устаревшей версией не отдается"""
+    lru = LocalLRUCache()
+    lru.set("a", 1, ttl=60, version=1)
+
+    assert lru.get("a", version=2) is None
+
+
+def test_invalidate_local_bumps_version():
+    """Инвалидация увеличивает версию пространства ключей"""
+    before = get_local_version("genres")
+    after = invalidate_local("genres")
+
+    assert after > before
+    assert get_local_version("genres") == after
+
+
+def test_get_serves_hot_keys_from_local_tier(monkeypatch):
+    """Повторное чтение жанров не обращается к Redis"""
+    api = Tmdb()
+    payload = {"genres": [{"id": 1, "name": "драма"}]}
+    redis_get = Mock(side_effect=lambda key: None if key.startswith("tmdb_local:") else payload)
+    monkeypatch.setattr("services.tmdb.cache.get", redis_get)
+
+    first = api.get_genres()
+    second = api.get_genres()
+
+    assert first == second
+    assert redis_get.call_count == 2  # версия пространства + сами данные, второй вызов - из памяти
+
+
+def test_get_skips_local_tier_for_other_keys(monkeypatch):
+    """Детали фильма в локальный уровень не попадают"""
+    api = Tmdb(use_catalog=False)
+    redis_get = Mock(side_effect=lambda key: None if key.startswith("tmdb_local:") else {"id": 1})
+    monkeypatch.setattr("services.tmdb.cache.get", redis_get)
+
+    api.get_movie_details(1)
+    api.get_movie_details(1)
+
+    assert redis_get.call_count == 2
+    assert len(tmdb_local_cache) == 0
+
+
+def test_lru_returns_copy():
+    """Изменение полученного значения не меняет запись кэша"""
+    lru = LocalLRUCache()
+    lru.set("a", {"results": [{"id": 1}]}, ttl=60)
+    lru.get("a")["results"].append({"id": 2})
+
+    assert lru.get("a") == {"results": [{"id": 1}]}
+
+
+def test_lru_stores_snapshot():
+    """Запись кэша - снимок на момент set: последующие изменения исходного объекта ее не меняют"""
+    lru = LocalLRUCache()
+    value = {"results": [{"id": 1}]}
+    lru.set("a", value, ttl=60)
+    value["results"].clear()
+
+    assert lru.get("a") == {"results": [{"id": 1}]}
+
+
+def test_version_read_does_not_overwrite_concurrent_invalidation(monkeypatch):
+    """Пока поток читает версию из Redis, другой ее увеличил: устаревшее значение не затирает новое"""
+    redis = Mock()
+    redis.incr.return_value = 5
+
+    def stale_get(key):
+        invalidate_local("detail")  # инвалидация из другого потока между чтением и записью _versions
+        return 4
+
+    redis.get.side_effect = stale_get
+    monkeypatch.setattr(local_cache, "cache", redis)
+
+    assert get_local_version("detail") == 5
+    assert get_local_version("detail") == 5
+    assert redis.get.call_count == 1
+
+
+def test_discover_by_genre_skips_local_tier(monkeypatch):
+    """Подборки по жанру (много разных страниц) не вытесняют из памяти редкие ключи жанров"""
+    monkeypatch.setattr("services.tmdb.cache.get", Mock(return_value={"results": []}))
+
+    Tmdb().get_movies_by_genre(18)
+
+    assert len(tmdb_local_cache) == 0
+
+
+def test_refresh_bypasses_both_tiers(monkeypatch):
+    """refresh (прогрев) не читает ни память процесса, ни Redis и перезаписывает ответ"""
+    api = Tmdb()
+    tmdb_local_cache.set(api.cache_key("/genre/movie/list"), {"genres": []}, ttl=60)
+    redis_get = Mock(return_value=None)
+    redis_set = Mock()
+    monkeypatch.setattr("services.tmdb.cache.get", redis_get)
+    monkeypatch.setattr("services.tmdb.cache.set", redis_set)
+    fresh = {"genres": [{"id": 1, "name": "драма"}]}
+    monkeypatch.setattr(Tmdb, "_fetch", staticmethod(lambda *args: fresh))
+
+    assert api._get("/genre/movie/list", {}, "genres", refresh=True) == fresh
+    assert [c.args[0] for c in redis_get.call_args_list] == ["tmdb_local:version:genres"]
+    redis_set.assert_called_once()
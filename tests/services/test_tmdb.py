@@ -1,5 +1,11 @@
+from datetime import timedelta
 from unittest.mock import Mock
 
+from django.utils import timezone
+
+import pytest
+
+from films.models import CatalogFilm
 from services.tmdb import Tmdb
 
 
@@ -25,6 +31,7 @@ def test_get_http_success(monkeypatch):
     api = Tmdb()
     response = Mock()
     response.json.return_value = {"ok": True}
+    response.content = b'{"ok": true}'
     response.raise_for_status.return_value = None
     monkeypatch.setattr("services.tmdb.requests.get", lambda *a, **k: response)
     monkeypatch.setattr("services.tmdb.cache.get", lambda k: None)
@@ -62,3 +69,52 @@ def test_build_tmdb_film(monkeypatch):
     assert film.genres == ["action"]
     assert film.actors == ["actor"]
     assert film.director == "director"
+
+
+@pytest.mark.django_db
+def test_get_movie_details_reads_catalog_first(monkeypatch):
+    """Свежая запись зеркала каталога отдается без запроса к API"""
+    CatalogFilm.objects.create(
+        tmdb_id=42,
+        title="Mirror",
+        details={"id": 42, "title": "Mirror"},
+        credits={"cast": []},
+        synced_at=timezone.now(),
+    )
+    fetch = Mock()
+    monkeypatch.setattr(Tmdb, "_fetch", fetch)
+    api = Tmdb()
+
+    assert api.get_movie_details(42) == {"id": 42, "title": "Mirror"}
+    assert api.get_credits(42) == {"cast": []}
+    fetch.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_get_movie_details_skips_stale_catalog(monkeypatch):
+    """Устаревшая запись зеркала не используется"""
+    CatalogFilm.objects.create(tmdb_id=42, details={"id": 42}, synced_at=timezone.now() - timedelta(days=365))
+    monkeypatch.setattr(Tmdb, "_fetch", Mock(return_value={"id": 42, "title": "Live"}))
+
+    assert Tmdb().get_movie_details(42)["title"] == "Live"
+
+
+@pytest.mark.django_db
+def test_get_movie_details_cache_hit_skips_catalog(monkeypatch, django_assert_num_queries):
+    """Ответ из кэша отдается без запроса к зеркалу каталога"""
+    monkeypatch.setattr("services.tmdb.cache.get", Mock(return_value={"id": 42, "title": "Cached"}))
+
+    with django_assert_num_queries(0):
+        assert Tmdb().get_movie_details(42)["title"] == "Cached"
+
+
+@pytest.mark.django_db
+def test_catalog_answer_is_cached(monkeypatch):
+    """Ответ из зеркала сохраняется в кэш: следующий вызов не обращается к базе"""
+    CatalogFilm.objects.create(tmdb_id=42, details={"id": 42, "title": "Mirror"}, synced_at=timezone.now())
+    cache_set = Mock()
+    monkeypatch.setattr("services.tmdb.cache.set", cache_set)
+
+    Tmdb().get_movie_details(42)
+
+    assert cache_set.call_args.args[1] == {"id": 42, "title": "Mirror"}
@@ -0,0 +1,79 @@
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from films.services.tmdb_movie_payload import get_tmdb_movie_payload
+from services.tmdb import Tmdb
+from services.tmdb_deadline import is_exhausted, mark_exhausted, tmdb_deadline
+from services.tmdb_metrics import tmdb_metrics
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr("services.tmdb.cache.get", lambda key: None)
+    monkeypatch.setattr("services.tmdb.time.sleep", lambda s: None)
+    tmdb_metrics.reset()
+
+
+def test_without_deadline_keeps_full_retry_policy(monkeypatch):
+    """Вне HTTP-запроса (Celery, команды) делаются все повторы с полным таймаутом"""
+    get = Mock(side_effect=requests.exceptions.Timeout())
+    monkeypatch.setattr("services.tmdb.requests.get", get)
+
+    assert Tmdb(use_catalog=False)._get("/movie/1") == {}
+    assert get.call_count == 3
+    assert all(call.kwargs["timeout"] == 5 for call in get.call_args_list)
+
+
+def test_deadline_caps_attempt_timeout(monkeypatch):
+    """Таймаут попытки не превышает оставшийся бюджет"""
+    ok = Mock(content=b"{}", json=Mock(return_value={"id": 1}), raise_for_status=Mock())
+    get = Mock(return_value=ok)
+    monkeypatch.setattr("services.tmdb.requests.get", get)
+
+    with tmdb_deadline(2):
+        Tmdb(use_catalog=False)._get("/movie/1")
+
+    assert get.call_args.kwargs["timeout"] <= 2
+
+
+def test_deadline_skips_retries_when_budget_spent(monkeypatch):
+    """Повтор с backoff, не влезающий в бюджет, не выполняется"""
+    get = Mock(side_effect=requests.exceptions.Timeout())
+    monkeypatch.setattr("services.tmdb.requests.get", get)
+
+    with tmdb_deadline(1.2):
+        assert Tmdb(use_catalog=False)._get("/movie/1") == {}
+        assert is_exhausted()
+
+    assert get.call_count == 1
+
+
+def test_deadline_skips_calls_after_exhaustion(monkeypatch):
+    """После исчерпания бюджета запросы к API не делаются вовсе"""
+    get = Mock()
+    monkeypatch.setattr("services.tmdb.requests.get", get)
+
+    with tmdb_deadline(0):
+        assert Tmdb(use_catalog=False)._get("/movie/1", ttl_key="movie_detail") == {}
+
+    get.assert_not_called()
+    assert tmdb_metrics.snapshot()["requests"] == {("/movie/{id}", "movie_detail", "deadline"): 1}
+
+
+def test_payload_is_partial_when_credits_cut_by_deadline(monkeypatch):
+    """Карточка фильма рендерится по деталям, если на актеров не хватило бюджета"""
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.get", lambda key: None)
+    cache_set = Mock()
+    monkeypatch.setattr("films.services.tmdb_movie_payload.cache.set", cache_set)
+    monkeypatch.setattr("films.services.tmdb_movie_payload.tmdb.get_movie_details", lambda tmdb_id: {"id": tmdb_id})
+    monkeypatch.setattr("films.services.tmdb_movie_payload.tmdb.get_credits", lambda tmdb_id: {})
+
+    with tmdb_deadline(0):
+        mark_exhausted()
+        payload = get_tmdb_movie_payload(1)
+
+    assert payload["partial"] is True
+    assert payload["credits"] == {"cast": [], "crew": []}
+    cache_set.assert_not_called()
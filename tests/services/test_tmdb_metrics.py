@@ -0,0 +1,100 @@
+from unittest.mock import Mock
+
+from django.urls import reverse
+
+import pytest
+import requests
+
+from services.tmdb import Tmdb
+from services.tmdb_metrics import (
+    TmdbMetrics,
+    end_request_stats,
+    endpoint_label,
+    merge_snapshots,
+    render_prometheus,
+    start_request_stats,
+    tmdb_metrics,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    tmdb_metrics.reset()
+    yield
+    tmdb_metrics.reset()
+
+
+def test_endpoint_label_hides_ids():
+    """id фильмов не размножают метки эндпоинтов"""
+    assert endpoint_label("/movie/550/credits") == "/movie/{id}/credits"
+    assert endpoint_label("/trending/movie/week") == "/trending/movie/week"
+
+
+def test_endpoint_label_hides_external_ids():
+    """IMDb id при импорте дневника не создают новую серию метрик на каждый фильм"""
+    assert endpoint_label("/find/tt0111161") == "/find/{id}"
+    assert endpoint_label("/find/nm0000151") == "/find/{id}"
+
+
+def test_render_prometheus_histogram():
+    """Гистограмма задержек выводится кумулятивно по бакетам"""
+    metrics = TmdbMetrics()
+    metrics.record("/movie/{id}", "movie_detail", "miss", 0.2)
+    metrics.record("/movie/{id}", "movie_detail", "miss", 3.0)
+    metrics.record("/movie/{id}", "movie_detail", "hit")
+    metrics.record_retry("/movie/{id}", 1)
+
+    text = render_prometheus(merge_snapshots([metrics.snapshot(), metrics.snapshot()]))
+
+    assert 'tmdb_requests_total{endpoint="/movie/{id}",ttl_key="movie_detail",result="miss"} 4' in text
+    assert 'tmdb_request_duration_seconds_bucket{endpoint="/movie/{id}",le="0.25"} 2' in text
+    assert 'tmdb_request_duration_seconds_bucket{endpoint="/movie/{id}",le="+Inf"} 4' in text
+    assert 'tmdb_request_duration_seconds_count{endpoint="/movie/{id}"} 4' in text
+    assert 'tmdb_backoff_seconds_total{endpoint="/movie/{id}"} 2' in text
+
+
+def test_get_records_hits_misses_and_retries(monkeypatch):
+    """_get учитывает попадания в кэш, запросы к API, повторы и объем ответа"""
+    ok = Mock(content=b'{"id": 1}', json=Mock(return_value={"id": 1}), raise_for_status=Mock())
+    monkeypatch.setattr(
+        "services.tmdb.requests.get", Mock(side_effect=[requests.exceptions.Timeout(), ok, ok, ok, ok, ok])
+    )
+    monkeypatch.setattr("services.tmdb.time.sleep", lambda s: None)
+    api = Tmdb(use_catalog=False)
+
+    api.get_movie_details(1)
+    snapshot = tmdb_metrics.snapshot()
+
+    assert snapshot["requests"] == {("/movie/{id}", "movie_detail", "miss"): 1}
+    assert snapshot["retries"] == {"/movie/{id}": 1}
+    assert snapshot["bytes"] == {"/movie/{id}": len(ok.content)}
+
+
+def test_request_stats_count_calls_of_one_request(monkeypatch):
+    """Статистика запроса считает только вызовы внутри него"""
+    monkeypatch.setattr("services.tmdb.cache.get", lambda key: {"cached": True})
+    token = start_request_stats()
+    Tmdb(use_catalog=False)._get("/movie/1")
+    Tmdb(use_catalog=False)._get("/movie/2")
+    stats = end_request_stats(token)
+
+    assert stats["calls"] == 2
+    assert stats["hit"] == 2
+
+
+@pytest.mark.django_db
+def test_tmdb_metrics_view_access(client, user, admin_user, settings):
+    """Метрики доступны администратору и сборщику с токеном"""
+    settings.METRICS_TOKEN = "secret"
+    url = reverse("tmdb_metrics")
+
+    client.force_login(user)
+    assert client.get(url).status_code == 403
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer secret").status_code == 200
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer секрет").status_code == 403
+
+    client.force_login(admin_user)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
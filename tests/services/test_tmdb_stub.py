@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from services.tmdb import Tmdb
+from services.tmdb_stub import fixture_name, start_stub_server, synthetic_response
+
+
+@pytest.fixture
+def stub_factory():
+    """Запускает заменители TMDB в фоновых потоках и останавливает их после теста"""
+    servers = []
+
+    def factory(**options):
+        server = start_stub_server(**options)
+        servers.append(server)
+        return server
+
+    yield factory
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_client(server) -> Tmdb:
+    api = Tmdb(use_catalog=False)
+    api._base_url = server.base_url
+    return api
+
+
+def test_synthetic_routes_cover_client_endpoints():
+    """Для каждого эндпоинта клиента Tmdb есть синтетический ответ"""
+    paths = [
+        "/search/movie",
+        "/movie/1",
+        "/configuration",
+        "/movie/1/credits",
+        "/movie/1/keywords",
+        "/movie/now_playing",
+        "/movie/upcoming",
+        "/movie/popular",
+        "/trending/movie/week",
+        "/movie/top_rated",
+        "/movie/1/similar",
+        "/movie/1/recommendations",
+        "/genre/movie/list",
+        "/discover/movie",
+    ]
+    for path in paths:
+        assert synthetic_response(path, {"query": "x", "with_genres": "18"}), path
+
+
+def test_stub_serves_synthetic_data(stub_factory):
+    """Клиент получает детерминированные синтетические ответы"""
+    api = make_client(stub_factory(mode="synthetic"))
+
+    details = api.get_movie_details(550)
+    popular = api.get_popular(pages=2)
+
+    assert details["id"] == 550
+    assert details["genres"]
+    assert len(popular) == 40
+    assert api.get_popular(pages=2) == popular
+
+
+def test_stub_replays_fixtures(stub_factory, tmp_path):
+    """Записанная фикстура отдается вместо синтетики, незаписанный запрос в strict-режиме - 404"""
+    api = make_client(stub_factory(mode="replay", fixtures_dir=tmp_path, strict=True))
+    params = {**api._base_params, "page": 1}
+    (tmp_path / fixture_name("/search/movie", {**params, "query": "matrix"})).write_text(
+        json.dumps({"results": [{"id": 603}]}), encoding="utf-8"
+    )
+
+    assert api.search_movie("matrix") == {"results": [{"id": 603}]}
+    assert api.search_movie("unknown") == {}
+
+
+def test_stub_records_upstream(stub_factory, tmp_path):
+    """В режиме record ответы upstream сохраняются в фикстуры"""
+    upstream = stub_factory(mode="synthetic")
+    recorder = stub_factory(mode="record", fixtures_dir=tmp_path, upstream=upstream.base_url)
+    api = make_client(recorder)
+
+    details = api.get_movie_details(42)
+
+    assert details["id"] == 42
+    assert len(list(tmp_path.glob("movie_42-*.json"))) == 1
+    assert upstream.hits["/movie/42"] == 1
+
+
+def test_stub_records_upstream_not_found(stub_factory, tmp_path):
+    """404 upstream записывается и воспроизводится как 404, а не как синтетический фильм"""
+    upstream = stub_factory(mode="replay", fixtures_dir=tmp_path / "empty", strict=True)
+    recorder = stub_factory(mode="record", fixtures_dir=tmp_path, upstream=upstream.base_url)
+    replay = stub_factory(mode="replay", fixtures_dir=tmp_path)
+
+    assert make_client(recorder).get_movie_details(42) == {}
+    assert len(list(tmp_path.glob("movie_42-*.json"))) == 1
+    assert make_client(replay).get_movie_details(42) == {}
+    assert upstream.hits["/movie/42"] == 1
+
+
+def test_stub_injects_errors(stub_factory):
+    """Внедренные ошибки доходят до клиента"""
+    server = stub_factory(mode="synthetic", error_rate=1.0, error_status=400)
+    api = make_client(server)
+
+    assert api.get_movie_details(1) == {}
+    assert server.hits["/movie/1"] == 1
@@ -0,0 +1,273 @@
+"""
+Бюджет SQL-запросов для каждой страницы films, reviews, users и calendar_events.
+Каждая страница открывается дважды: на базе с SMALL записями у пользователя (неполная страница) и с LARGE
+(несколько страниц). Число запросов должно совпадать - иначе в страницу пролез N+1 - и не превышать бюджета.
+QUERY_BUDGET_REPORT=<путь> - JSON-отчет (запросы и время по каждой странице) для сравнения между релизами
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable
+
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+import pytest
+
+from calendar_events.models import CalendarEvent
+from films.models import DiaryImport, Film, Genre, UserFilm
+from reviews.models import Review
+from services.tmdb import Tmdb
+from services.tmdb_stub import synthetic_response
+from users.models import CustomUser
+
+SMALL = 6  # неполная страница списка (12 карточек): N+1 по карточкам меняет число запросов
+LARGE = 40
+NAMESPACES = ("films", "reviews", "users", "calendar_events", "calendar_events_pages")
+
+
+@dataclass
+class Seed:
+    user: CustomUser
+    manager: CustomUser
+    film: Film
+    unrated_film: Film
+    review: Review
+    event: CalendarEvent
+    diary_import: DiaryImport
+
+
+@dataclass(frozen=True)
+class Case:
+    """Страница и ее бюджет. role: anon / user / manager; redirects - страница отвечает перенаправлением"""
+
+    url_name: str
+    budget: int
+    role: str = "user"
+    kwargs: Callable[[Seed], dict] | None = None
+    params: dict = field(default_factory=dict)
+    label: str = ""
+    redirects: bool = False
+
+    @property
+    def id(self) -> str:
+        return self.label or self.url_name
+
+
+def _user(seed):
+    return {"user_id": seed.user.id}
+
+
+# бюджет - фактическое число запросов страницы; уменьшать можно, увеличивать - только осознанно
+CASES = [
+    # films
+    Case("films:home", 7),
+    Case("films:home", 0, role="anon", label="films:home[anon]"),
+    Case("films:recommends", 3, params={"type": "recommended"}),
+    Case("films:recommends", 6, params={"type": "popular"}, label="films:recommends[popular]"),
+    Case("films:film_search", 5, params={"q": "Film"}),
+    Case("films:film_search", 8, params={"q": "Film", "source": "user_films"}, label="films:film_search[library]"),
+    Case("films:my_films", 9),
+    Case("films:my_films", 10, role="manager", label="films:my_films[manager]"),
+    Case("films:favorite_films", 8),
+    Case("films:film_detail", 9, kwargs=lambda s: {"tmdb_id": s.film.tmdb_id}),
+    Case("films:add_film_status", 3, kwargs=lambda s: {"tmdb_id": s.film.tmdb_id}),
+    Case("films:export_diary", 5),
+    Case("films:diary_import", 4),
+    Case("films:diary_import_status", 3, kwargs=lambda s: {"pk": s.diary_import.pk}),
+    # reviews
+    Case("reviews:watched", 9),
+    Case("reviews:watched", 9, params={"sort": "rating"}, label="reviews:watched[rating]"),
+    Case("reviews:watched", 10, role="manager", label="reviews:watched[manager]"),
+    Case("reviews:reviews", 9),
+    Case("reviews:review_detail", 5, kwargs=lambda s: {"pk": s.review.pk}),
+    Case("reviews:review_create", 7, kwargs=lambda s: {"tmdb_id": s.unrated_film.tmdb_id}),
+    Case("reviews:review_update", 6, kwargs=lambda s: {"pk": s.review.pk}),
+    # users
+    Case("users:register", 0, role="anon"),
+    Case("users:activation_sent", 0, role="anon"),
+    Case("users:activation_error", 0, role="anon"),
+    Case("users:activate", 1, role="anon", kwargs=lambda s: {"user_id": s.user.id, "token": "bad"}),
+    Case("users:resend_activation", 0, role="anon"),
+    Case("users:login", 0, role="anon"),
+    Case("users:profile", 3),
+    Case("users:confirm_email", 3, kwargs=lambda s: {"user_id": s.user.id, "token": "bad"}, redirects=True),
+    Case("users:password_reset", 0, role="anon"),
+    Case("users:password_reset_done", 0, role="anon"),
+    Case("users:password_reset_confirm", 1, role="anon", kwargs=lambda s: {"uidb64": "MQ", "token": "bad"}),
+    Case("users:password_reset_complete", 0, role="anon"),
+    Case("users:feedback", 3),
+    Case("users:manager_users", 5, role="manager"),
+    Case("users:manager_user_overview", 4, role="manager", kwargs=_user),
+    Case("users:manager_user_films", 8, role="manager", kwargs=_user),
+    Case("users:manager_user_reviews", 7, role="manager", kwargs=_user),
+    Case("users:manager_user_calendar", 7, role="manager", kwargs=_user),
+    # calendar_events
+    Case("calendar_events:api-root", 2),
+    Case("calendar_events:calendar_events-list", 4),
+    Case("calendar_events:calendar_events-detail", 5, kwargs=lambda s: {"pk": s.event.pk}),
+    Case("calendar_events:calendar_events-upcoming", 4),
+    Case("calendar_events_pages:calendar_list", 3),
+]
+
+# страницы без GET: действия только через POST
+POST_ONLY = {
+    "films:add_film",
+    "films:bulk_add_films",
+    "films:update_status",
+    "films:bulk_update_status",
+    "films:delete_film",
+    "reviews:review_delete",
+    "users:logout",
+    "users:manager_user_block",
+    "users:manager_user_unblock",
+}
+
+_report: list[dict] = []
+
+
+def seed_library(user, start: int, count: int, genre: Genre) -> None:
+    """Добавляет пользователю count фильмов: часть в любимом, половина оценена, четверть в календаре"""
+    films = Film.objects.bulk_create(
+        Film(
+            tmdb_id=start + i,
+            title=f"Film {start + i}",
+            overview="Описание",
+            vote_average=7,
+            release_date=date(2020, 1, 1),
+        )
+        for i in range(count)
+    )
+    Film.genres.through.objects.bulk_create(Film.genres.through(film=film, genre=genre) for film in films)
+    UserFilm.objects.bulk_create(
+        UserFilm(user=user, film=film, is_favorite=i % 3 == 0) for i, film in enumerate(films)
+    )
+    Review.objects.bulk_create(
+        Review(
+            user=user,
+            film=film,
+            watched_at=date(2024, 1, 1),
+            plot_rating=7,
+            acting_rating=7,
+            directing_rating=7,
+            visuals_rating=7,
+            soundtrack_rating=7,
+            user_rating=1 + i % 10,
+            review="Отзыв" if i % 4 == 0 else "",
+        )
+        for i, film in enumerate(films)
+        if i % 2 == 0
+    )
+    today = timezone.localdate()
+    CalendarEvent.objects.bulk_create(
+        CalendarEvent(user=user, film=film, planned_date=today + timedelta(days=i % 3))
+        for i, film in enumerate(films)
+        if i % 4 == 0
+    )
+
+
+@pytest.fixture
+def offline_tmdb(monkeypatch):
+    """TMDB отвечает синтетическими данными tmdb_stub без сети"""
+
+    def fetch(url, params, endpoint, retries, timeout):
+        return synthetic_response(url[len(Tmdb()._base_url) :], params)
+
+    monkeypatch.setattr(Tmdb, "_fetch", staticmethod(fetch))
+    # загрузка данных фильмов - в потоке запроса: CaptureQueriesContext видит только его соединение,
+    # запросы из потоков пула в бюджет не попали бы
+    monkeypatch.setattr("films.services.tmdb_movie_payload.PAYLOAD_WORKERS", 1)
+
+
+@pytest.fixture
+def seed(db, offline_tmdb):
+    genre = Genre.objects.create(tmdb_id=18, name="драма")
+    user = CustomUser.objects.create_user(username="budget", email="budget@test.ru", password="123")
+    manager = CustomUser.objects.create_user(username="manager", email="manager@test.ru", password="123")
+    manager.groups.add(Group.objects.create(name="Manager"))
+    other = CustomUser.objects.create_user(username="other", email="other@test.ru", password="123")
+
+    seed_library(user, 1_000, SMALL, genre)
+    seed_library(other, 5_000, SMALL, genre)
+
+    film = Film.objects.get(tmdb_id=1_000)
+    return Seed(
+        user=user,
+        manager=manager,
+        film=film,
+        unrated_film=Film.objects.get(tmdb_id=1_001),
+        review=Review.objects.get(user=user, film=film),
+        event=CalendarEvent.objects.get(user=user, film=film),
+        diary_import=DiaryImport.objects.create(user=user, file="imports/diary.csv"),
+    )
+
+
+@pytest.fixture(scope="module", autouse=True)
+def budget_report():
+    yield
+    path = os.getenv("QUERY_BUDGET_REPORT")
+    if path and _report:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(sorted(_report, key=lambda row: row["view"]), f, ensure_ascii=False, indent=2)
+
+
+def _measure(client, url: str, params: dict) -> tuple[list[str], float, int]:
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        response = client.get(url, params)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+    return [query["sql"] for query in ctx.captured_queries], elapsed, response.status_code
+
+
+def _most_repeated(queries: list[str]) -> str:
+    """Самый частый запрос (без параметров) - обычно виновник N+1"""
+    sql, times = Counter(query.split(" WHERE ")[0] for query in queries).most_common(1)[0]
+    return f"{times}x {sql[:300]}"
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.id)
+def test_view_query_budget(client, seed, case):
+    if case.role != "anon":
+        client.force_login(seed.manager if case.role == "manager" else seed.user)
+    url = reverse(case.url_name, kwargs=case.kwargs(seed) if case.kwargs else None)
+
+    small, _, status = _measure(client, url, case.params)
+    assert status < 500, f"{case.id}: {status}"
+    assert status != 302 or case.role == "anon" or case.redirects, f"{case.id}: перенаправление вместо страницы"
+
+    genre = Genre.objects.get()
+    seed_library(seed.user, 10_000, LARGE - SMALL, genre)
+    seed_library(CustomUser.objects.get(username="other"), 20_000, LARGE - SMALL, genre)
+    large, elapsed, _ = _measure(client, url, case.params)
+
+    _report.append({"view": case.id, "queries": len(large), "budget": case.budget, "ms": round(elapsed * 1000, 1)})
+    assert len(small) == len(large), (
+        f"{case.id}: {len(small)} запросов при {SMALL} записях, {len(large)} при {LARGE} - N+1: "
+        f"{_most_repeated(large)}"
+    )
+    assert (
+        len(large) <= case.budget
+    ), f"{case.id}: {len(large)} запросов, бюджет {case.budget}: {_most_repeated(large)}"
+
+
+def test_every_page_has_budget():
+    """Новая страница в films / reviews / users / calendar_events должна получить бюджет"""
+    resolver = get_resolver()
+    names = {
+        f"{namespace}:{name}"
+        for namespace in NAMESPACES
+        for name in resolver.namespace_dict[namespace][1].reverse_dict
+        if isinstance(name, str)
+    }
+    covered = {case.url_name for case in CASES} | POST_ONLY
+
+    assert names - covered == set()
@@ -0,0 +1,132 @@
+"""
+Регрессия планов запросов: горячие запросы списков должны идти по индексу.
+EXPLAIN выполняется на заполненной базе тестов. Локально и в джобе test - SQLite, в джобе test-postgres -
+PostgreSQL 16 (TEST_DB_ENGINE=postgresql): там проверяется, что планировщик выбирает именно составной индекс,
+а не индекс внешнего ключа user_id. Для этого база заполняется объемом, близким к рабочему (сотни фильмов
+в библиотеке на пользователя, сотни пользователей с календарем), и собирается статистика (ANALYZE).
+Последовательное чтение не отключается: иначе планировщик берет хоть какой-то индекс почти для любого условия,
+и тест не замечает удаленный индекс. Поэтому каждый тест проверяет имя ожидаемого индекса в плане
+"""
+
+from datetime import date, timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+import pytest
+
+from calendar_events.models import CalendarEvent
+from films.models import Film, UserFilm
+from reviews.models import Review
+from users.models import CustomUser
+
+USERS = 20  # пользователей с библиотекой и отзывами
+CALENDAR_USERS = 500  # пользователей с календарем: доля одного пользователя в таблице событий мала
+FILMS = 1000  # фильмов в библиотеке каждого пользователя: на таких объемах сортировка по индексу выгоднее
+EVENTS = 40  # запланированных просмотров на пользователя: календарь небольшой
+
+
+@pytest.fixture
+def seeded(db):
+    """Несколько пользователей с библиотекой, отзывами и календарем (на PostgreSQL - со свежей статистикой)"""
+    calendar_users = CustomUser.objects.bulk_create(
+        CustomUser(username=f"plan{i}", email=f"plan{i}@test.ru") for i in range(CALENDAR_USERS)
+    )
+    users = calendar_users[:USERS]
+    films = Film.objects.bulk_create(Film(tmdb_id=10_000 + i, title=f"Film {i}") for i in range(FILMS))
+    today = timezone.localdate()
+
+    UserFilm.objects.bulk_create(
+        UserFilm(user=user, film=film, is_favorite=i % 7 == 0) for user in users for i, film in enumerate(films)
+    )
+    Review.objects.bulk_create(
+        Review(
+            user=user,
+            film=film,
+            watched_at=date(2024, 1, 1),
+            plot_rating=5,
+            acting_rating=5,
+            directing_rating=5,
+            visuals_rating=5,
+            soundtrack_rating=5,
+            user_rating=1 + i % 10,
+        )
+        for user in users
+        for i, film in enumerate(films[: FILMS // 2])
+    )
+    CalendarEvent.objects.bulk_create(
+        CalendarEvent(user=user, film=film, planned_date=today + timedelta(days=i % 30))
+        for user in calendar_users
+        for i, film in enumerate(films[:EVENTS])
+    )
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    return users[0]
+
+
+def uses_index(queryset, index_name: str) -> bool:
+    """Проверяет по EXPLAIN, что запрос читает таблицу по индексу index_name"""
+    return index_name in queryset.explain()
+
+
+def uses_any_index(queryset, index_names: set[str]) -> bool:
+    """Проверяет по EXPLAIN, что запрос читает таблицу по одному из индексов index_names"""
+    plan = queryset.explain()
+    return any(name in plan for name in index_names)
+
+
+def indexes_by_prefix(model, *columns: str) -> set[str]:
+    """
+    Имена индексов таблицы модели, которые начинаются с колонок columns.
+    Нужна для индексов с автоматическими именами (unique_together, индекс внешнего ключа): имя зависит от СУБД
+    """
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {
+        name
+        for name, info in constraints.items()
+        if info["index"] or info["unique"]
+        if tuple(info["columns"][: len(columns)]) == columns
+    }
+
+
+def test_my_films_page(seeded):
+    qs = UserFilm.objects.filter(user=seeded).order_by("-created_at", "-id")[:13]
+    assert uses_index(qs, "userfilm_user_created_idx"), qs.explain()
+
+
+def test_favorites_page(seeded):
+    qs = UserFilm.objects.filter(user=seeded, is_favorite=True).order_by("-created_at", "-id")[:13]
+    assert uses_index(qs, "userfilm_user_fav_created_idx"), qs.explain()
+
+
+def test_reviews_by_date_page(seeded):
+    qs = Review.objects.filter(user=seeded).order_by("-created_at", "-id")[:13]
+    assert uses_index(qs, "review_user_created_idx"), qs.explain()
+
+
+def test_reviews_by_rating_page(seeded):
+    qs = Review.objects.filter(user=seeded).order_by("-user_rating", "-id")[:13]
+    assert uses_index(qs, "review_user_rating_idx"), qs.explain()
+
+
+def test_planned_statuses_for_films(seeded):
+    """Запланированные фильмы страницы (FilmStatusResolver): индекс unique_together (user, film, planned_date)"""
+    film_ids = list(Film.objects.values_list("id", flat=True)[:12])
+    qs = CalendarEvent.objects.filter(
+        user=seeded, film_id__in=film_ids, planned_date__gte=timezone.localdate()
+    ).values_list("film_id", flat=True)
+    expected = indexes_by_prefix(CalendarEvent, "user_id", "film_id")
+    assert expected, "нет индекса (user, film) у calendar_events"
+    assert uses_any_index(qs, expected), qs.explain()
+
+
+def test_user_calendar_by_date(seeded):
+    """Календарь пользователя невелик: хватает индекса, начинающегося с user ((user, planned_date) не нужен)"""
+    today = timezone.localdate()
+    qs = CalendarEvent.objects.filter(
+        user=seeded, planned_date__gte=today, planned_date__lte=today + timedelta(days=2)
+    )
+    assert uses_any_index(qs, indexes_by_prefix(CalendarEvent, "user_id")), qs.explain()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from services.user_stats import RECONCILE_BATCH_SIZE, reconcile_user_stats
+
+
+class Command(BaseCommand):
+    help = "Сверяет счетчики пользователей (UserStats) с библиотекой, отзывами и календарем и исправляет расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=RECONCILE_BATCH_SIZE, help="Пользователей в одном пакете сверки"
+        )
+
+    def handle(self, *args, **options):
+        checked, fixed = reconcile_user_stats(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Проверено пользователей: {checked}, исправлено: {fixed}"))
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_user_stats(apps, schema_editor):
+    """Счетчики существующих пользователей (дальше их ведут сигналы users.signals)"""
+    CustomUser = apps.get_model("users", "CustomUser")
+    UserStats = apps.get_model("users", "UserStats")
+    UserFilm = apps.get_model("films", "UserFilm")
+    Review = apps.get_model("reviews", "Review")
+    CalendarEvent = apps.get_model("calendar_events", "CalendarEvent")
+
+    def per_user(queryset, field):
+        rows = queryset.order_by().values("user_id").annotate(n=Count("id"), last=Max(field))
+        return {row["user_id"]: row for row in rows}
+
+    films = per_user(UserFilm.objects.all(), "created_at")
+    favorites = per_user(UserFilm.objects.filter(is_favorite=True), "created_at")
+    reviews = per_user(Review.objects.all(), "updated_at")
+    events = per_user(CalendarEvent.objects.all(), "created_at")
+
+    stats = []
+    for user_id in CustomUser.objects.values_list("id", flat=True).iterator():
+        activity = [rows[user_id]["last"] for rows in (films, reviews, events) if user_id in rows]
+        stats.append(
+            UserStats(
+                user_id=user_id,
+                films_count=films.get(user_id, {}).get("n", 0),
+                favorites_count=favorites.get(user_id, {}).get("n", 0),
+                reviews_count=reviews.get(user_id, {}).get("n", 0),
+                planned_count=events.get(user_id, {}).get("n", 0),
+                last_activity_at=max(activity) if activity else None,
+            )
+        )
+    UserStats.objects.bulk_create(stats, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0004_customuser_is_blocked"),
+        ("films", "0012_hot_list_indexes"),
+        ("reviews", "0006_hot_list_indexes"),
+        ("calendar_events", "0005_alter_calendarevent_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+                ("films_count", models.IntegerField(default=0, verbose_name="Фильмов")),
+                ("favorites_count", models.IntegerField(default=0, verbose_name="Любимых")),
+                ("reviews_count", models.IntegerField(default=0, verbose_name="Отзывов")),
+                ("planned_count", models.IntegerField(default=0, verbose_name="Запланировано")),
+                ("last_activity_at", models.DateTimeField(blank=True, null=True, verbose_name="Последняя активность")),
+            ],
+            options={
+                "verbose_name": "статистика пользователя",
+                "verbose_name_plural": "статистика пользователей",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(fields=["is_blocked", "-date_joined", "-id"], name="user_blocked_joined_id_idx"),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -48,6 +48,10 @@ class CustomUser(AbstractUser):
         ordering = [
             "email",
         ]
+        indexes = [
+            # панель менеджера: фильтр по is_blocked, порядок (-date_joined, -id) целиком из индекса
+            models.Index(fields=["is_blocked", "-date_joined", "-id"], name="user_blocked_joined_id_idx"),
+        ]
 
 
 class MessageFeedback(models.Model):
@@ -69,3 +73,26 @@ class MessageFeedback(models.Model):
             "email",
             "created_at",
         ]
+
+
+class UserStats(models.Model):
+    """
+    Счетчики пользователя для панели менеджера: хранятся денормализованно, обновляются сигналами
+    при изменении библиотеки, отзывов и календаря, сверяются командой reconcile_user_stats
+    """
+
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.CASCADE, primary_key=True, related_name="stats", verbose_name="Пользователь"
+    )
+    films_count = models.IntegerField(default=0, verbose_name="Фильмов")
+    favorites_count = models.IntegerField(default=0, verbose_name="Любимых")
+    reviews_count = models.IntegerField(default=0, verbose_name="Отзывов")
+    planned_count = models.IntegerField(default=0, verbose_name="Запланировано")
+    last_activity_at = models.DateTimeField(null=True, blank=True, verbose_name="Последняя активность")
+
+    def __str__(self):
+        return f"{self.user}: {self.films_count} / {self.reviews_count} / {self.planned_count}"
+
+    class Meta:
+        verbose_name = "статистика пользователя"
+        verbose_name_plural = "статистика пользователей"
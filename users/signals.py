@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from calendar_events.models import CalendarEvent
+from films.models import UserFilm
+from reviews.models import Review
+from services.user_stats import apply_delta
+from users.models import CustomUser, UserStats
+
+
+@receiver(post_save, sender=CustomUser)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    """Новому пользователю - пустые счетчики"""
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=UserFilm)
+def remember_favorite(sender, instance, **kwargs):
+    """Запоминает загруженное значение is_favorite: при сохранении счетчик любимых меняется на разницу"""
+    instance._stats_is_favorite = instance.__dict__.get("is_favorite")
+
+
+@receiver(post_save, sender=UserFilm)
+def count_user_film(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_delta(instance.user_id, films_count=1, favorites_count=int(instance.is_favorite))
+    else:
+        was_favorite = instance._stats_is_favorite
+        delta = int(instance.is_favorite) - int(was_favorite) if was_favorite is not None else 0
+        apply_delta(instance.user_id, favorites_count=delta)
+    instance._stats_is_favorite = instance.is_favorite
+
+
+@receiver(post_delete, sender=UserFilm)
+def uncount_user_film(sender, instance, **kwargs):
+    apply_delta(instance.user_id, films_count=-1, favorites_count=-int(instance.is_favorite))
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        apply_delta(instance.user_id, reviews_count=int(created))
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    apply_delta(instance.user_id, reviews_count=-1)
+
+
+@receiver(post_save, sender=CalendarEvent)
+def count_event(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        apply_delta(instance.user_id, planned_count=int(created))
+
+
+@receiver(post_delete, sender=CalendarEvent)
+def uncount_event(sender, instance, **kwargs):
+    apply_delta(instance.user_id, planned_count=-1)
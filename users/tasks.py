@@ -6,6 +6,7 @@ from celery import shared_task
 from celery.utils.log import get_task_logger
 
 from config import settings
+from services.user_stats import reconcile_user_stats
 
 logger = get_task_logger(__name__)
 User = get_user_model()
@@ -62,3 +63,11 @@ def send_confirm_email_task(self, user_id: str, new_email: str, confirm_url: str
         return
     except Exception as exc:
         raise self.retry(exc=exc, countdown=10)  # повторная попытка отправки
+
+
+@shared_task(bind=True)
+def reconcile_user_stats_task(self):
+    """Периодическая задача: сверка денормализованных счетчиков пользователей с данными"""
+    checked, fixed = reconcile_user_stats()
+    logger.info("UserStats reconcile: checked=%s fixed=%s task=%s", checked, fixed, self.request.id)
+    return {"checked": checked, "fixed": fixed}
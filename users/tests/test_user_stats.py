@@ -0,0 +1,153 @@
+from datetime import date
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.urls import reverse
+
+import pytest
+
+from calendar_events.models import CalendarEvent
+from films.models import Film, UserFilm
+from films.services.bulk_library import bulk_update_status
+from reviews.models import Review
+from services.user_stats import deferred_stats
+from users.models import CustomUser, UserStats
+
+
+@pytest.fixture
+def films(db):
+    return Film.objects.bulk_create(Film(tmdb_id=100 + i, title=f"Film {i}") for i in range(3))
+
+
+def _stats(user) -> UserStats:
+    return UserStats.objects.get(user=user)
+
+
+def _review(user, film) -> Review:
+    return Review.objects.create(
+        user=user,
+        film=film,
+        watched_at=date(2024, 1, 1),
+        plot_rating=7,
+        acting_rating=7,
+        directing_rating=7,
+        visuals_rating=7,
+        soundtrack_rating=7,
+    )
+
+
+def test_new_user_gets_empty_stats(user):
+    stats = _stats(user)
+    assert (stats.films_count, stats.reviews_count, stats.planned_count, stats.last_activity_at) == (0, 0, 0, None)
+
+
+def test_signals_keep_counters(user, films):
+    """Добавление, любимое, отзыв, план и удаление меняют счетчики без пересчета"""
+    user_film = UserFilm.objects.create(user=user, film=films[0])
+    UserFilm.objects.create(user=user, film=films[1], is_favorite=True)
+    user_film.is_favorite = True
+    user_film.save()
+    review = _review(user, films[0])
+    CalendarEvent.objects.create(user=user, film=films[2], planned_date=date(2030, 1, 1))
+
+    stats = _stats(user)
+    assert (stats.films_count, stats.favorites_count, stats.reviews_count, stats.planned_count) == (2, 2, 1, 1)
+    assert stats.last_activity_at is not None
+
+    user_film.delete()
+    review.delete()
+    stats = _stats(user)
+    assert (stats.films_count, stats.favorites_count, stats.reviews_count) == (1, 1, 0)
+
+
+def test_unchanged_favorite_is_not_counted_twice(user, films):
+    user_film = UserFilm.objects.create(user=user, film=films[0], is_favorite=True)
+    UserFilm.objects.get(pk=user_film.pk).save()
+
+    assert _stats(user).favorites_count == 1
+
+
+def test_bulk_status_refreshes_once(user, films, django_assert_max_num_queries):
+    """Пакетное удаление не обновляет счетчики построчно: один пересчет на выходе"""
+    UserFilm.objects.bulk_create(UserFilm(user=user, film=film) for film in films)
+
+    with django_assert_max_num_queries(8):
+        bulk_update_status(user, [film.tmdb_id for film in films], "delete")
+
+    assert _stats(user).films_count == 0
+
+
+def test_deferred_stats_refresh_on_error(user, films):
+    """Исключение внутри пакетной операции не оставляет счетчики устаревшими: сохраненное до него пересчитывается"""
+    UserFilm.objects.bulk_create(UserFilm(user=user, film=film) for film in films)
+
+    with pytest.raises(RuntimeError):
+        with deferred_stats(user.id):
+            UserFilm.objects.filter(user=user, film=films[0]).delete()
+            raise RuntimeError
+
+    assert _stats(user).films_count == 2
+
+
+def test_deleting_user_removes_stats(user, films):
+    UserFilm.objects.create(user=user, film=films[0])
+    user.delete()
+
+    assert not UserStats.objects.exists()
+
+
+def test_reconcile_command_fixes_drift(user, films, capsys):
+    UserFilm.objects.bulk_create(UserFilm(user=user, film=film, is_favorite=True) for film in films)
+    other = CustomUser.objects.create_user(username="other", email="other@test.com", password="123")
+
+    call_command("reconcile_user_stats", batch_size=1)
+
+    assert "Проверено пользователей: 2, исправлено: 1" in capsys.readouterr().out
+    stats = _stats(user)
+    assert (stats.films_count, stats.favorites_count) == (3, 3)
+    assert _stats(other).films_count == 0
+
+
+@pytest.fixture
+def manager_client(client, db):
+    manager = CustomUser.objects.create_user(username="manager", email="manager@test.com", password="123")
+    manager.groups.add(Group.objects.create(name="Manager"))
+    client.force_login(manager)
+    return client
+
+
+def test_manager_panel_is_paginated(manager_client, films, django_assert_num_queries):
+    """Страница панели: счетчики из UserStats, число запросов не зависит от числа пользователей"""
+    users = [
+        CustomUser.objects.create_user(username=f"user{i}", email=f"user{i}@test.com", password="123")
+        for i in range(30)
+    ]
+    UserFilm.objects.create(user=users[-1], film=films[0], is_favorite=True)
+
+    with django_assert_num_queries(5):
+        response = manager_client.get(reverse("users:manager_users"))
+
+    page = response.context["page_obj"]
+    assert page.paginator.count == 31
+    assert len(page.object_list) == 25
+    assert page.object_list[0] == users[-1]
+    assert page.object_list[0].stats.favorites_count == 1
+    assert "&status=active" in response.context["params"]
+
+
+def test_manager_panel_params_are_encoded(manager_client):
+    response = manager_client.get(reverse("users:manager_users"), {"status": '"><script>&page=2'})
+
+    assert response.context["params"] == "&status=%22%3E%3Cscript%3E%26page%3D2"
+
+
+def test_manager_overview_reads_stats(manager_client, user, films):
+    UserFilm.objects.create(user=user, film=films[0], is_favorite=True)
+    _review(user, films[0])
+
+    response = manager_client.get(reverse("users:manager_user_overview", kwargs={"user_id": user.id}))
+
+    assert response.context["film_count"] == 1
+    assert response.context["favorite_count"] == 1
+    assert response.context["review_count"] == 1
+    assert response.context["event_count"] == 0
@@ -1,7 +1,8 @@
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.sessions.models import Session
-from django.db.models import Count
+from django.core.paginator import Paginator
+from django.http import QueryDict
 from django.shortcuts import get_object_or_404, redirect
 from django.utils import timezone
 from django.views import View
@@ -10,7 +11,9 @@ from django.views.generic import TemplateView
 from calendar_events.models import CalendarEvent
 from films.models import UserFilm
 from reviews.models import Review
-from users.models import CustomUser
+from users.models import CustomUser, UserStats
+
+MANAGER_USERS_PER_PAGE = 25
 
 
 class ManagerPanelView(LoginRequiredMixin, TemplateView):
@@ -81,17 +84,22 @@ class ManagerUsersView(ManagerPanelView):
             qs = qs.filter(is_blocked=False)
             title = "👥 Активные пользователи"
 
-        qs = qs.annotate(
-            film_count=Count("user_films"),
-            review_count=Count("reviews"),
-        ).order_by("-date_joined")
+        # счетчики - готовые значения UserStats (JOIN 1:1), без COUNT по библиотеке и отзывам каждого пользователя;
+        # страница выбирается по индексу (is_blocked, -date_joined, -id) без сортировки
+        qs = qs.select_related("stats").order_by("-date_joined", "-id")
+        page = Paginator(qs, MANAGER_USERS_PER_PAGE).get_page(self.request.GET.get("page"))
+        params = QueryDict(mutable=True)
+        params["status"] = status
 
         context.update(
             {
-                "users": qs,
+                "users": page,
+                "page_obj": page,
+                "page_range": page.paginator.get_elided_page_range(page.number),
+                "params": f"&{params.urlencode()}",
                 "title": title,
                 "status": status,
-                "total_users": qs.count(),
+                "total_users": page.paginator.count,
             }
         )
 
@@ -114,16 +122,18 @@ class ManagerUserOverviewView(ManagerUserDataView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.get_user()
-        print(f"DEBUG: user={user}, user.id={user.id if user else None}")
+        user = get_object_or_404(CustomUser.objects.select_related("stats"), id=self.kwargs["user_id"])
+        stats = getattr(user, "stats", None) or UserStats(user=user)
 
         context.update(
             {
                 "user_obj": user,
                 "user_id": self.kwargs["user_id"],
-                "film_count": user.user_films.count(),
-                "review_count": user.reviews.count(),
-                "event_count": user.calendar_events.count(),
+                "film_count": stats.films_count,
+                "favorite_count": stats.favorites_count,
+                "review_count": stats.reviews_count,
+                "event_count": stats.planned_count,
+                "last_activity_at": stats.last_activity_at,
             }
         )
         return context
@@ -198,7 +208,12 @@ class ManagerUserCalendarView(ManagerPanelView):
         context = super().get_context_data(**kwargs)
         user = get_object_or_404(CustomUser, id=self.kwargs["user_id"])
 
-        events = CalendarEvent.objects.filter(user=user).select_related("film").order_by("planned_date")
+        events = (
+            CalendarEvent.objects.filter(user=user)
+            .select_related("film")
+            .prefetch_related("film__genres")
+            .order_by("planned_date")
+        )
 
         context.update(
             {